@@ -0,0 +1,143 @@
+"""
+Allocation of unique user identifiers (referral codes and usernames)
+without retry loops against the database.
+"""
+import logging
+import re
+import time
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+# Crockford base32 (no I, L, O, U) keeps codes unambiguous when typed by hand
+REFERRAL_CODE_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+# Legacy codes are 8 hex characters, so 9-character codes can never clash with them
+REFERRAL_CODE_LENGTH = 9
+REFERRAL_CODE_SEQUENCE = 'accounts_referral_code_seq'
+
+_CODE_SPACE = len(REFERRAL_CODE_ALPHABET) ** REFERRAL_CODE_LENGTH
+# Odd multiplier => the affine map below is a bijection on [0, _CODE_SPACE)
+_CODE_MULTIPLIER = 0x5DEECE66D
+_CODE_OFFSET = 0x2545F4914F
+
+
+def encode_referral_code(number):
+    """Map a sequence value to a referral code.
+
+    Distinct sequence values always give distinct codes, while consecutive
+    values produce codes that do not look sequential.
+    """
+    value = (number * _CODE_MULTIPLIER + _CODE_OFFSET) % _CODE_SPACE
+    chars = []
+    for _ in range(REFERRAL_CODE_LENGTH):
+        value, index = divmod(value, len(REFERRAL_CODE_ALPHABET))
+        chars.append(REFERRAL_CODE_ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def allocate_referral_codes(count):
+    """Allocate ``count`` unique referral codes with a single query"""
+    if count <= 0:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(%s) FROM generate_series(1, %s)',
+            [REFERRAL_CODE_SEQUENCE, count]
+        )
+        return [encode_referral_code(row[0]) for row in cursor.fetchall()]
+
+
+def allocate_referral_code():
+    """Allocate a single unique referral code"""
+    return allocate_referral_codes(1)[0]
+
+
+def users_without_referral_code():
+    return User.objects.filter(Q(referral_code__isnull=True) | Q(referral_code=''))
+
+
+def backfill_referral_codes(chunk_size=5000, sleep_seconds=0, max_chunks=None, start_after=0, progress=None):
+    """Give every user without a referral code one, chunk_size users per transaction.
+
+    Users are walked in primary-key order. Each chunk locks its rows, takes
+    its codes from one allocate_referral_codes() call and writes them with
+    bulk_update, so a run that is interrupted resumes where it stopped:
+    committed users no longer match, and start_after skips the scan too.
+    Rows locked by a concurrent update are skipped and left for the next run.
+    """
+    last_id = start_after
+    chunks = 0
+    updated = 0
+
+    while max_chunks is None or chunks < max_chunks:
+        with transaction.atomic():
+            users = list(
+                users_without_referral_code().filter(id__gt=last_id)
+                .order_by('id')
+                .select_for_update(skip_locked=True)
+                .only('id')[:chunk_size]
+            )
+            if not users:
+                break
+            for user, code in zip(users, allocate_referral_codes(len(users))):
+                user.referral_code = code
+            User.objects.bulk_update(users, ['referral_code'], batch_size=1000)
+
+        updated += len(users)
+        last_id = users[-1].id
+        chunks += 1
+        logger.info(f"Backfilled referral codes up to user id {last_id}: {len(users)} users")
+        if progress:
+            progress(updated, last_id)
+
+        if len(users) < chunk_size:
+            break
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    return {'chunks': chunks, 'updated': updated, 'last_id': last_id}
+
+
+def allocate_usernames(bases, reserved=()):
+    """Allocate one free username per entry in ``bases`` with a single query.
+
+    Each base gets the first free name out of ``base``, ``base1``, ``base2``...
+    Every name handed out, existing or listed in ``reserved`` (e.g. explicit
+    usernames of the same batch) is taken for all bases, so ``bob`` and
+    ``bob1`` in one call cannot both end up as ``bob1``.
+    """
+    bases = list(bases)
+    if not bases:
+        return []
+
+    # Every candidate is a base followed by digits, so this finds all clashes
+    pattern = '^(%s)[0-9]*$' % '|'.join(re.escape(base) for base in sorted(set(bases)))
+    existing = User.objects.filter(username__regex=pattern).values_list('username', flat=True)
+    return assign_usernames(bases, set(existing) | set(reserved))
+
+
+def assign_usernames(bases, taken):
+    """Pick the first name per base that is not in ``taken``; adds the picks to it"""
+    allocated = []
+    for base in bases:
+        candidate, counter = base, 0
+        while candidate in taken:
+            counter += 1
+            candidate = f"{base}{counter}"
+        taken.add(candidate)
+        allocated.append(candidate)
+    return allocated
+
+
+def allocate_username(base):
+    """Allocate a free username derived from ``base``"""
+    return allocate_usernames([base])[0]
+
+
+def username_base_from_email(email):
+    """Default username stem for an email address"""
+    return email.split('@')[0]
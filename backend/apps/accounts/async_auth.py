@@ -0,0 +1,51 @@
+"""
+JWT authentication for plain Django async views.
+
+DRF's APIView is synchronous, so the async endpoints are ordinary
+``async def`` views. They accept the same ``Authorization: Bearer``
+access tokens as the API; the token check and user lookup run through
+sync_to_async. Session authentication is not supported on these views.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+_jwt_authentication = JWTAuthentication()
+
+
+def async_jwt_view(methods):
+    """Decorator: allowed HTTP methods, JWT-authenticated request.user and request.auth"""
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            try:
+                result = await sync_to_async(_jwt_authentication.authenticate)(request)
+            except AuthenticationFailed as e:
+                return JsonResponse({'detail': str(e.detail)}, status=401)
+            if result is None:
+                return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+            request.user, request.auth = result
+            return await view(request, *args, **kwargs)
+
+        # Bearer tokens are not ambient credentials; set directly because
+        # Django 4.2's csrf_exempt wraps the view in a sync function
+        wrapper.csrf_exempt = True
+        return wrapper
+
+    return decorator
+
+
+def json_body(request):
+    """Decoded JSON request body, or None if it is not valid JSON"""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
@@ -0,0 +1,73 @@
+"""
+Authentication backend that bounds how many password hashes run at once.
+
+A per-process semaphore sized to the cores caps concurrent hashes; the
+hash still runs on the request thread, so this does not shorten a login.
+A login spike then queues on the semaphore instead of oversubscribing
+the CPU and starving every other request thread of the worker.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+
+_semaphore = None
+_semaphore_lock = threading.Lock()
+
+
+def get_hash_semaphore():
+    """Per-process semaphore bounding concurrent hashes"""
+    global _semaphore
+    if _semaphore is None:
+        with _semaphore_lock:
+            if _semaphore is None:
+                _semaphore = threading.BoundedSemaphore(settings.PASSWORD_HASH_CONCURRENCY or os.cpu_count() or 1)
+    return _semaphore
+
+
+def run_hash(func, *args):
+    """Run a hashing function once a hashing slot is free"""
+    with get_hash_semaphore():
+        return func(*args)
+
+
+def password_needs_rehash(encoded):
+    """Whether a stored hash should be upgraded to the preferred hasher/cost"""
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = get_hasher('default')
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+class BoundedHashBackend(ModelBackend):
+    """ModelBackend with concurrency-bounded hash verification and rehash-on-login"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown emails take as long as wrong passwords
+            run_hash(make_password, password)
+            return None
+
+        if not run_hash(check_password, password, user.password):
+            return None
+
+        if password_needs_rehash(user.password):
+            user.password = run_hash(make_password, password)
+            user.save(update_fields=['password'])
+
+        if self.user_can_authenticate(user):
+            return user
+        return None
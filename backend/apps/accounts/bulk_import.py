@@ -0,0 +1,298 @@
+"""
+Streaming bulk import of users (e.g. clinic patient rosters).
+
+Records are read lazily from CSV or JSONL, validated one batch at a time
+with a single lookup query, password hashing is spread over a process pool
+and Users/Profiles are written with ``bulk_create``.
+"""
+import csv
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+
+from .allocators import allocate_referral_codes, allocate_usernames, username_base_from_email
+from .models import User, Profile
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+IMPORT_FIELDS = (
+    'email', 'username', 'first_name', 'last_name',
+    'user_type', 'phone_number', 'password',
+)
+USER_TYPES = {choice for choice, _ in User.USER_TYPE_CHOICES}
+
+
+def detect_format(filename, default='csv'):
+    """Guess the import format from a file name"""
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    return default
+
+
+class InvalidRecord:
+    """Stands in for a record that could not be parsed; reported as a row error"""
+
+    def __init__(self, reason):
+        self.reason = reason
+
+
+def iter_records(stream, fmt):
+    """Yield one dict (or InvalidRecord) per record from a text stream"""
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield row
+    elif fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield InvalidRecord(f"Invalid JSON: {e.msg}")
+                continue
+            yield record if isinstance(record, dict) else InvalidRecord('Each line must be a JSON object.')
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+class _InlineExecutor:
+    """Hashes in the calling thread; for small imports (workers=0)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, fn, *iterables, chunksize=1):
+        return map(fn, *iterables)
+
+
+def _init_hash_worker():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_password(password):
+    """Validate and hash a password in a pool worker, returning (hash, error)"""
+    if not password:
+        return make_password(None), None
+    try:
+        validate_password(password)
+    except ValidationError as e:
+        return None, ' '.join(e.messages)
+    return make_password(password), None
+
+
+class ImportReport:
+    """Counters and throughput for an import run"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    @property
+    def elapsed(self):
+        end = self.finished_at or time.monotonic()
+        return end - self.started_at
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, row_number, email, reason):
+        self.skipped += 1
+        self.errors.append({'row': row_number, 'email': email, 'error': reason})
+
+    def as_dict(self, max_errors=100):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'skipped': self.skipped,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'errors': self.errors[:max_errors],
+            'error_count': len(self.errors),
+        }
+
+
+class UserImporter:
+    """Import users in batches; see module docstring"""
+
+    def __init__(self, batch_size=1000, workers=None, default_user_type='patient',
+                 referred_by=None, progress=None):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.default_user_type = default_user_type
+        self.referred_by = referred_by
+        self.progress = progress
+        self._seen_emails = set()
+
+    def _executor(self):
+        if self.workers == 0:
+            return _InlineExecutor()
+        # Forked hash workers must not inherit live database sockets
+        connections.close_all()
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_hash_worker)
+
+    def run(self, records):
+        report = ImportReport()
+        with self._executor() as executor:
+            numbered = enumerate(records, start=1)
+            while True:
+                batch = list(islice(numbered, self.batch_size))
+                if not batch:
+                    break
+                report.rows += len(batch)
+                self._import_batch(batch, executor, report)
+                if self.progress:
+                    self.progress(report)
+        report.finished_at = time.monotonic()
+        return report
+
+    def _normalize(self, record):
+        data = {field: str(record.get(field) or '').strip() for field in IMPORT_FIELDS}
+        data['email'] = User.objects.normalize_email(data['email'])
+        data['user_type'] = data['user_type'] or self.default_user_type
+        return data
+
+    def _validate(self, batch, report):
+        """Validate a batch in set form, returning the rows that can be created"""
+        candidates = []
+        for row_number, record in batch:
+            if isinstance(record, InvalidRecord):
+                report.add_error(row_number, '', record.reason)
+                continue
+            data = self._normalize(record)
+            email = data['email']
+            try:
+                validate_email(email)
+            except ValidationError:
+                report.add_error(row_number, email, 'Invalid email address.')
+                continue
+            if data['user_type'] not in USER_TYPES:
+                report.add_error(row_number, email, f"Invalid user_type: {data['user_type']}")
+                continue
+            if email in self._seen_emails:
+                report.add_error(row_number, email, 'Duplicate email in import.')
+                continue
+            self._seen_emails.add(email)
+            candidates.append((row_number, data))
+
+        emails = [data['email'] for _, data in candidates]
+        usernames = [data['username'] for _, data in candidates if data['username']]
+        existing_emails = set()
+        existing_usernames = set()
+        for email, username in User.objects.filter(
+            Q(email__in=emails) | Q(username__in=usernames)
+        ).values_list('email', 'username'):
+            existing_emails.add(email)
+            existing_usernames.add(username)
+
+        valid = []
+        batch_usernames = set()
+        for row_number, data in candidates:
+            if data['email'] in existing_emails:
+                report.add_error(row_number, data['email'], 'A user with this email already exists.')
+                continue
+            username = data['username']
+            if username and (username in existing_usernames or username in batch_usernames):
+                report.add_error(row_number, data['email'], 'A user with this username already exists.')
+                continue
+            if username:
+                batch_usernames.add(username)
+            valid.append((row_number, data))
+        return valid, batch_usernames
+
+    def _import_batch(self, batch, executor, report, retry=True):
+        valid, batch_usernames = self._validate(batch, report)
+        if not valid:
+            return
+
+        hashes = list(executor.map(
+            _hash_password,
+            [data['password'] for _, data in valid],
+            chunksize=max(1, len(valid) // ((self.workers or 4) * 4)),
+        ))
+
+        rows = []
+        for (row_number, data), (password_hash, error) in zip(valid, hashes):
+            if error:
+                report.add_error(row_number, data['email'], error)
+                continue
+            rows.append((row_number, data, password_hash))
+        if not rows:
+            return
+
+        missing = [data for _, data, _ in rows if not data['username']]
+        generated = iter(allocate_usernames(
+            [username_base_from_email(data['email']) for data in missing],
+            reserved=batch_usernames,
+        ))
+        for data in missing:
+            data['username'] = next(generated)
+
+        codes = allocate_referral_codes(len(rows))
+        users = [
+            User(
+                email=data['email'],
+                username=data['username'],
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                user_type=data['user_type'],
+                phone_number=data['phone_number'] or None,
+                password=password_hash,
+                referral_code=code,
+                referred_by=self.referred_by,
+            )
+            for (_, data, password_hash), code in zip(rows, codes)
+        ]
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                # bulk_create skips post_save, so profiles are created here
+                Profile.objects.bulk_create([Profile(user=user) for user in users])
+        except IntegrityError:
+            if not retry:
+                self._create_one_by_one(rows, users, report)
+                return
+            # A concurrent signup claimed an email or username; re-validate once
+            for data in missing:
+                data['username'] = ''
+            for _, data, _ in rows:
+                self._seen_emails.discard(data['email'])
+            retry_batch = [(row_number, data) for row_number, data, _ in rows]
+            self._import_batch(retry_batch, executor, report, retry=False)
+            return
+
+        report.created += len(users)
+
+    def _create_one_by_one(self, rows, users, report):
+        """Last resort after a retried batch still conflicts: save row by row, reporting failures"""
+        for (row_number, data, _), user in zip(rows, users):
+            user.pk = None
+            try:
+                # post_save creates the profile
+                with transaction.atomic():
+                    user.save(force_insert=True)
+            except IntegrityError:
+                report.add_error(row_number, data['email'], 'A user with this email or username already exists.')
+                continue
+            report.created += 1
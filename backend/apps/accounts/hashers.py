@@ -0,0 +1,25 @@
+"""
+Password hashers whose cost is configured from settings.
+
+The algorithm names are unchanged, so existing hashes keep verifying and
+Django rehashes them on the next successful login whenever the configured
+cost (or the preferred algorithm) changes.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher
+)
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = getattr(settings, 'PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class ConfigurableArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+    memory_cost = getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+    parallelism = getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class ConfigurableScryptPasswordHasher(ScryptPasswordHasher):
+    work_factor = getattr(settings, 'SCRYPT_WORK_FACTOR', ScryptPasswordHasher.work_factor)
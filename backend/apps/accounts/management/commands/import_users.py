@@ -0,0 +1,62 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounts.bulk_import import IMPORT_FORMATS, UserImporter, detect_format, iter_records
+from apps.accounts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Bulk import users from a CSV or JSONL file (use "-" for stdin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV/JSONL file with one user per row')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Input format (guessed from extension)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes')
+        parser.add_argument('--user-type', default='patient', help='Default user_type for rows without one')
+        parser.add_argument('--referred-by', help='Email of the doctor/clinic account referring all imported users')
+
+    def handle(self, *args, **options):
+        referred_by = None
+        if options['referred_by']:
+            try:
+                referred_by = User.objects.get(email=options['referred_by'])
+            except User.DoesNotExist:
+                raise CommandError(f"User not found: {options['referred_by']}")
+
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+
+        importer = UserImporter(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            default_user_type=options['user_type'],
+            referred_by=referred_by,
+            progress=self._print_progress,
+        )
+
+        try:
+            if path == '-':
+                report = importer.run(iter_records(sys.stdin, fmt))
+            else:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    report = importer.run(iter_records(stream, fmt))
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Batches before the unreadable one are already committed
+            raise CommandError(f"Could not read {path}: {e}")
+
+        for error in report.errors:
+            self.stderr.write(f"Row {error['row']} ({error['email']}): {error['error']}")
+
+        summary = report.as_dict(max_errors=0)
+        summary.pop('errors')
+        self.stdout.write(self.style.SUCCESS(json.dumps(summary)))
+
+    def _print_progress(self, report):
+        self.stdout.write(
+            f"{report.rows} rows, {report.created} created, {report.skipped} skipped "
+            f"({report.rows_per_second:.0f} rows/s)"
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounts.token_maintenance import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding/blacklisted JWT tokens in small primary-key chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.1, help='Seconds to pause between chunks')
+        parser.add_argument('--max-chunks', type=int, default=None, help='Stop after this many chunks')
+
+    def handle(self, *args, **options):
+        result = purge_expired_tokens(
+            chunk_size=options['chunk_size'],
+            sleep_seconds=options['sleep'],
+            max_chunks=options['max_chunks'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {result['outstanding_deleted']} outstanding and "
+            f"{result['blacklisted_deleted']} blacklisted tokens in {result['chunks']} chunks"
+        ))
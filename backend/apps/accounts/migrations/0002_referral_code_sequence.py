@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE SEQUENCE IF NOT EXISTS accounts_referral_code_seq',
+            reverse_sql='DROP SEQUENCE IF EXISTS accounts_referral_code_seq',
+        ),
+    ]
@@ -2,7 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from .models import User, Profile
-import uuid
+from .allocators import allocate_referral_code, allocate_username, username_base_from_email
 
 
 class ProfileSerializer(serializers.ModelSerializer):
@@ -63,21 +63,12 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         
         # Generate username if not provided
         if not validated_data.get('username'):
-            email = validated_data['email']
-            base_username = email.split('@')[0]
-            username = base_username
-            counter = 1
-            while User.objects.filter(username=username).exists():
-                username = f"{base_username}{counter}"
-                counter += 1
-            validated_data['username'] = username
+            validated_data['username'] = allocate_username(
+                username_base_from_email(validated_data['email'])
+            )
         
         # Generate unique referral code for this user
-        user_referral_code = str(uuid.uuid4())[:8].upper()
-        while User.objects.filter(referral_code=user_referral_code).exists():
-            user_referral_code = str(uuid.uuid4())[:8].upper()
-        
-        validated_data['referral_code'] = user_referral_code
+        validated_data['referral_code'] = allocate_referral_code()
         
         # Handle referral (if user was referred by someone)
         if referral_code_used:
@@ -87,11 +78,9 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             except User.DoesNotExist:
                 pass  # Invalid referral code, ignore
         
+        # The create_user_profile signal creates the profile
         user = User.objects.create_user(password=password, **validated_data)
         
-        # Create profile if it doesn't exist
-        Profile.objects.get_or_create(user=user)
-        
         return user
 
 
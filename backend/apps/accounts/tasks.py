@@ -0,0 +1,27 @@
+"""
+Celery tasks for account maintenance
+"""
+from celery import shared_task
+import logging
+
+# Configures the Celery app that .delay() sends through
+import clinical_platform.celery  # noqa: F401
+
+from .token_maintenance import purge_expired_tokens as purge_expired_tokens_in_chunks
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def purge_expired_tokens(chunk_size=1000, sleep_seconds=0.1, max_chunks=None):
+    """
+    Purge expired JWT tokens in bounded chunks
+    Runs hourly so each run only has a small backlog
+    """
+    result = purge_expired_tokens_in_chunks(
+        chunk_size=chunk_size,
+        sleep_seconds=sleep_seconds,
+        max_chunks=max_chunks,
+    )
+    logger.info(f"🧹 Purged {result['outstanding_deleted']} expired tokens in {result['chunks']} chunks")
+    return {**result, 'status': 'success'}
@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from .allocators import assign_usernames
+from .token_blacklist import BlacklistBloom
+
+
+class AssignUsernamesTests(SimpleTestCase):
+    def test_repeated_bases_get_distinct_names(self):
+        self.assertEqual(assign_usernames(['bob', 'bob', 'bob'], set()), ['bob', 'bob1', 'bob2'])
+
+    def test_base_that_is_another_base_plus_digits(self):
+        self.assertEqual(assign_usernames(['bob', 'bob', 'bob1'], set()), ['bob', 'bob1', 'bob11'])
+
+    def test_existing_name_shared_across_bases(self):
+        self.assertEqual(assign_usernames(['info', 'info1'], {'info'}), ['info1', 'info11'])
+
+    def test_picks_are_added_to_taken(self):
+        taken = {'ann'}
+        assign_usernames(['ann'], taken)
+        self.assertEqual(taken, {'ann', 'ann1'})
+
+
+class BlacklistBloomTests(TestCase):
+    def blacklist(self, jti, **fields):
+        token = OutstandingToken.objects.create(
+            jti=jti, token=jti, expires_at=timezone.now() + timedelta(days=1),
+        )
+        return BlacklistedToken.objects.create(token=token, **fields)
+
+    def test_fresh_filter_answers_without_a_refresh_interval(self):
+        self.assertFalse(BlacklistBloom().might_contain('unknown'))
+
+    def test_blacklisted_elsewhere_is_seen_on_the_next_check(self):
+        bloom = BlacklistBloom()
+        self.assertFalse(bloom.might_contain('revoked'))
+        self.blacklist('revoked')
+        self.assertTrue(bloom.might_contain('revoked'))
+
+    def test_row_committed_below_a_seen_id_is_picked_up(self):
+        first = self.blacklist('first')
+        bloom = BlacklistBloom()
+        bloom.sync()
+        # The insert holding first.id + 1 commits after first.id + 2
+        self.blacklist('later', id=first.id + 2)
+        self.assertFalse(bloom.might_contain('slow'))
+        self.blacklist('slow', id=first.id + 1)
+        self.assertTrue(bloom.might_contain('slow'))
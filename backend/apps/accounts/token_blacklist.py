@@ -0,0 +1,165 @@
+"""
+In-memory bloom filter of blacklisted refresh-token JTIs.
+
+simplejwt checks the blacklist with a join of the outstanding and
+blacklisted token tables per refresh. A per-process bloom filter
+answers instead, and a "maybe" falls through to the regular query.
+
+A miss is not trusted as is: the filter first catches up with blacklist
+rows inserted since its last sync (a primary-key range scan that
+usually returns nothing, shared by concurrent refreshes), so a token
+blacklisted by another process is rejected immediately. Sequence values
+skipped by in-flight inserts are re-read until their rows appear.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistBloom:
+    """Process-local bloom filter kept in sync with BlacklistedToken"""
+
+    # Ids this far below the newest one are checked for rows still being inserted at a rebuild
+    GAP_WINDOW = 1000
+    # A gap still empty after this long was a rolled-back insert
+    GAP_TIMEOUT = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._last_id = 0
+        # id -> monotonic time first seen missing
+        self._gaps = {}
+        self._synced_at = -math.inf
+
+    def _rebuild(self, capacity):
+        bloom = BloomFilter(capacity)
+        last_id = 0
+        rows = BlacklistedToken.objects.filter(
+            token__expires_at__gt=timezone.now()
+        ).values_list('id', 'token__jti').iterator(chunk_size=10000)
+        for row_id, jti in rows:
+            bloom.add(jti)
+            last_id = max(last_id, row_id)
+        # Expired rows were skipped, so only ids missing from the table are gaps
+        present = set(BlacklistedToken.objects.filter(
+            id__gt=last_id - self.GAP_WINDOW, id__lte=last_id
+        ).values_list('id', flat=True))
+        now = time.monotonic()
+        self._filter = bloom
+        self._last_id = last_id
+        self._gaps = {
+            row_id: now for row_id in range(max(last_id - self.GAP_WINDOW, 0) + 1, last_id + 1)
+            if row_id not in present
+        }
+
+    def _catch_up(self):
+        """Add rows inserted since the last sync, including ones that filled a gap"""
+        now = time.monotonic()
+        rows = BlacklistedToken.objects.filter(
+            Q(id__gt=self._last_id) | Q(id__in=list(self._gaps))
+        ).values_list('id', 'token__jti')
+        seen = set()
+        for row_id, jti in rows:
+            self._filter.add(jti)
+            seen.add(row_id)
+        for row_id in seen:
+            self._gaps.pop(row_id, None)
+        # A sequence value below the newest one whose row is not visible yet
+        newest = max(seen, default=self._last_id)
+        for row_id in range(self._last_id + 1, newest):
+            if row_id not in seen:
+                self._gaps[row_id] = now
+        self._last_id = max(self._last_id, newest)
+        self._gaps = {row_id: since for row_id, since in self._gaps.items() if now - since < self.GAP_TIMEOUT}
+
+    def sync(self):
+        """
+        Bring the filter up to date with the table. Calls that start while
+        another thread is syncing wait for it and run their own pass only
+        if that one started before them.
+        """
+        started = time.monotonic()
+        with self._lock:
+            if self._synced_at >= started:
+                return
+            self._synced_at = time.monotonic()
+            capacity = getattr(settings, 'JWT_BLACKLIST_BLOOM_CAPACITY', 100000)
+            if self._filter is None:
+                self._rebuild(capacity)
+            else:
+                self._catch_up()
+                if self._filter.count > self._filter.capacity:
+                    # Past capacity the false-positive rate climbs; start over bigger
+                    self._rebuild(max(capacity, self._filter.count * 2))
+
+    def might_contain(self, jti):
+        """
+        False only if `jti` is not blacklisted in the database: a miss is
+        re-checked after catching up with rows other processes inserted.
+        """
+        if self._filter is not None and jti in self._filter:
+            return True
+        self.sync()
+        return jti in self._filter
+
+    def add(self, jti):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+
+blacklist_bloom = BlacklistBloom()
+
+
+class BloomRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist check consults the bloom filter first"""
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if not blacklist_bloom.might_contain(jti):
+            return
+        super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_bloom.add(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+class BloomTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = BloomRefreshToken
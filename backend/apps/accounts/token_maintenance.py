@@ -0,0 +1,55 @@
+"""
+Incremental purge of expired JWT blacklist rows.
+
+Rows are removed in bounded primary-key chunks with a pause between
+chunks, so the purge never holds long locks on the token tables while
+LogoutView keeps inserting blacklist entries.
+"""
+import logging
+import time
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+logger = logging.getLogger(__name__)
+
+
+def purge_expired_tokens(chunk_size=1000, sleep_seconds=0.1, max_chunks=None):
+    """Delete outstanding (and blacklisted) tokens that have expired"""
+    now = timezone.now()
+    last_id = 0
+    chunks = 0
+    purged_outstanding = 0
+    purged_blacklisted = 0
+
+    while max_chunks is None or chunks < max_chunks:
+        ids = list(
+            OutstandingToken.objects.filter(id__gt=last_id, expires_at__lt=now)
+            .order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+
+        with transaction.atomic():
+            blacklisted, _ = BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            outstanding, _ = OutstandingToken.objects.filter(id__in=ids).delete()
+
+        purged_blacklisted += blacklisted
+        purged_outstanding += outstanding
+        last_id = ids[-1]
+        chunks += 1
+        logger.info(f"Purged token chunk up to id {last_id}: {len(ids)} outstanding, {blacklisted} blacklisted")
+
+        if len(ids) < chunk_size:
+            break
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    return {
+        'chunks': chunks,
+        'outstanding_deleted': purged_outstanding,
+        'blacklisted_deleted': purged_blacklisted,
+        'last_id': last_id,
+    }
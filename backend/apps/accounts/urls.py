@@ -1,16 +1,18 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
+from .token_blacklist import BloomTokenRefreshSerializer
 from .views import (
     RegisterView, LoginView, LogoutView, ProfileView,
-    ChangePasswordView, check_referral_code
+    ChangePasswordView, BulkUserImportView, check_referral_code
 )
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
+    path('import/', BulkUserImportView.as_view(), name='bulk_user_import'),
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('profile/', ProfileView.as_view(), name='profile'),
     path('change-password/', ChangePasswordView.as_view(), name='change_password'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', TokenRefreshView.as_view(serializer_class=BloomTokenRefreshSerializer), name='token_refresh'),
     path('referral/<str:code>/', check_referral_code, name='check_referral_code'),
 ]
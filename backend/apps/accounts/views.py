@@ -1,10 +1,17 @@
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import login, logout
+from django.contrib.auth.models import update_last_login
+import csv
+import io
+from .bulk_import import IMPORT_FORMATS, UserImporter, detect_format, iter_records
 from .models import User, Profile
+from .token_blacklist import BloomRefreshToken
 from .serializers import (
     UserRegistrationSerializer, LoginSerializer, UserSerializer,
     PasswordChangeSerializer, ProfileSerializer
@@ -34,6 +41,65 @@ class RegisterView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BulkUserImportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+    
+    def post(self, request):
+        """Import a CSV/JSONL roster of users uploaded as 'file'"""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({
+                'error': 'file is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        fmt = request.data.get('format') or detect_format(upload.name)
+        if fmt not in IMPORT_FORMATS:
+            return Response({
+                'error': f'format must be one of: {", ".join(IMPORT_FORMATS)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        referred_by = None
+        referred_by_email = request.data.get('referred_by')
+        if referred_by_email:
+            try:
+                referred_by = User.objects.get(email=referred_by_email)
+            except User.DoesNotExist:
+                return Response({
+                    'error': 'Invalid referred_by user'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if upload.size > settings.BULK_IMPORT_MAX_UPLOAD_BYTES:
+            return Response({
+                'error': 'File too large for a request import; use "manage.py import_users" instead'
+            }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        
+        try:
+            content = upload.read().decode('utf-8')
+        except UnicodeDecodeError:
+            return Response({
+                'error': 'file must be UTF-8 encoded'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Small files only, so passwords are hashed in this thread rather than a process pool
+        importer = UserImporter(
+            workers=0,
+            default_user_type=request.data.get('user_type') or 'patient',
+            referred_by=referred_by,
+        )
+        try:
+            report = importer.run(iter_records(io.StringIO(content, newline=''), fmt))
+        except csv.Error as e:
+            return Response({
+                'error': f'Invalid CSV: {e}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'message': 'Import finished',
+            'report': report.as_dict()
+        }, status=status.HTTP_200_OK)
+
+
 class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
     
@@ -42,8 +108,11 @@ class LoginView(APIView):
         if serializer.is_valid():
             user = serializer.validated_data['user']
             
-            # Django session login
-            login(request, user)
+            if settings.API_SESSION_AUTH:
+                # Django session login
+                login(request, user)
+            elif settings.SIMPLE_JWT.get('UPDATE_LAST_LOGIN'):
+                update_last_login(None, user)
             
             # Generate JWT tokens
             refresh = RefreshToken.for_user(user)
@@ -65,10 +134,11 @@ class LogoutView(APIView):
         try:
             refresh_token = request.data.get('refresh_token')
             if refresh_token:
-                token = RefreshToken(refresh_token)
+                token = BloomRefreshToken(refresh_token)
                 token.blacklist()
             
-            logout(request)
+            if settings.API_SESSION_AUTH:
+                logout(request)
             return Response({
                 'message': 'Logout successful'
             }, status=status.HTTP_200_OK)
@@ -1,6 +1,10 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils import timezone
-from .models import AffiliateCommission, AffiliateStats, PayoutRequest
+from .ledger import cancel_commissions, credit_commissions
+from .models import AffiliateBalance, AffiliateCommission, AffiliateStats, LedgerEntry, PayoutRequest
+from .settlement import settle_commissions
+from .stats import refresh_affiliate_stats
 
 
 @admin.register(AffiliateCommission)
@@ -11,6 +15,28 @@ class AffiliateCommissionAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
     actions = ['mark_as_paid', 'mark_as_cancelled']
     
+    # Amounts and status only change through the ledger (the actions below)
+    ledger_fields = ('commission_amount', 'status', 'paid_at', 'payout_request')
+    
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return self.readonly_fields + ('status', 'paid_at', 'payout_request')
+        return self.readonly_fields + ('affiliate',) + self.ledger_fields
+    
+    def save_model(self, request, obj, form, change):
+        if change:
+            super().save_model(request, obj, form, change)
+            return
+        # New commissions are credited like every other source of commissions
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            credit_commissions([obj])
+            refresh_affiliate_stats([obj.affiliate_id])
+    
+    def has_delete_permission(self, request, obj=None):
+        # Cancel instead, which posts a reversal
+        return False
+    
     def affiliate_email(self, obj):
         return obj.affiliate.email
     affiliate_email.short_description = 'Affiliate'
@@ -20,13 +46,17 @@ class AffiliateCommissionAdmin(admin.ModelAdmin):
     referred_user_email.short_description = 'Referred User'
     
     def mark_as_paid(self, request, queryset):
-        updated = queryset.update(status='paid', paid_at=timezone.now())
-        self.message_user(request, f'{updated} commissions marked as paid.')
+        result = settle_commissions(queryset, notes=f'Settled from admin by {request.user.email}')
+        self.message_user(
+            request,
+            f"{result['commissions']} commissions marked as paid "
+            f"(${result['amount']:.2f}, {result['affiliates']} payout requests)."
+        )
     mark_as_paid.short_description = 'Mark selected commissions as paid'
     
     def mark_as_cancelled(self, request, queryset):
-        updated = queryset.update(status='cancelled')
-        self.message_user(request, f'{updated} commissions marked as cancelled.')
+        affiliate_ids = cancel_commissions(queryset, reason=f'Cancelled from admin by {request.user.email}')
+        self.message_user(request, f'Commissions of {len(affiliate_ids)} affiliates marked as cancelled and reversed.')
     mark_as_cancelled.short_description = 'Mark selected commissions as cancelled'
 
 
@@ -50,10 +80,10 @@ class AffiliateStatsAdmin(admin.ModelAdmin):
 
 @admin.register(PayoutRequest)
 class PayoutRequestAdmin(admin.ModelAdmin):
-    list_display = ('affiliate_email', 'amount', 'status', 'payment_method', 'created_at', 'processed_at')
+    list_display = ('affiliate_email', 'amount', 'status', 'payment_method', 'rail_reference', 'created_at', 'processed_at')
     list_filter = ('status', 'payment_method', 'created_at')
     search_fields = ('affiliate__email',)
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('rail_reference', 'created_at', 'updated_at')
     actions = ['approve_payout', 'reject_payout']
     
     fieldsets = (
@@ -64,7 +94,7 @@ class PayoutRequestAdmin(admin.ModelAdmin):
             'fields': ('payment_details',)
         }),
         ('Processing Information', {
-            'fields': ('processed_at', 'rejection_reason', 'admin_notes')
+            'fields': ('processed_at', 'rail_reference', 'rejection_reason', 'admin_notes')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -77,17 +107,50 @@ class PayoutRequestAdmin(admin.ModelAdmin):
     affiliate_email.short_description = 'Affiliate'
     
     def approve_payout(self, request, queryset):
-        updated = queryset.filter(status='pending').update(
-            status='completed',
-            processed_at=timezone.now()
+        # Failed requests can be approved again; the payout engine pays them
+        updated = queryset.filter(status__in=['pending', 'failed']).update(
+            status='approved',
+            rejection_reason=None,
+            processed_at=None
         )
-        self.message_user(request, f'{updated} payout requests approved.')
+        self.message_user(request, f'{updated} payout requests approved; the next payout run pays them.')
     approve_payout.short_description = 'Approve selected payout requests'
     
     def reject_payout(self, request, queryset):
-        updated = queryset.filter(status='pending').update(
+        updated = queryset.filter(status__in=['pending', 'approved']).update(
             status='rejected',
             processed_at=timezone.now()
         )
         self.message_user(request, f'{updated} payout requests rejected.')
     reject_payout.short_description = 'Reject selected payout requests'
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('affiliate', 'entry_type', 'amount', 'commission_id', 'payout_request_id', 'created_at')
+    list_filter = ('entry_type', 'created_at')
+    search_fields = ('affiliate__email',)
+    list_select_related = ('affiliate',)
+    
+    # Append-only: entries are written by the ledger module only
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AffiliateBalance)
+class AffiliateBalanceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'balance', 'credited', 'debited', 'reversed', 'updated_at')
+    search_fields = ('user__email',)
+    list_select_related = ('user',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,8 @@
+from django.conf import settings
+
+from clinical_platform.cache import tiered_cache
+
+# Affiliate health report served by the health endpoint; expires only, never invalidated
+affiliate_health_cache = tiered_cache(
+    'affiliate-health', timeout=settings.AFFILIATE_HEALTH_CACHE_SECONDS, local_timeout=5,
+)
@@ -0,0 +1,96 @@
+"""
+Affiliate system health: counters, issues and top affiliates.
+
+All counters come back from one statement (queries.count_all).
+Payments without a commission are found with a NOT EXISTS anti-join
+rather than a per-payment exists() check.
+
+``affiliate_health()`` serves the cached report (see caches.py), so the
+JSON endpoint can be scraped every minute; the CLI computes it fresh.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.accounts.allocators import users_without_referral_code
+from apps.subscriptions.models import Payment
+from .caches import affiliate_health_cache
+from .models import AffiliateCommission, AffiliateStats, PayoutRequest
+from .queries import count_all, top_affiliates, unprocessed_payments
+
+User = get_user_model()
+
+STALE_STATS_AFTER = timedelta(days=1)
+OLD_PENDING_AFTER = timedelta(days=30)
+RECENT_PAYMENTS_WINDOW = timedelta(hours=2)
+
+# counter: (severity, message, suggested fix)
+CHECKS = {
+    'recent_unprocessed_payments': (
+        'error', 'recent payments without commissions',
+        'python manage.py affiliates reconcile --phase commissions --since-days 1',
+    ),
+    'unprocessed_payments': (
+        'warning', 'payments without commissions', 'python manage.py affiliates reconcile --phase commissions',
+    ),
+    'users_without_referral_code': (
+        'warning', 'users without referral code', 'python manage.py affiliates backfill-codes',
+    ),
+    'old_pending_commissions': (
+        'warning', f"commissions pending for more than {OLD_PENDING_AFTER.days} days",
+        'python manage.py affiliates pay --affiliate EMAIL',
+    ),
+    'failed_payouts': (
+        'warning', 'failed payout requests', 'approve them again in the admin after fixing the payment details',
+    ),
+    'stale_stats': (
+        'warning', 'affiliate stats older than a day', 'python manage.py affiliates refresh-stats',
+    ),
+}
+
+
+def counters(now=None):
+    now = now or timezone.now()
+    last_24h = now - timedelta(hours=24)
+    referred_payments = Payment.objects.filter(status='succeeded', subscription__user__referred_by__isnull=False)
+    return count_all(
+        affiliates=User.objects.exclude(Q(referral_code__isnull=True) | Q(referral_code='')),
+        referred_users=User.objects.filter(referred_by__isnull=False),
+        commissions=AffiliateCommission.objects.all(),
+        new_referrals_24h=User.objects.filter(referred_by__isnull=False, date_joined__gte=last_24h),
+        new_payments_24h=referred_payments.filter(created_at__gte=last_24h),
+        new_commissions_24h=AffiliateCommission.objects.filter(created_at__gte=last_24h),
+        unprocessed_payments=unprocessed_payments(),
+        recent_unprocessed_payments=unprocessed_payments().filter(created_at__gte=now - RECENT_PAYMENTS_WINDOW),
+        users_without_referral_code=users_without_referral_code(),
+        old_pending_commissions=AffiliateCommission.objects.filter(
+            status='pending', created_at__lt=now - OLD_PENDING_AFTER,
+        ),
+        failed_payouts=PayoutRequest.objects.filter(status='failed'),
+        stale_stats=AffiliateStats.objects.filter(last_updated__lt=now - STALE_STATS_AFTER),
+    )
+
+
+def build_health_report(top=5):
+    now = timezone.now()
+    counts = counters(now)
+    issues = [
+        {'check': name, 'severity': severity, 'count': counts[name], 'message': message, 'fix': fix}
+        for name, (severity, message, fix) in CHECKS.items()
+        if counts[name]
+    ]
+    severities = {issue['severity'] for issue in issues}
+    return {
+        'status': 'error' if 'error' in severities else 'warning' if severities else 'ok',
+        'generated_at': now,
+        'counters': counts,
+        'issues': issues,
+        'top_affiliates': list(top_affiliates(top)),
+    }
+
+
+def affiliate_health():
+    """The health report, recomputed at most once per cache timeout across workers"""
+    return affiliate_health_cache.get_or_set('report', build_health_report)
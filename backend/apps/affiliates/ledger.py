@@ -0,0 +1,227 @@
+"""
+Commission ledger: append-only entries and materialized balances.
+
+Every balance change is a LedgerEntry (credit +, debit -, reversal -)
+and is folded into the affiliate's AffiliateBalance by the same
+statement that writes it, so reading a balance is a primary-key lookup.
+The ledger insert and the balance upsert are one statement of
+data-modifying CTEs; settlement.py embeds the same upsert for debits.
+
+A daily BalanceSnapshot per affiliate bounds history queries: the
+balance at any moment is the last snapshot taken before it plus a range
+scan of the entries in between.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import AffiliateBalance, AffiliateCommission, BalanceSnapshot, LedgerEntry
+from .stats import refresh_affiliate_stats
+
+logger = logging.getLogger(__name__)
+
+LEDGER_COLUMNS = ('affiliate_id', 'entry_type', 'amount', 'commission_id', 'payout_request_id', 'description', 'created_at')
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def balance_upsert_sql(source):
+    """
+    INSERT ... ON CONFLICT that adds the (affiliate_id, entry_type, amount)
+    rows of `source` to AffiliateBalance; takes one parameter, updated_at.
+    """
+    return f"""
+    INSERT INTO {_table(AffiliateBalance)} AS b (user_id, balance, credited, debited, reversed, updated_at)
+    SELECT affiliate_id,
+           SUM(amount),
+           COALESCE(SUM(amount) FILTER (WHERE entry_type = 'credit'), 0),
+           COALESCE(-SUM(amount) FILTER (WHERE entry_type = 'debit'), 0),
+           COALESCE(-SUM(amount) FILTER (WHERE entry_type = 'reversal'), 0),
+           %s
+    FROM {source}
+    GROUP BY affiliate_id
+    ON CONFLICT (user_id) DO UPDATE SET
+        balance = b.balance + EXCLUDED.balance,
+        credited = b.credited + EXCLUDED.credited,
+        debited = b.debited + EXCLUDED.debited,
+        reversed = b.reversed + EXCLUDED.reversed,
+        updated_at = EXCLUDED.updated_at
+    """
+
+
+def post_entries(entries, now=None):
+    """
+    Append entries, each a tuple in LEDGER_COLUMNS order (created_at may be
+    None for now), and apply them to the balances in the same statement.
+    """
+    if not entries:
+        return 0
+    now = now or timezone.now()
+    placeholders = ', '.join([f"({', '.join(['%s'] * len(LEDGER_COLUMNS))})"] * len(entries))
+    sql = f"""
+    WITH posted AS (
+        INSERT INTO {_table(LedgerEntry)} ({', '.join(LEDGER_COLUMNS)})
+        VALUES {placeholders}
+        RETURNING affiliate_id, entry_type, amount
+    )
+    {balance_upsert_sql('posted')}
+    """
+    params = [value for entry in entries for value in (*entry[:-1], entry[-1] or now)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, now])
+    return len(entries)
+
+
+def credit_commissions(commissions):
+    """Credit newly created commissions (saved instances)"""
+    return post_entries([
+        (commission.affiliate_id, 'credit', commission.commission_amount, commission.id, None,
+         f"Commission {commission.id}", None)
+        for commission in commissions
+    ])
+
+
+def _reversed_sql():
+    """Amount already reversed per commission, as (commission_id, amount)"""
+    return f"""
+    SELECT commission_id, -SUM(amount) AS amount FROM {_table(LedgerEntry)}
+    WHERE entry_type = 'reversal' AND commission_id IS NOT NULL
+    GROUP BY commission_id
+    """
+
+
+def cancel_commissions(commissions, reason='Cancelled'):
+    """
+    Cancel the commissions in `commissions` (a queryset) that are not
+    cancelled yet and post a reversal for what is left of each after
+    earlier partial reversals, in one statement. A paid commission
+    reversed this way leaves the affiliate owing it back.
+    """
+    now = timezone.now()
+    selection, selection_params = commissions.order_by().values('pk').query.sql_with_params()
+    sql = f"""
+    WITH cancelled AS (
+        UPDATE {_table(AffiliateCommission)} AS c
+        SET status = 'cancelled', updated_at = %s
+        WHERE c.status <> 'cancelled' AND c.id IN ({selection})
+        RETURNING c.id, c.affiliate_id, c.commission_amount
+    ),
+    reversed AS ({_reversed_sql()}),
+    posted AS (
+        INSERT INTO {_table(LedgerEntry)} ({', '.join(LEDGER_COLUMNS)})
+        SELECT c.affiliate_id, 'reversal', -(c.commission_amount - COALESCE(r.amount, 0)), c.id, NULL, %s, %s
+        FROM cancelled c LEFT JOIN reversed r ON r.commission_id = c.id
+        WHERE c.commission_amount > COALESCE(r.amount, 0)
+        RETURNING affiliate_id, entry_type, amount
+    ),
+    balances AS ({balance_upsert_sql('posted')})
+    SELECT DISTINCT affiliate_id FROM cancelled
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [now, *selection_params, reason, now, now])
+            affiliate_ids = [row[0] for row in cursor.fetchall()]
+        refresh_affiliate_stats(affiliate_ids)
+    logger.info('Commissions cancelled', extra={'affiliates': len(affiliate_ids), 'reason': reason})
+    return affiliate_ids
+
+
+def reverse_commission_share(commissions, share, reason='Partial refund'):
+    """
+    Reverse `share` (0..1) of each commission in `commissions` (a queryset)
+    that is not cancelled, net of what earlier reversals already took
+    back, without cancelling it. Calling it again with the same share
+    posts nothing, so cumulative refund events can be replayed.
+    """
+    now = timezone.now()
+    selection, selection_params = commissions.order_by().values('pk').query.sql_with_params()
+    sql = f"""
+    WITH reversed AS ({_reversed_sql()}),
+    due AS (
+        SELECT c.id, c.affiliate_id, ROUND(c.commission_amount * %s, 2) - COALESCE(r.amount, 0) AS amount
+        FROM {_table(AffiliateCommission)} c LEFT JOIN reversed r ON r.commission_id = c.id
+        WHERE c.status <> 'cancelled' AND c.id IN ({selection})
+    ),
+    posted AS (
+        INSERT INTO {_table(LedgerEntry)} ({', '.join(LEDGER_COLUMNS)})
+        SELECT affiliate_id, 'reversal', -amount, id, NULL, %s, %s FROM due
+        WHERE amount > 0
+        RETURNING affiliate_id, entry_type, amount
+    ),
+    balances AS ({balance_upsert_sql('posted')})
+    SELECT COUNT(*) FROM posted
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [share, *selection_params, reason, now, now])
+        posted = cursor.fetchone()[0]
+    logger.info('Commissions partially reversed', extra={'entries': posted, 'reason': reason})
+    return posted
+
+
+def balance_of(affiliate_id):
+    """Current balance, a single-row lookup"""
+    balance = AffiliateBalance.objects.filter(user_id=affiliate_id).values_list('balance', flat=True).first()
+    return balance if balance is not None else Decimal('0.00')
+
+
+def balance_at(affiliate_id, moment):
+    """Balance at `moment`: the last snapshot taken before it plus the entries since"""
+    snapshot = (
+        BalanceSnapshot.objects.filter(affiliate_id=affiliate_id, taken_at__lte=moment)
+        .order_by('-taken_at').values('taken_at', 'balance').first()
+    )
+    entries = LedgerEntry.objects.filter(affiliate_id=affiliate_id, created_at__lte=moment)
+    start = Decimal('0.00')
+    if snapshot:
+        start = snapshot['balance']
+        entries = entries.filter(created_at__gt=snapshot['taken_at'])
+    return start + (entries.aggregate(total=Sum('amount'))['total'] or Decimal('0.00'))
+
+
+def take_balance_snapshots(taken_on=None):
+    """Copy every AffiliateBalance into a snapshot for `taken_on` (today); one statement"""
+    taken_on = taken_on or timezone.localdate()
+    sql = f"""
+    INSERT INTO {_table(BalanceSnapshot)} (affiliate_id, taken_on, balance, credited, debited, reversed, taken_at)
+    SELECT user_id, %s, balance, credited, debited, reversed, %s FROM {_table(AffiliateBalance)}
+    ON CONFLICT (affiliate_id, taken_on) DO UPDATE SET
+        balance = EXCLUDED.balance,
+        credited = EXCLUDED.credited,
+        debited = EXCLUDED.debited,
+        reversed = EXCLUDED.reversed,
+        taken_at = EXCLUDED.taken_at
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [taken_on, timezone.now()])
+        return cursor.rowcount
+
+
+def rebuild_balances():
+    """Recompute every AffiliateBalance from the ledger; returns how many"""
+    sql = f"""
+    WITH totals AS (
+        SELECT affiliate_id,
+               SUM(amount) AS balance,
+               COALESCE(SUM(amount) FILTER (WHERE entry_type = 'credit'), 0) AS credited,
+               COALESCE(-SUM(amount) FILTER (WHERE entry_type = 'debit'), 0) AS debited,
+               COALESCE(-SUM(amount) FILTER (WHERE entry_type = 'reversal'), 0) AS reversed
+        FROM {_table(LedgerEntry)}
+        GROUP BY affiliate_id
+    )
+    INSERT INTO {_table(AffiliateBalance)} AS b (user_id, balance, credited, debited, reversed, updated_at)
+    SELECT affiliate_id, balance, credited, debited, reversed, %s FROM totals
+    ON CONFLICT (user_id) DO UPDATE SET
+        balance = EXCLUDED.balance,
+        credited = EXCLUDED.credited,
+        debited = EXCLUDED.debited,
+        reversed = EXCLUDED.reversed,
+        updated_at = EXCLUDED.updated_at
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [timezone.now()])
+        return cursor.rowcount
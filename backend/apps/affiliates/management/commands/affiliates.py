@@ -0,0 +1,494 @@
+"""
+Affiliate operations: reports, listings and bookkeeping actions.
+
+    python manage.py affiliates summary
+    python manage.py affiliates health [--check]
+    python manage.py affiliates report [--months 6] [--top 10] [--affiliate doctor@example.com]
+    python manage.py affiliates affiliates --format csv
+    python manage.py affiliates commissions --status pending --format csv > pending.csv
+    python manage.py affiliates referrals --since-hours 24
+    python manage.py affiliates unprocessed
+    python manage.py affiliates affiliate doctor@example.com
+    python manage.py affiliates ledger doctor@example.com [--since-days 30]
+    python manage.py affiliates payouts --status pending --format json
+    python manage.py affiliates pay --affiliate doctor@example.com [--yes]
+    python manage.py affiliates settle-payout 42
+    python manage.py affiliates run-payouts [--rail fake] [--workers 8]
+    python manage.py affiliates add-commission doctor@example.com patient@example.com 25.00
+    python manage.py affiliates refresh-stats
+    python manage.py affiliates backfill-codes [--chunk-size 5000] [--start-after ID]
+    python manage.py affiliates reconcile [--dry-run] [--phase commissions] [--restart]
+
+Listings stream straight from a queryset iterator in table, json or
+csv format; the figures come from aggregate SQL (apps.affiliates.queries).
+"""
+import argparse
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from apps.accounts.allocators import backfill_referral_codes, users_without_referral_code
+from apps.affiliates import queries
+from apps.affiliates.health import build_health_report
+from apps.affiliates.ledger import balance_of, credit_commissions, rebuild_balances, take_balance_snapshots
+from apps.affiliates.models import AffiliateCommission, PayoutRequest
+from apps.affiliates.payouts import PAYOUT_RAILS, process_payouts
+from apps.affiliates.reconciliation import PHASES, pending_counts, reconcile
+from apps.affiliates.settlement import SettlementError, settle_commissions, settle_payout_request
+from apps.affiliates.stats import refresh_affiliate_stats
+from clinical_platform.output import OUTPUT_FORMATS, Column, RowWriter
+
+User = get_user_model()
+
+STREAM_CHUNK_SIZE = 2000
+
+COMMISSION_COLUMNS = [
+    Column('id', 'ID', 8),
+    Column('affiliate_email', 'Affiliate', 30),
+    Column('referred_email', 'Referred', 30),
+    Column('commission_amount', 'Amount', 10),
+    Column('commission_type', 'Type', 12),
+    Column('status', 'Status', 10),
+    Column('payment_id', 'Payment', 8),
+    Column('created_at', 'Created', 17),
+    Column('paid_at', 'Paid', 17),
+    Column('archived', 'Archived', 8),
+]
+
+REFERRAL_COLUMNS = [
+    Column('email', 'User', 30),
+    Column('referrer_email', 'Referred by', 30),
+    Column('date_joined', 'Joined', 17),
+    Column('subscription_status', 'Subscription', 12),
+    Column('payments', 'Payments', 8),
+    Column('commissions', 'Commissions', 11),
+    Column('commission_amount', 'Amount', 10),
+]
+
+UNPROCESSED_COLUMNS = [
+    Column('id', 'Payment', 8),
+    Column('user_email', 'User', 30),
+    Column('referrer_email', 'Referred by', 30),
+    Column('amount', 'Amount', 10),
+    Column('created_at', 'Created', 17),
+]
+
+AFFILIATE_COLUMNS = [
+    Column('email', 'Affiliate', 30),
+    Column('referral_code', 'Code', 10),
+    Column('referrals', 'Referrals', 9),
+    Column('active_referrals', 'Active', 7),
+    Column('earned', 'Earned', 10),
+    Column('paid', 'Paid', 10),
+    Column('pending', 'Pending', 10),
+]
+
+PAYOUT_COLUMNS = [
+    Column('id', 'ID', 6),
+    Column('affiliate_email', 'Affiliate', 30),
+    Column('amount', 'Amount', 10),
+    Column('status', 'Status', 11),
+    Column('payment_method', 'Method', 14),
+    Column('created_at', 'Created', 17),
+    Column('processed_at', 'Processed', 17),
+]
+
+LEDGER_ENTRY_COLUMNS = [
+    Column('id', 'ID', 8),
+    Column('created_at', 'Date', 17),
+    Column('entry_type', 'Type', 9),
+    Column('amount', 'Amount', 10),
+    Column('commission_id', 'Commission', 10),
+    Column('payout_request_id', 'Payout', 8),
+    Column('description', 'Description', 30),
+]
+
+SUMMARY_COLUMNS = [
+    Column('status', 'Status', 10),
+    Column('count', 'Count', 10),
+    Column('amount', 'Amount', 12),
+]
+
+MONTH_COLUMNS = [
+    Column('month', 'Month', 10),
+    Column('count', 'Count', 10),
+    Column('amount', 'Amount', 12),
+]
+
+TOP_AFFILIATE_COLUMNS = [
+    Column('email', 'Affiliate', 30),
+    Column('earned', 'Earned', 10),
+    Column('paid', 'Paid', 10),
+    Column('available', 'Available', 10),
+    Column('total_referrals', 'Referrals', 9),
+]
+
+COUNTER_COLUMNS = [
+    Column('counter', 'Counter', 30),
+    Column('value', 'Value', 10),
+]
+
+ISSUE_COLUMNS = [
+    Column('severity', 'Severity', 9),
+    Column('count', 'Count', 8),
+    Column('message', 'Issue', 48),
+    Column('fix', 'Suggested fix', 50),
+]
+
+AFFILIATE_LIST_COLUMNS = [
+    Column('email', 'Affiliate', 30),
+    Column('referrals', 'Referrals', 9),
+    Column('commissions', 'Commissions', 11),
+    Column('earned', 'Earned', 10),
+    Column('paid', 'Paid', 10),
+    Column('pending', 'Pending', 10),
+]
+
+
+class Command(BaseCommand):
+    help = 'Affiliate reports and bookkeeping (run with a subcommand, see --help)'
+
+    def add_arguments(self, parser):
+        output = argparse.ArgumentParser(add_help=False)
+        output.add_argument('--format', choices=OUTPUT_FORMATS, default='table')
+
+        subcommands = parser.add_subparsers(dest='subcommand', required=True)
+
+        subcommands.add_parser('summary', parents=[output], help='Commission count and amount per status')
+
+        report = subcommands.add_parser(
+            'report', parents=[output], help='Status totals, monthly totals and top affiliates',
+        )
+        report.add_argument('--months', type=int, default=6)
+        report.add_argument('--top', type=int, default=10)
+        report.add_argument('--affiliate', help='Monthly totals for this affiliate email only')
+
+        health = subcommands.add_parser('health', parents=[output], help='Health counters, issues and top affiliates')
+        health.add_argument('--top', type=int, default=5)
+        health.add_argument('--check', action='store_true', help='Exit with status 1 unless the system is healthy')
+
+        subcommands.add_parser('affiliates', parents=[output], help='Affiliates with live commission totals')
+
+        commissions = subcommands.add_parser('commissions', parents=[output], help='List commissions')
+        commissions.add_argument('--status', choices=[choice for choice, _ in AffiliateCommission.COMMISSION_STATUS_CHOICES])
+        commissions.add_argument('--affiliate', help='Affiliate email')
+        commissions.add_argument('--since-days', type=int, help='Only commissions created in the last N days')
+        commissions.add_argument('--limit', type=int, help='Only the N most recent')
+
+        referrals = subcommands.add_parser('referrals', parents=[output], help='List referred users')
+        referrals.add_argument('--affiliate', help='Referrer email')
+        referrals.add_argument('--since-hours', type=int, help='Only users who joined in the last N hours')
+
+        subcommands.add_parser(
+            'unprocessed', parents=[output], help='Succeeded payments of referred users without a commission',
+        )
+
+        affiliate = subcommands.add_parser('affiliate', parents=[output], help='Live totals for one affiliate')
+        affiliate.add_argument('email')
+
+        ledger = subcommands.add_parser('ledger', parents=[output], help="An affiliate's ledger entries and balance")
+        ledger.add_argument('email')
+        ledger.add_argument('--since-days', type=int)
+
+        subcommands.add_parser('rebuild-balances', help='Recompute every affiliate balance from the ledger')
+        subcommands.add_parser('snapshot-balances', help="Take today's balance snapshot now")
+
+        payouts = subcommands.add_parser('payouts', parents=[output], help='List payout requests')
+        payouts.add_argument('--status', choices=[choice for choice, _ in PayoutRequest.STATUS_CHOICES])
+
+        pay = subcommands.add_parser('pay', help='Mark pending commissions as paid')
+        selection = pay.add_mutually_exclusive_group(required=True)
+        selection.add_argument('--all', action='store_true', help='Every pending commission')
+        selection.add_argument('--affiliate', help='Pending commissions of this affiliate email')
+        selection.add_argument('--ids', help='Comma-separated commission ids')
+        pay.add_argument(
+            '--method', default='bank_transfer', help='Payment method recorded on the payout requests',
+            choices=[choice for choice, _ in PayoutRequest._meta.get_field('payment_method').choices],
+        )
+        pay.add_argument('--notes', default='')
+        pay.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+
+        settle = subcommands.add_parser('settle-payout', help='Pay a payout request from the oldest pending commissions')
+        settle.add_argument('payout_request', type=int, help='Payout request id')
+
+        run_payouts = subcommands.add_parser('run-payouts', help='Pay approved payout requests through the payment rail')
+        run_payouts.add_argument('--rail', choices=list(PAYOUT_RAILS), help='Defaults to PAYOUT_RAIL')
+        run_payouts.add_argument('--batch-size', type=int, help='Defaults to PAYOUT_BATCH_SIZE')
+        run_payouts.add_argument('--workers', type=int, help='Concurrent rail calls; defaults to PAYOUT_WORKERS')
+        run_payouts.add_argument('--max-batches', type=int)
+
+        add = subcommands.add_parser('add-commission', help='Create a manual (one-time) pending commission')
+        add.add_argument('affiliate', help='Affiliate email')
+        add.add_argument('referred', help='Referred user email')
+        add.add_argument('amount')
+        add.add_argument('--notes', default='')
+
+        refresh = subcommands.add_parser('refresh-stats', help='Recompute AffiliateStats in grouped queries')
+        refresh.add_argument('--affiliate', help='Only this affiliate email')
+        refresh.add_argument('--chunk-size', type=int, default=500)
+
+        backfill = subcommands.add_parser('backfill-codes', help='Give every user without a referral code one')
+        backfill.add_argument('--chunk-size', type=int, default=5000)
+        backfill.add_argument('--sleep', type=float, default=0, help='Seconds to pause between chunks')
+        backfill.add_argument('--max-chunks', type=int, default=None, help='Stop after this many chunks')
+        backfill.add_argument('--start-after', type=int, default=0, help='Resume after this user id')
+
+        reconcile_parser = subcommands.add_parser(
+            'reconcile', help='Create missing payments and commissions in resumable chunks',
+        )
+        reconcile_parser.add_argument('--phase', action='append', choices=PHASES, help='Repeatable; default all')
+        reconcile_parser.add_argument('--chunk-size', type=int, default=2000)
+        reconcile_parser.add_argument('--since-days', type=int, help='Only rows created in the last N days')
+        reconcile_parser.add_argument('--restart', action='store_true', help='Ignore saved checkpoints')
+        reconcile_parser.add_argument('--dry-run', action='store_true', help='Only count what would be fixed')
+
+    def handle(self, *args, **options):
+        handler = getattr(self, f"handle_{options['subcommand'].replace('-', '_')}")
+        handler(options)
+
+    def _write(self, options, columns, rows):
+        writer = RowWriter(self.stdout, options['format'], columns)
+        count = writer.write_all(rows)
+        if options['format'] == 'table':
+            self.stdout.write(f"{count} rows")
+
+    def _write_json(self, document):
+        self.stdout.write(json.dumps(document, cls=DjangoJSONEncoder, indent=2))
+
+    def _write_sections(self, options, sections):
+        """(key, title, columns, rows) sections one after another; for table and csv"""
+        for index, (key, title, columns, rows) in enumerate(sections):
+            if index:
+                self.stdout.write('')
+            self.stdout.write(title if options['format'] == 'table' else f"# {key}")
+            RowWriter(self.stdout, options['format'], columns).write_all(rows)
+
+    def _stream(self, queryset):
+        return queryset.iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+    def _user_id(self, email):
+        user_id = User.objects.filter(email=email).values_list('id', flat=True).first()
+        if user_id is None:
+            raise CommandError(f"User not found: {email}")
+        return user_id
+
+    def _status_totals(self):
+        rows = list(queries.commission_totals())
+        rows.append({
+            'status': 'total',
+            'count': sum(row['count'] for row in rows),
+            'amount': sum((row['amount'] for row in rows), Decimal('0.00')),
+        })
+        return rows
+
+    def _write_settlement(self, result):
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {result['commissions']} commissions (${result['amount']:.2f}) as paid for "
+            f"{result['affiliates']} affiliates; payout requests: "
+            f"{', '.join(map(str, result['payout_requests'])) or '-'}"
+        ))
+
+    def handle_summary(self, options):
+        self._write(options, SUMMARY_COLUMNS, self._status_totals())
+
+    def handle_report(self, options):
+        affiliate_id = self._user_id(options['affiliate']) if options['affiliate'] else None
+        months = queries.monthly_commission_totals(options['months'], affiliate_id=affiliate_id)
+        if affiliate_id:
+            sections = [('months', 'Commissions by month', MONTH_COLUMNS, months)]
+        else:
+            sections = [
+                ('totals', 'Commissions by status', SUMMARY_COLUMNS, self._status_totals()),
+                ('months', 'Commissions by month', MONTH_COLUMNS, months),
+                ('top_affiliates', 'Top affiliates', TOP_AFFILIATE_COLUMNS, list(queries.top_affiliates(options['top']))),
+            ]
+
+        if options['format'] == 'json':
+            self._write_json({key: rows for key, _, _, rows in sections})
+        else:
+            self._write_sections(options, sections)
+
+    def handle_health(self, options):
+        report = build_health_report(top=options['top'])
+        if options['format'] == 'json':
+            self._write_json(report)
+        else:
+            self.stdout.write(f"Affiliate system status: {report['status']} ({report['generated_at']:%Y-%m-%d %H:%M})")
+            self.stdout.write('')
+            self._write_sections(options, [
+                ('counters', 'Counters', COUNTER_COLUMNS,
+                 [{'counter': name, 'value': value} for name, value in report['counters'].items()]),
+                ('issues', 'Issues', ISSUE_COLUMNS, report['issues']),
+                ('top_affiliates', 'Top affiliates', TOP_AFFILIATE_COLUMNS, report['top_affiliates']),
+            ])
+        if options['check'] and report['status'] != 'ok':
+            raise CommandError(f"Affiliate system status: {report['status']}")
+
+    def handle_affiliates(self, options):
+        self._write(options, AFFILIATE_LIST_COLUMNS, self._stream(queries.affiliate_rows()))
+
+    def handle_commissions(self, options):
+        since = timezone.now() - timedelta(days=options['since_days']) if options['since_days'] else None
+        rows = queries.commission_rows(
+            status=options['status'], affiliate_email=options['affiliate'], since=since,
+        )
+        if options['limit']:
+            rows = rows[:options['limit']]
+        self._write(options, COMMISSION_COLUMNS, self._stream(rows))
+
+    def handle_referrals(self, options):
+        since = timezone.now() - timedelta(hours=options['since_hours']) if options['since_hours'] else None
+        rows = queries.referral_rows(affiliate_email=options['affiliate'], since=since)
+        self._write(options, REFERRAL_COLUMNS, self._stream(rows))
+
+    def handle_unprocessed(self, options):
+        self._write(options, UNPROCESSED_COLUMNS, self._stream(queries.unprocessed_payment_rows()))
+
+    def handle_affiliate(self, options):
+        rows = list(queries.affiliate_summary_rows(options['email']))
+        if not rows:
+            raise CommandError(f"User not found: {options['email']}")
+        self._write(options, AFFILIATE_COLUMNS, rows)
+
+    def handle_ledger(self, options):
+        affiliate_id = self._user_id(options['email'])
+        since = timezone.now() - timedelta(days=options['since_days']) if options['since_days'] else None
+        self._write(options, LEDGER_ENTRY_COLUMNS, self._stream(queries.ledger_rows(affiliate_id, since=since)))
+        if options['format'] == 'table':
+            self.stdout.write(f"Balance: ${balance_of(affiliate_id):.2f}")
+
+    def handle_rebuild_balances(self, options):
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuild_balances()} balances from the ledger"))
+
+    def handle_snapshot_balances(self, options):
+        self.stdout.write(self.style.SUCCESS(f"Snapshotted {take_balance_snapshots()} balances"))
+
+    def handle_payouts(self, options):
+        self._write(options, PAYOUT_COLUMNS, self._stream(queries.payout_rows(status=options['status'])))
+
+    def handle_pay(self, options):
+        pending = AffiliateCommission.objects.filter(status='pending')
+        if options['affiliate']:
+            pending = pending.filter(affiliate__email=options['affiliate'])
+        elif options['ids']:
+            try:
+                ids = [int(value) for value in options['ids'].split(',')]
+            except ValueError:
+                raise CommandError('--ids must be comma-separated integers')
+            pending = pending.filter(id__in=ids)
+
+        totals = pending.aggregate(count=Count('id'), amount=Sum('commission_amount'))
+        if not totals['count']:
+            self.stdout.write('No pending commissions match')
+            return
+
+        self.stdout.write(f"{totals['count']} commissions, ${totals['amount']:.2f} will be marked as paid")
+        if not options['yes'] and input('Proceed? (y/N): ').strip().lower() != 'y':
+            self.stdout.write('Cancelled')
+            return
+
+        result = settle_commissions(pending, payment_method=options['method'], notes=options['notes'])
+        self._write_settlement(result)
+
+    def handle_settle_payout(self, options):
+        try:
+            result = settle_payout_request(options['payout_request'])
+        except SettlementError as e:
+            raise CommandError(str(e))
+        self._write_settlement(result)
+
+    def handle_run_payouts(self, options):
+        def progress(totals):
+            self.stdout.write(
+                f"batch {totals['batches']}: {totals['paid']} paid, {totals['failed']} failed, ${totals['amount']:.2f}"
+            )
+
+        try:
+            totals = process_payouts(
+                rail=options['rail'], batch_size=options['batch_size'], workers=options['workers'],
+                max_batches=options['max_batches'], progress=progress,
+            )
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Paid {totals['paid']} payout requests (${totals['amount']:.2f}) in {totals['batches']} batches; "
+            f"{totals['failed']} failed, {totals['requeued']} stale requests requeued"
+        ))
+
+    def handle_add_commission(self, options):
+        affiliate_id = self._user_id(options['affiliate'])
+        referred_id = self._user_id(options['referred'])
+        try:
+            amount = Decimal(options['amount'])
+        except InvalidOperation:
+            raise CommandError(f"Invalid amount: {options['amount']}")
+
+        with transaction.atomic():
+            commission = AffiliateCommission.objects.create(
+                affiliate_id=affiliate_id,
+                referred_user_id=referred_id,
+                payment=None,
+                commission_amount=amount,
+                commission_type='one_time',
+                status='pending',
+                notes=options['notes'],
+            )
+            credit_commissions([commission])
+            refresh_affiliate_stats([affiliate_id])
+        self.stdout.write(self.style.SUCCESS(f"Created commission {commission.id} (${amount:.2f})"))
+
+    def handle_refresh_stats(self, options):
+        affiliate_ids = [self._user_id(options['affiliate'])] if options['affiliate'] else None
+        refreshed = refresh_affiliate_stats(affiliate_ids, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed stats for {refreshed} affiliates"))
+
+    def handle_backfill_codes(self, options):
+        missing = users_without_referral_code().count()
+        self.stdout.write(f"{missing} users without a referral code")
+        started = time.monotonic()
+
+        def progress(updated, last_id):
+            rate = updated / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"{updated}/{missing} users, up to id {last_id} ({rate:.0f} users/s)")
+
+        result = backfill_referral_codes(
+            chunk_size=options['chunk_size'],
+            sleep_seconds=options['sleep'],
+            max_chunks=options['max_chunks'],
+            start_after=options['start_after'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {result['updated']} referral codes in {result['chunks']} chunks; "
+            f"resume with --start-after {result['last_id']}"
+        ))
+
+    def handle_reconcile(self, options):
+        since = timezone.now() - timedelta(days=options['since_days']) if options['since_days'] else None
+        phases = options['phase'] or PHASES
+        for phase, count in pending_counts(since).items():
+            if phase in phases:
+                self.stdout.write(f"{phase}: {count} rows to fix")
+        if options['dry_run']:
+            return
+
+        def progress(result, last_id):
+            self.stdout.write(f"{result['phase']}: {result['rows']} rows in {result['chunks']} chunks, up to id {last_id}")
+
+        results = reconcile(
+            phases, chunk_size=options['chunk_size'], since=since, restart=options['restart'], progress=progress,
+        )
+        for result in results:
+            resumed = f", resumed after id {result['resumed_after']}" if result['resumed_after'] else ''
+            self.stdout.write(self.style.SUCCESS(
+                f"{result['phase']}: fixed {result['rows']} rows (${result['amount']:.2f}){resumed}"
+            ))
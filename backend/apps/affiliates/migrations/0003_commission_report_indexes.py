@@ -0,0 +1,23 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; building
+    # the indexes this way keeps the commissions table writable meanwhile
+    atomic = False
+
+    dependencies = [
+        ('affiliates', '0002_alter_affiliatecommission_payment'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='affiliatecommission',
+            index=models.Index(fields=['created_at'], name='affiliates_comm_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='affiliatecommission',
+            index=models.Index(fields=['status', 'created_at'], name='affiliates_comm_status_idx'),
+        ),
+    ]
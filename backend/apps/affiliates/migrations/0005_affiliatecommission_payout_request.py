@@ -0,0 +1,17 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affiliates', '0004_reconciliationcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='affiliatecommission',
+            name='payout_request',
+            field=models.ForeignKey(blank=True, help_text='Payout that settled this commission', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commissions', to='affiliates.payoutrequest'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affiliates', '0005_affiliatecommission_payout_request'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payoutrequest',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('rejected', 'Rejected')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='payoutrequest',
+            name='rail_reference',
+            field=models.CharField(blank=True, default='', help_text='Transfer id returned by the payment rail', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='payoutrequest',
+            index=models.Index(fields=['status', 'created_at'], name='affiliates_payout_status_idx'),
+        ),
+    ]
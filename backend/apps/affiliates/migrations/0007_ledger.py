@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('affiliates', '0006_payout_engine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('credit', 'Credit'), ('debit', 'Debit'), ('reversal', 'Reversal')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('description', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('affiliate', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+                ('commission', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='ledger_entries', to='affiliates.affiliatecommission')),
+                ('payout_request', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='ledger_entries', to='affiliates.payoutrequest')),
+            ],
+            options={
+                'verbose_name': 'Ledger Entry',
+                'verbose_name_plural': 'Ledger Entries',
+                'db_table': 'affiliates_ledger_entry',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['affiliate', 'created_at'], name='affiliates_ledger_aff_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AffiliateBalance',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='affiliate_balance', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('credited', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('debited', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('reversed', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Affiliate Balance',
+                'verbose_name_plural': 'Affiliate Balances',
+                'db_table': 'affiliates_balance',
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_on', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('credited', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('debited', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('reversed', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('affiliate', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Balance Snapshot',
+                'verbose_name_plural': 'Balance Snapshots',
+                'db_table': 'affiliates_balance_snapshot',
+                'ordering': ['-taken_on'],
+                'constraints': [models.UniqueConstraint(fields=('affiliate', 'taken_on'), name='affiliates_snapshot_day_uniq')],
+            },
+        ),
+    ]
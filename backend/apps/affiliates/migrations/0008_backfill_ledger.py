@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+# Replays existing commissions into the ledger: a credit for each, a debit
+# for each paid one and a reversal for each cancelled one, then folds the
+# entries into the balances
+BACKFILL_LEDGER = """
+INSERT INTO affiliates_ledger_entry (affiliate_id, entry_type, amount, commission_id, payout_request_id, description, created_at)
+SELECT affiliate_id, 'credit', commission_amount, id, NULL, 'Commission ' || id, created_at
+FROM affiliates_commission;
+
+INSERT INTO affiliates_ledger_entry (affiliate_id, entry_type, amount, commission_id, payout_request_id, description, created_at)
+SELECT affiliate_id, 'debit', -commission_amount, id, payout_request_id, 'Paid', COALESCE(paid_at, updated_at)
+FROM affiliates_commission
+WHERE status = 'paid';
+
+INSERT INTO affiliates_ledger_entry (affiliate_id, entry_type, amount, commission_id, payout_request_id, description, created_at)
+SELECT affiliate_id, 'reversal', -commission_amount, id, NULL, 'Cancelled', updated_at
+FROM affiliates_commission
+WHERE status = 'cancelled';
+
+INSERT INTO affiliates_balance (user_id, balance, credited, debited, reversed, updated_at)
+SELECT affiliate_id,
+       SUM(amount),
+       COALESCE(SUM(amount) FILTER (WHERE entry_type = 'credit'), 0),
+       COALESCE(-SUM(amount) FILTER (WHERE entry_type = 'debit'), 0),
+       COALESCE(-SUM(amount) FILTER (WHERE entry_type = 'reversal'), 0),
+       NOW()
+FROM affiliates_ledger_entry
+GROUP BY affiliate_id;
+"""
+
+CLEAR_LEDGER = """
+DELETE FROM affiliates_balance;
+DELETE FROM affiliates_ledger_entry;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affiliates', '0007_ledger'),
+    ]
+
+    operations = [
+        migrations.RunSQL(BACKFILL_LEDGER, CLEAR_LEDGER),
+    ]
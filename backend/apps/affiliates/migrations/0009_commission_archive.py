@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+COMMISSION_COLUMNS = (
+    'id, affiliate_id, referred_user_id, payment_id, payout_request_id, commission_amount, '
+    'commission_percentage, commission_type, status, paid_at, notes, created_at, updated_at'
+)
+
+# Recreate this view whenever affiliates_commission gains a column
+CREATE_VIEW = f"""
+CREATE VIEW affiliates_commission_all AS
+SELECT {COMMISSION_COLUMNS}, FALSE AS archived FROM affiliates_commission
+UNION ALL
+SELECT {COMMISSION_COLUMNS}, TRUE AS archived FROM affiliates_commission_archive
+"""
+
+DROP_VIEW = "DROP VIEW IF EXISTS affiliates_commission_all"
+
+STATUS_CHOICES = [('pending', 'Pending'), ('paid', 'Paid'), ('cancelled', 'Cancelled')]
+TYPE_CHOICES = [('subscription', 'Subscription'), ('one_time', 'One Time Payment')]
+
+
+def commission_fields():
+    return [
+        ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+        ('commission_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+        ('commission_percentage', models.DecimalField(decimal_places=2, max_digits=5)),
+        ('commission_type', models.CharField(choices=TYPE_CHOICES, max_length=20)),
+        ('status', models.CharField(choices=STATUS_CHOICES, max_length=20)),
+        ('paid_at', models.DateTimeField(blank=True, null=True)),
+        ('notes', models.TextField(blank=True, null=True)),
+        ('created_at', models.DateTimeField()),
+        ('updated_at', models.DateTimeField()),
+        ('affiliate', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+        ('referred_user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+        ('payment', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='subscriptions.payment')),
+        ('payout_request', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='affiliates.payoutrequest')),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('subscriptions', '0002_alter_payment_status'),
+        ('affiliates', '0008_backfill_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCommission',
+            fields=commission_fields() + [
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Archived Commission',
+                'verbose_name_plural': 'Archived Commissions',
+                'db_table': 'affiliates_commission_archive',
+                'indexes': [
+                    models.Index(fields=['affiliate', 'created_at'], name='affiliates_arch_aff_idx'),
+                    models.Index(fields=['created_at'], name='affiliates_arch_created_idx'),
+                    models.Index(fields=['payment'], name='affiliates_arch_payment_idx'),
+                ],
+            },
+        ),
+        migrations.RunSQL(CREATE_VIEW, DROP_VIEW),
+        migrations.CreateModel(
+            name='CommissionHistory',
+            fields=commission_fields() + [
+                ('archived', models.BooleanField()),
+            ],
+            options={
+                'db_table': 'affiliates_commission_all',
+                'managed': False,
+            },
+        ),
+    ]
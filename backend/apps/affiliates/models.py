@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -35,6 +36,14 @@ class AffiliateCommission(models.Model):
         blank=True,
         help_text=_('Related payment (null for manual commissions)')
     )
+    payout_request = models.ForeignKey(
+        'affiliates.PayoutRequest',
+        on_delete=models.SET_NULL,
+        related_name='commissions',
+        null=True,
+        blank=True,
+        help_text=_('Payout that settled this commission')
+    )
     
     commission_amount = models.DecimalField(
         max_digits=10,
@@ -69,6 +78,11 @@ class AffiliateCommission(models.Model):
         verbose_name = _('Affiliate Commission')
         verbose_name_plural = _('Affiliate Commissions')
         ordering = ['-created_at']
+        indexes = [
+            # Monthly report ranges and newest-first listings
+            models.Index(fields=['created_at'], name='affiliates_comm_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='affiliates_comm_status_idx'),
+        ]
     
     def __str__(self):
         return f"Commission: {self.affiliate.email} - ${self.commission_amount}"
@@ -111,35 +125,20 @@ class AffiliateStats(models.Model):
         return f"Stats for {self.user.email}"
     
     def update_stats(self):
-        """Update affiliate statistics"""
-        from apps.subscriptions.models import Subscription
-        
-        # Count total referrals
-        self.total_referrals = self.user.referrals.count()
-        
-        # Count active referrals (users with active subscriptions)
-        self.active_referrals = self.user.referrals.filter(
-            subscription__status__in=['active', 'trialing']
-        ).count()
+        """Update affiliate statistics, archived commissions included"""
+        from .stats import refresh_affiliate_stats_chunk
         
-        # Calculate commission totals
-        commissions = self.user.affiliate_commissions.all()
-        self.total_commission_earned = sum(c.commission_amount for c in commissions)
-        self.total_commission_paid = sum(
-            c.commission_amount for c in commissions if c.status == 'paid'
-        )
-        self.total_commission_pending = sum(
-            c.commission_amount for c in commissions if c.status == 'pending'
-        )
-        
-        self.save()
+        refresh_affiliate_stats_chunk([self.user_id])
+        self.refresh_from_db()
 
 
 class PayoutRequest(models.Model):
     STATUS_CHOICES = [
         ('pending', _('Pending')),
+        ('approved', _('Approved')),
         ('processing', _('Processing')),
         ('completed', _('Completed')),
+        ('failed', _('Failed')),
         ('rejected', _('Rejected')),
     ]
     
@@ -173,6 +172,13 @@ class PayoutRequest(models.Model):
         help_text=_('Payment method specific details (account info, etc.)')
     )
     
+    rail_reference = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        help_text=_('Transfer id returned by the payment rail')
+    )
+    
     processed_at = models.DateTimeField(null=True, blank=True)
     rejection_reason = models.TextField(blank=True, null=True)
     admin_notes = models.TextField(blank=True, null=True)
@@ -185,6 +191,228 @@ class PayoutRequest(models.Model):
         verbose_name = _('Payout Request')
         verbose_name_plural = _('Payout Requests')
         ordering = ['-created_at']
+        indexes = [
+            # Payout engine claims approved requests oldest first
+            models.Index(fields=['status', 'created_at'], name='affiliates_payout_status_idx'),
+        ]
     
     def __str__(self):
         return f"Payout Request: {self.affiliate.email} - ${self.amount}"
+
+
+class ReconciliationCheckpoint(models.Model):
+    """Progress of a reconciliation phase, so an interrupted run resumes"""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    rows = models.BigIntegerField(default=0)
+    
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'affiliates_reconciliation_checkpoint'
+        verbose_name = _('Reconciliation Checkpoint')
+        verbose_name_plural = _('Reconciliation Checkpoints')
+    
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+
+class LedgerEntry(models.Model):
+    """
+    Append-only record of every change to an affiliate's balance: a
+    credit when a commission is earned, a debit when it is paid out and a
+    reversal when it is cancelled or refunded. Amounts are signed.
+    """
+    ENTRY_TYPE_CHOICES = [
+        ('credit', _('Credit')),
+        ('debit', _('Debit')),
+        ('reversal', _('Reversal')),
+    ]
+    
+    affiliate = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='ledger_entries',
+        db_index=False
+    )
+    entry_type = models.CharField(max_length=10, choices=ENTRY_TYPE_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # No database constraints: entries outlive archived commissions and
+    # discarded payout requests, and are never rewritten by a cascade
+    commission = models.ForeignKey(
+        AffiliateCommission,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='ledger_entries',
+        null=True,
+        blank=True
+    )
+    payout_request = models.ForeignKey(
+        PayoutRequest,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='ledger_entries',
+        null=True,
+        blank=True
+    )
+    description = models.CharField(max_length=255, blank=True, default='')
+    
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'affiliates_ledger_entry'
+        verbose_name = _('Ledger Entry')
+        verbose_name_plural = _('Ledger Entries')
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Per-affiliate history is a range scan on this index
+            models.Index(fields=['affiliate', 'created_at'], name='affiliates_ledger_aff_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.entry_type} {self.amount} for {self.affiliate_id}"
+    
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('Ledger entries are append-only')
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError('Ledger entries are append-only')
+
+
+class AffiliateBalance(models.Model):
+    """Running ledger totals per affiliate, updated with every posting"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='affiliate_balance'
+    )
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    credited = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    debited = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    reversed = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'affiliates_balance'
+        verbose_name = _('Affiliate Balance')
+        verbose_name_plural = _('Affiliate Balances')
+    
+    def __str__(self):
+        return f"Balance of {self.user_id}: {self.balance}"
+
+
+class BalanceSnapshot(models.Model):
+    """AffiliateBalance as it stood when the daily snapshot ran"""
+    affiliate = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='balance_snapshots',
+        db_index=False
+    )
+    taken_on = models.DateField()
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    credited = models.DecimalField(max_digits=12, decimal_places=2)
+    debited = models.DecimalField(max_digits=12, decimal_places=2)
+    reversed = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    taken_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'affiliates_balance_snapshot'
+        verbose_name = _('Balance Snapshot')
+        verbose_name_plural = _('Balance Snapshots')
+        ordering = ['-taken_on']
+        constraints = [
+            models.UniqueConstraint(fields=['affiliate', 'taken_on'], name='affiliates_snapshot_day_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.affiliate_id} on {self.taken_on}: {self.balance}"
+
+
+class ArchivedCommission(models.Model):
+    """
+    Paid commissions moved out of affiliates_commission by
+    clinical_platform.archive; same columns plus archived_at.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    affiliate = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    referred_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    payment = models.ForeignKey(
+        'subscriptions.Payment', on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+        null=True, blank=True
+    )
+    payout_request = models.ForeignKey(
+        PayoutRequest, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+        null=True, blank=True
+    )
+    commission_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    commission_percentage = models.DecimalField(max_digits=5, decimal_places=2)
+    commission_type = models.CharField(max_length=20, choices=AffiliateCommission.COMMISSION_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=AffiliateCommission.COMMISSION_STATUS_CHOICES)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    archived_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'affiliates_commission_archive'
+        verbose_name = _('Archived Commission')
+        verbose_name_plural = _('Archived Commissions')
+        indexes = [
+            models.Index(fields=['affiliate', 'created_at'], name='affiliates_arch_aff_idx'),
+            models.Index(fields=['created_at'], name='affiliates_arch_created_idx'),
+            models.Index(fields=['payment'], name='affiliates_arch_payment_idx'),
+        ]
+    
+    @staticmethod
+    def archivable(cutoff):
+        return AffiliateCommission.objects.filter(status='paid', paid_at__lt=cutoff)
+
+
+class CommissionHistory(models.Model):
+    """
+    Every commission, hot or archived: the affiliates_commission_all view
+    (UNION ALL of both tables). Read-only; reports and stats aggregate
+    over it so archiving does not change any total.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    affiliate = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    referred_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    payment = models.ForeignKey(
+        'subscriptions.Payment', on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+        null=True, blank=True
+    )
+    payout_request = models.ForeignKey(
+        PayoutRequest, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+        null=True, blank=True
+    )
+    commission_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    commission_percentage = models.DecimalField(max_digits=5, decimal_places=2)
+    commission_type = models.CharField(max_length=20, choices=AffiliateCommission.COMMISSION_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=AffiliateCommission.COMMISSION_STATUS_CHOICES)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    notes = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived = models.BooleanField()
+    
+    class Meta:
+        managed = False
+        db_table = 'affiliates_commission_all'
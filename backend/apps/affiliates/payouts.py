@@ -0,0 +1,255 @@
+"""
+Payout engine: pays approved PayoutRequests through a payment rail.
+
+    claim    approved requests, locked FOR UPDATE SKIP LOCKED, become
+             processing
+    reserve  each request's backing commissions, oldest first up to its
+             amount, locked with SKIP LOCKED and linked to the request
+    submit   the batch goes to the rail on a thread pool
+    settle   paid requests are settled in one statement
+             (settlement.settle_reserved); failed ones are marked failed
+             and their commissions released
+
+Claim and reserve commit before anything is sent, so concurrent workers
+get disjoint batches and a commission backs at most one request. Rails
+are called with an idempotency key per request, so a request re-queued
+after a crash between submit and settle is not paid twice.
+"""
+import logging
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from clinical_platform.metrics import observe_stripe
+from .models import AffiliateCommission, PayoutRequest
+from .settlement import settle_reserved
+
+logger = logging.getLogger(__name__)
+
+# Processing requests untouched for this long are handed back to the queue
+STALE_PROCESSING_AFTER = timedelta(hours=1)
+
+
+class PayoutResult(NamedTuple):
+    payout_request_id: int
+    succeeded: bool
+    reference: str = ''
+    error: str = ''
+
+
+class PayoutRail:
+    """Sends one payout; must be thread-safe and must not touch the database"""
+    name = None
+
+    def submit(self, payout):
+        """`payout` is a dict of id, affiliate_id, amount, payment_method and payment_details"""
+        raise NotImplementedError
+
+
+class FakePayoutRail(PayoutRail):
+    """Local rail: pays everything unless payment_details has "simulate_failure" """
+    name = 'fake'
+
+    def submit(self, payout):
+        if payout['payment_details'].get('simulate_failure'):
+            return PayoutResult(payout['id'], False, error='Simulated failure')
+        return PayoutResult(payout['id'], True, reference=f"fake_{payout['id']}")
+
+
+class StripeTransferRail(PayoutRail):
+    """Stripe Connect transfer to the affiliate's connected account"""
+    name = 'stripe'
+
+    def submit(self, payout):
+        from apps.subscriptions.stripe_client import stripe
+
+        account = payout['payment_details'].get('stripe_account_id')
+        if payout['payment_method'] != 'stripe' or not account:
+            return PayoutResult(payout['id'], False, error='Stripe rail needs a stripe payout with stripe_account_id')
+        try:
+            with observe_stripe('transfer.create'):
+                transfer = stripe.Transfer.create(
+                    amount=int((payout['amount'] * 100).to_integral_value()),
+                    currency='usd',
+                    destination=account,
+                    metadata={'payout_request_id': payout['id']},
+                    idempotency_key=f"payout-request-{payout['id']}",
+                )
+        except stripe.StripeError as e:
+            return PayoutResult(payout['id'], False, error=str(e))
+        return PayoutResult(payout['id'], True, reference=transfer.id)
+
+
+PAYOUT_RAILS = {rail.name: rail for rail in (FakePayoutRail, StripeTransferRail)}
+
+
+def get_rail(name=None):
+    name = name or settings.PAYOUT_RAIL
+    if not name:
+        raise ImproperlyConfigured(
+            f"PAYOUT_RAIL is not set; it must be one of {', '.join(PAYOUT_RAILS)} when DEBUG is off"
+        )
+    if name not in PAYOUT_RAILS:
+        raise ValueError(f"Unknown payout rail {name!r}; expected one of {', '.join(PAYOUT_RAILS)}")
+    return PAYOUT_RAILS[name]()
+
+
+def requeue_stale_payouts(now=None):
+    """Send processing requests abandoned by a crashed run back to approved"""
+    now = now or timezone.now()
+    return PayoutRequest.objects.filter(
+        status='processing', updated_at__lt=now - STALE_PROCESSING_AFTER,
+    ).update(status='approved', updated_at=now)
+
+
+def _reserve_commissions(payout_ids):
+    """
+    Link each request without reserved commissions to the affiliate's
+    oldest unreserved pending commissions that fit its amount, and set
+    the amount to what was reserved. Requests nothing fits are failed;
+    returns how many.
+    """
+    reserved = AffiliateCommission.objects.filter(payout_request=OuterRef('pk'), status='pending')
+    payouts = list(
+        PayoutRequest.objects.filter(id__in=payout_ids).filter(~Exists(reserved))
+        .order_by('created_at', 'id').values('id', 'affiliate_id', 'amount')
+    )
+    if not payouts:
+        return 0
+
+    available = defaultdict(deque)
+    for commission in (
+        AffiliateCommission.objects
+        .filter(affiliate_id__in={payout['affiliate_id'] for payout in payouts}, status='pending',
+                payout_request__isnull=True)
+        .order_by('affiliate_id', 'created_at', 'id')
+        .select_for_update(skip_locked=True)
+        .only('id', 'affiliate_id', 'commission_amount')
+    ):
+        available[commission.affiliate_id].append(commission)
+
+    commissions, amounts, unfunded = [], [], []
+    for payout in payouts:
+        queue, total = available[payout['affiliate_id']], Decimal('0.00')
+        while queue and total + queue[0].commission_amount <= payout['amount']:
+            commission = queue.popleft()
+            commission.payout_request_id = payout['id']
+            commissions.append(commission)
+            total += commission.commission_amount
+        if total:
+            amounts.append(PayoutRequest(id=payout['id'], amount=total))
+        else:
+            unfunded.append(payout['id'])
+
+    AffiliateCommission.objects.bulk_update(commissions, ['payout_request'], batch_size=1000)
+    PayoutRequest.objects.bulk_update(amounts, ['amount'], batch_size=1000)
+    PayoutRequest.objects.filter(id__in=unfunded).update(
+        status='failed',
+        rejection_reason='No unreserved pending commissions cover this payout',
+        processed_at=timezone.now(),
+    )
+    return len(unfunded)
+
+
+def claim_batch(batch_size):
+    """
+    Claim up to batch_size approved requests and reserve their
+    commissions; returns (claimed, unfunded count, ids to submit).
+    """
+    with transaction.atomic():
+        ids = list(
+            PayoutRequest.objects.filter(status='approved')
+            .order_by('created_at', 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0, 0, []
+        PayoutRequest.objects.filter(id__in=ids).update(status='processing', updated_at=timezone.now())
+        unfunded = _reserve_commissions(ids)
+        funded = list(PayoutRequest.objects.filter(id__in=ids, status='processing').values_list('id', flat=True))
+    return len(ids), unfunded, funded
+
+
+def _submit(rail, payout):
+    try:
+        return rail.submit(payout)
+    except Exception as e:
+        logger.exception('Payout rail raised', extra={'payout_request_id': payout['id'], 'rail': rail.name})
+        return PayoutResult(payout['id'], False, error=f"{type(e).__name__}: {e}")
+
+
+def _record_results(results):
+    now = timezone.now()
+    paid = [result for result in results if result.succeeded]
+    failed = [result for result in results if not result.succeeded]
+
+    with transaction.atomic():
+        settled = settle_reserved([result.payout_request_id for result in paid], paid_at=now)
+        PayoutRequest.objects.bulk_update(
+            [PayoutRequest(id=result.payout_request_id, rail_reference=result.reference[:100]) for result in paid],
+            ['rail_reference'], batch_size=1000,
+        )
+        # Money went out, but the reserved commissions were cancelled meanwhile
+        orphaned = PayoutRequest.objects.filter(id__in=[result.payout_request_id for result in paid], status='processing')
+        if orphaned.exists():
+            logger.warning('Paid payout requests had no commissions left to settle',
+                           extra={'payout_request_ids': list(orphaned.values_list('id', flat=True))})
+            orphaned.update(status='completed', processed_at=now, admin_notes='Paid, but no reserved commissions were left')
+
+        PayoutRequest.objects.bulk_update(
+            [
+                PayoutRequest(id=result.payout_request_id, status='failed', rejection_reason=result.error, processed_at=now)
+                for result in failed
+            ],
+            ['status', 'rejection_reason', 'processed_at'], batch_size=1000,
+        )
+        AffiliateCommission.objects.filter(
+            payout_request_id__in=[result.payout_request_id for result in failed], status='pending',
+        ).update(payout_request=None)
+
+    return {'paid': len(paid), 'failed': len(failed), 'amount': settled['amount']}
+
+
+def process_payout_batch(rail, batch_size=200, workers=8):
+    """Claim, submit and settle one batch; None when nothing was approved"""
+    claimed, unfunded, ids = claim_batch(batch_size)
+    if not claimed:
+        return None
+    payouts = list(PayoutRequest.objects.filter(id__in=ids).values(
+        'id', 'affiliate_id', 'amount', 'payment_method', 'payment_details',
+    ))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='payout-rail') as pool:
+        results = list(pool.map(lambda payout: _submit(rail, payout), payouts))
+    result = _record_results(results)
+    result['failed'] += unfunded
+    logger.info('Payout batch processed', extra={'rail': rail.name, **result, 'amount': str(result['amount'])})
+    return result
+
+
+def process_payouts(rail=None, batch_size=None, workers=None, max_batches=None, progress=None):
+    """Pay approved requests batch by batch until none are left (or max_batches)"""
+    rail = rail if isinstance(rail, PayoutRail) else get_rail(rail)
+    batch_size = batch_size or settings.PAYOUT_BATCH_SIZE
+    workers = workers or settings.PAYOUT_WORKERS
+    totals = {'batches': 0, 'paid': 0, 'failed': 0, 'amount': Decimal('0.00'), 'requeued': requeue_stale_payouts()}
+
+    while max_batches is None or totals['batches'] < max_batches:
+        result = process_payout_batch(rail, batch_size=batch_size, workers=workers)
+        if result is None:
+            break
+        totals['batches'] += 1
+        totals['paid'] += result['paid']
+        totals['failed'] += result['failed']
+        totals['amount'] += result['amount']
+        if progress:
+            progress(totals)
+    return totals
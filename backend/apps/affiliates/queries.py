@@ -0,0 +1,286 @@
+"""
+Set-based queries behind the affiliate reports and ops commands.
+
+Everything here is a grouped aggregate, a correlated subquery or a plain
+``values()`` queryset, so callers can stream rows with ``.iterator()``
+instead of loading model instances and summing them in Python.
+Reports read CommissionHistory, which covers archived commissions too;
+anything that changes commissions uses AffiliateCommission.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, DecimalField, Exists, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from apps.subscriptions.models import Payment
+from .models import AffiliateCommission, AffiliateStats, CommissionHistory, LedgerEntry, PayoutRequest
+
+User = get_user_model()
+
+ACTIVE_SUBSCRIPTION_STATUSES = ('active', 'trialing')
+
+# Payout requests that still claim part of the affiliate's balance
+OPEN_PAYOUT_STATUSES = ('pending', 'approved')
+
+ZERO_AMOUNT = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def _subquery_count(queryset, key):
+    counts = queryset.order_by().values(key).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _subquery_sum(queryset, key, field):
+    sums = queryset.order_by().values(key).annotate(total=Sum(field)).values('total')
+    return Coalesce(Subquery(sums, output_field=DecimalField(max_digits=12, decimal_places=2)), ZERO_AMOUNT)
+
+
+def count_all(**querysets):
+    """
+    Count several querysets in one round trip: {name: count}. Each is
+    compiled by the ORM and embedded as a scalar COUNT(*) subquery of a
+    single SELECT.
+    """
+    selects, params = [], []
+    for name, queryset in querysets.items():
+        sql, query_params = queryset.order_by().values('pk').query.sql_with_params()
+        selects.append(f"(SELECT COUNT(*) FROM ({sql}) AS {connection.ops.quote_name(name + '_rows')}) "
+                       f"AS {connection.ops.quote_name(name)}")
+        params.extend(query_params)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(selects)}", params)
+        return dict(zip(querysets, cursor.fetchone()))
+
+
+def commission_totals():
+    """Count and amount of commissions per status"""
+    return (
+        CommissionHistory.objects.order_by()
+        .values('status')
+        .annotate(count=Count('id'), amount=Coalesce(Sum('commission_amount'), ZERO_AMOUNT))
+        .order_by('status')
+    )
+
+
+def month_start(moment, months_back=0):
+    """Midnight on the first day of the month `months_back` months before `moment`"""
+    year, month = divmod(moment.year * 12 + moment.month - 1 - months_back, 12)
+    return moment.replace(year=year, month=month + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def monthly_commission_totals(months=6, affiliate_id=None):
+    """
+    Count and amount per calendar month, newest first, for the last
+    `months` months including the current one. One grouped query;
+    months without commissions are filled in with zeros.
+    """
+    months_start = [month_start(timezone.localtime(), back) for back in range(months)]
+    queryset = CommissionHistory.objects.filter(created_at__gte=months_start[-1])
+    if affiliate_id:
+        queryset = queryset.filter(affiliate_id=affiliate_id)
+    grouped = {
+        row['month'].date(): row
+        for row in queryset.order_by()
+        .annotate(month=TruncMonth('created_at'))
+        .values('month')
+        .annotate(count=Count('id'), amount=Sum('commission_amount'))
+    }
+    rows = []
+    for start in months_start:
+        row = grouped.get(start.date(), {})
+        rows.append({
+            'month': start.strftime('%Y-%m'),
+            'count': row.get('count', 0),
+            'amount': row.get('amount') or Decimal('0.00'),
+        })
+    return rows
+
+
+def top_affiliates(limit=10):
+    """Affiliates by stored total earned, with the user joined in"""
+    return (
+        AffiliateStats.objects.filter(total_commission_earned__gt=0)
+        .order_by('-total_commission_earned')
+        .values(
+            'total_referrals',
+            email=F('user__email'),
+            earned=F('total_commission_earned'),
+            paid=F('total_commission_paid'),
+            available=F('total_commission_earned') - F('total_commission_paid'),
+        )[:limit]
+    )
+
+
+def affiliate_rows():
+    """Every affiliate with a commission and their live totals, one grouped query"""
+    referrals = User.objects.filter(referred_by=OuterRef('affiliate_id'))
+    return (
+        CommissionHistory.objects.order_by()
+        .values('affiliate_id', email=F('affiliate__email'))
+        .annotate(
+            commissions=Count('id'),
+            earned=Sum('commission_amount'),
+            paid=Coalesce(Sum('commission_amount', filter=Q(status='paid')), ZERO_AMOUNT),
+            pending=Coalesce(Sum('commission_amount', filter=Q(status='pending')), ZERO_AMOUNT),
+            referrals=_subquery_count(referrals, 'referred_by'),
+        )
+        .order_by('email')
+    )
+
+
+def commission_totals_by_affiliate(affiliate_ids):
+    """{affiliate_id: {'earned', 'paid', 'pending'}} in one grouped query"""
+    rows = (
+        CommissionHistory.objects.filter(affiliate_id__in=affiliate_ids).order_by()
+        .values('affiliate_id')
+        .annotate(
+            earned=Sum('commission_amount'),
+            paid=Coalesce(Sum('commission_amount', filter=Q(status='paid')), ZERO_AMOUNT),
+            pending=Coalesce(Sum('commission_amount', filter=Q(status='pending')), ZERO_AMOUNT),
+        )
+    )
+    return {row.pop('affiliate_id'): row for row in rows}
+
+
+def referral_counts_by_affiliate(affiliate_ids):
+    """{affiliate_id: {'total', 'active'}} in one grouped query"""
+    rows = (
+        User.objects.filter(referred_by_id__in=affiliate_ids).order_by()
+        .values('referred_by_id')
+        .annotate(
+            total=Count('id'),
+            active=Count('id', filter=Q(subscription__status__in=ACTIVE_SUBSCRIPTION_STATUSES)),
+        )
+    )
+    return {row.pop('referred_by_id'): row for row in rows}
+
+
+def affiliate_ids_with_commissions():
+    return CommissionHistory.objects.order_by().values_list('affiliate_id', flat=True).distinct()
+
+
+def pending_commission_rows():
+    """
+    Affiliates owed something, with their pending total and count, in one
+    grouped query. Pending commissions are never archived, so this reads
+    the hot table.
+    """
+    return (
+        AffiliateCommission.objects.filter(status='pending').order_by()
+        .values('affiliate_id', email=F('affiliate__email'), first_name=F('affiliate__first_name'))
+        .annotate(pending_total=Sum('commission_amount'), pending_count=Count('id'))
+        .filter(pending_total__gt=0)
+        .order_by('affiliate_id')
+    )
+
+
+def commission_rows(status=None, affiliate_email=None, since=None, ids=None):
+    queryset = CommissionHistory.objects.all()
+    if status:
+        queryset = queryset.filter(status=status)
+    if affiliate_email:
+        queryset = queryset.filter(affiliate__email=affiliate_email)
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    if ids:
+        queryset = queryset.filter(id__in=ids)
+    return queryset.order_by('-created_at').values(
+        'id', 'commission_amount', 'commission_type', 'status', 'payment_id', 'created_at', 'paid_at', 'archived',
+        affiliate_email=F('affiliate__email'),
+        referred_email=F('referred_user__email'),
+    )
+
+
+def referral_rows(affiliate_email=None, since=None):
+    """Referred users with their referrer, subscription and payment/commission counts"""
+    queryset = User.objects.filter(referred_by__isnull=False)
+    if affiliate_email:
+        queryset = queryset.filter(referred_by__email=affiliate_email)
+    if since:
+        queryset = queryset.filter(date_joined__gte=since)
+
+    payments = Payment.objects.filter(subscription__user=OuterRef('pk'))
+    commissions = CommissionHistory.objects.filter(referred_user=OuterRef('pk'))
+    return queryset.order_by('-date_joined').values(
+        'id', 'email', 'date_joined',
+        referrer_email=F('referred_by__email'),
+        subscription_status=F('subscription__status'),
+        payments=_subquery_count(payments, 'subscription__user'),
+        commissions=_subquery_count(commissions, 'referred_user'),
+        commission_amount=_subquery_sum(commissions, 'referred_user', 'commission_amount'),
+    )
+
+
+def unprocessed_payments():
+    """Succeeded payments of referred users that have no commission row"""
+    return Payment.objects.filter(
+        status='succeeded',
+        subscription__user__referred_by__isnull=False,
+    ).filter(
+        ~Exists(CommissionHistory.objects.filter(payment=OuterRef('pk')))
+    )
+
+
+def unprocessed_payment_rows():
+    return unprocessed_payments().order_by('-created_at').values(
+        'id', 'amount', 'created_at',
+        user_email=F('subscription__user__email'),
+        referrer_email=F('subscription__user__referred_by__email'),
+    )
+
+
+def affiliate_summary_rows(affiliate_email):
+    """Live totals for one affiliate, computed in a single statement"""
+    commissions = CommissionHistory.objects.filter(affiliate=OuterRef('pk'))
+    referrals = User.objects.filter(referred_by=OuterRef('pk'))
+    return User.objects.filter(email=affiliate_email).values(
+        'id', 'email', 'referral_code',
+        referrals=_subquery_count(referrals, 'referred_by'),
+        active_referrals=_subquery_count(
+            referrals.filter(subscription__status__in=ACTIVE_SUBSCRIPTION_STATUSES), 'referred_by'
+        ),
+        earned=_subquery_sum(commissions, 'affiliate', 'commission_amount'),
+        paid=_subquery_sum(commissions.filter(status='paid'), 'affiliate', 'commission_amount'),
+        pending=_subquery_sum(commissions.filter(status='pending'), 'affiliate', 'commission_amount'),
+    )
+
+
+def available_payout_balance(affiliate_id):
+    """
+    What an affiliate can still request: pending commissions not reserved
+    by a payout, less the amounts of open requests. Live, in one statement.
+    """
+    commissions = AffiliateCommission.objects.filter(
+        affiliate=OuterRef('pk'), status='pending', payout_request__isnull=True,
+    )
+    payouts = PayoutRequest.objects.filter(affiliate=OuterRef('pk'), status__in=OPEN_PAYOUT_STATUSES)
+    balance = User.objects.filter(pk=affiliate_id).values_list(
+        _subquery_sum(commissions, 'affiliate', 'commission_amount') - _subquery_sum(payouts, 'affiliate', 'amount'),
+        flat=True,
+    ).first()
+    return balance or Decimal('0.00')
+
+
+def ledger_rows(affiliate_id, since=None, until=None):
+    """An affiliate's ledger entries, oldest first; a range scan of (affiliate, created_at)"""
+    queryset = LedgerEntry.objects.filter(affiliate_id=affiliate_id)
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    if until:
+        queryset = queryset.filter(created_at__lt=until)
+    return queryset.order_by('created_at', 'id').values(
+        'id', 'entry_type', 'amount', 'commission_id', 'payout_request_id', 'description', 'created_at',
+    )
+
+
+def payout_rows(status=None):
+    queryset = PayoutRequest.objects.all()
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset.order_by('-created_at').values(
+        'id', 'amount', 'status', 'payment_method', 'created_at', 'processed_at',
+        affiliate_email=F('affiliate__email'),
+    )
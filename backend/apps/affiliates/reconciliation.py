@@ -0,0 +1,185 @@
+"""
+Reconciliation of subscriptions, payments and commissions.
+
+Each phase finds what is missing with one anti-join query and fixes it
+in primary-key chunks, one transaction per chunk:
+
+    payments         active/trialing subscriptions without any payment
+                     get a succeeded payment for the plan price
+    commissions      succeeded payments of referred users without a
+                     commission get a pending commission
+    payment_amounts  payments whose affiliate_commission is empty while
+                     commissions exist get it set from their sum
+
+Rows are written with bulk_create / a single UPDATE, new commissions are
+credited to the ledger in one posting, and the affected affiliates'
+stats are refreshed once per chunk. The last id of every
+committed chunk is stored in ReconciliationCheckpoint, so a run that is
+interrupted resumes after it; a run that finished starts over next time.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, Exists, F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from apps.subscriptions.models import Payment, Subscription
+from .ledger import credit_commissions
+from .models import AffiliateCommission, CommissionHistory, ReconciliationCheckpoint
+from .queries import ACTIVE_SUBSCRIPTION_STATUSES, count_all, unprocessed_payments
+from .stats import refresh_affiliate_stats
+
+logger = logging.getLogger(__name__)
+
+COMMISSION_RATE = Decimal('0.30')
+CENT = Decimal('0.01')
+
+PHASES = ('payments', 'commissions', 'payment_amounts')
+
+
+def subscriptions_without_payments(since=None):
+    queryset = Subscription.objects.filter(status__in=ACTIVE_SUBSCRIPTION_STATUSES).filter(
+        ~Exists(Payment.objects.filter(subscription=OuterRef('pk')))
+    )
+    return queryset.filter(created_at__gte=since) if since else queryset
+
+
+def payments_without_commissions(since=None):
+    queryset = unprocessed_payments()
+    return queryset.filter(created_at__gte=since) if since else queryset
+
+
+def payments_without_commission_amount(since=None):
+    queryset = Payment.objects.filter(affiliate_commission__isnull=True).filter(
+        Exists(CommissionHistory.objects.filter(payment=OuterRef('pk')))
+    )
+    return queryset.filter(created_at__gte=since) if since else queryset
+
+
+def commission_amount(payment_amount):
+    return (payment_amount * COMMISSION_RATE).quantize(CENT)
+
+
+def _create_payments(subscription_ids):
+    rows = Subscription.objects.filter(id__in=subscription_ids).values('id', price=F('plan__price'))
+    payments = [
+        Payment(
+            subscription_id=row['id'],
+            # Deterministic, so a repeated chunk cannot create a second payment
+            stripe_payment_intent_id=f"pi_reconciled_{row['id']}",
+            amount=row['price'],
+            currency='USD',
+            status='succeeded',
+        )
+        for row in rows
+    ]
+    Payment.objects.bulk_create(payments, ignore_conflicts=True)
+    return len(payments), sum((payment.amount for payment in payments), Decimal('0.00')), []
+
+
+def _create_commissions(payment_ids):
+    rows = Payment.objects.filter(id__in=payment_ids).values(
+        'id', 'amount',
+        user_id=F('subscription__user_id'),
+        affiliate_id=F('subscription__user__referred_by_id'),
+    )
+    commissions, payments = [], []
+    for row in rows:
+        amount = commission_amount(row['amount'])
+        commissions.append(AffiliateCommission(
+            affiliate_id=row['affiliate_id'],
+            referred_user_id=row['user_id'],
+            payment_id=row['id'],
+            commission_amount=amount,
+            commission_percentage=COMMISSION_RATE * 100,
+            commission_type='subscription',
+            status='pending',
+        ))
+        payments.append(Payment(id=row['id'], affiliate_commission=amount))
+    AffiliateCommission.objects.bulk_create(commissions, batch_size=1000)
+    credit_commissions(commissions)
+    Payment.objects.bulk_update(payments, ['affiliate_commission'], batch_size=1000)
+    total = sum((commission.commission_amount for commission in commissions), Decimal('0.00'))
+    return len(commissions), total, {commission.affiliate_id for commission in commissions}
+
+
+def _fill_commission_amounts(payment_ids):
+    sums = (
+        CommissionHistory.objects.filter(payment=OuterRef('pk')).order_by()
+        .values('payment').annotate(total=Sum('commission_amount')).values('total')
+    )
+    updated = Payment.objects.filter(id__in=payment_ids).update(
+        affiliate_commission=Subquery(sums, output_field=DecimalField(max_digits=10, decimal_places=2))
+    )
+    return updated, Decimal('0.00'), []
+
+
+PHASE_SOURCES = {
+    'payments': (subscriptions_without_payments, _create_payments),
+    'commissions': (payments_without_commissions, _create_commissions),
+    'payment_amounts': (payments_without_commission_amount, _fill_commission_amounts),
+}
+
+
+def pending_counts(since=None):
+    """How many rows each phase would fix, in one round trip"""
+    return count_all(**{phase: source(since) for phase, (source, _) in PHASE_SOURCES.items()})
+
+
+def _checkpoint(phase, restart):
+    checkpoint, _ = ReconciliationCheckpoint.objects.get_or_create(name=phase)
+    if restart or checkpoint.finished_at:
+        checkpoint.last_id = 0
+        checkpoint.rows = 0
+        checkpoint.started_at = timezone.now()
+        checkpoint.finished_at = None
+        checkpoint.save()
+    return checkpoint
+
+
+def run_phase(phase, chunk_size=2000, since=None, restart=False, progress=None):
+    source, apply = PHASE_SOURCES[phase]
+    checkpoint = _checkpoint(phase, restart)
+    result = {'phase': phase, 'resumed_after': checkpoint.last_id, 'chunks': 0, 'rows': 0, 'amount': Decimal('0.00')}
+
+    while True:
+        with transaction.atomic():
+            ids = list(
+                source(since).filter(pk__gt=checkpoint.last_id)
+                .order_by('pk')
+                .select_for_update(skip_locked=True, of=('self',))
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            written, amount, affiliate_ids = apply(ids)
+            if affiliate_ids:
+                refresh_affiliate_stats(affiliate_ids)
+            checkpoint.last_id = ids[-1]
+            checkpoint.rows += written
+            checkpoint.save(update_fields=['last_id', 'rows', 'updated_at'])
+
+        result['chunks'] += 1
+        result['rows'] += written
+        result['amount'] += amount
+        logger.info(
+            'Reconciliation chunk committed',
+            extra={'phase': phase, 'last_id': checkpoint.last_id, 'rows': written},
+        )
+        if progress:
+            progress(result, checkpoint.last_id)
+        if len(ids) < chunk_size:
+            break
+
+    checkpoint.finished_at = timezone.now()
+    checkpoint.save(update_fields=['finished_at', 'updated_at'])
+    return result
+
+
+def reconcile(phases=PHASES, chunk_size=2000, since=None, restart=False, progress=None):
+    """Run the phases in order (payments first, so their commissions follow)"""
+    return [
+        run_phase(phase, chunk_size=chunk_size, since=since, restart=restart, progress=progress)
+        for phase in PHASES if phase in phases
+    ]
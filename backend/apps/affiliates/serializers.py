@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import AffiliateCommission, AffiliateStats, PayoutRequest
+from .queries import available_payout_balance
 from apps.accounts.serializers import UserSerializer
 
 
@@ -48,14 +49,11 @@ class CreatePayoutRequestSerializer(serializers.ModelSerializer):
     
     def validate_amount(self, value):
         user = self.context['request'].user
-        try:
-            stats = user.affiliate_stats
-            if value > stats.total_commission_pending:
-                raise serializers.ValidationError(
-                    f"Requested amount exceeds available balance of ${stats.total_commission_pending}"
-                )
-        except AffiliateStats.DoesNotExist:
-            raise serializers.ValidationError("No affiliate statistics found")
+        available = available_payout_balance(user.id)
+        if value > available:
+            raise serializers.ValidationError(
+                f"Requested amount exceeds available balance of ${available}"
+            )
         
         if value < 10:  # Minimum payout amount
             raise serializers.ValidationError("Minimum payout amount is $10")
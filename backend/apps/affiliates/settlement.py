@@ -0,0 +1,203 @@
+"""
+Payout settlement: marking pending commissions paid.
+
+A settlement is one statement built from Postgres data-modifying CTEs:
+
+    settled  UPDATE ... SET status = 'paid' ... RETURNING the rows it
+             paid, each linked to its affiliate's PayoutRequest
+    deltas   settled count and amount grouped per payout request
+    payouts  each PayoutRequest completed with its affiliate's amount
+    stats    AffiliateStats moved by the delta from pending to paid
+    ledger   a debit per settled commission, folded into AffiliateBalance
+
+The UPDATE re-checks status = 'pending' on every row it locks, so two
+settlements racing for the same commissions pay each of them once, and
+a commission reserved for one payout request (see payouts.py) is only
+settled by that request.
+Affiliates without an AffiliateStats row get a full refresh instead of
+a delta. The admin action, ``manage.py affiliates pay``, the
+settlements API and the payout engine all go through here.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, Q, Sum, Window
+from django.utils import timezone
+
+from .ledger import LEDGER_COLUMNS, balance_upsert_sql
+from .models import AffiliateCommission, AffiliateStats, LedgerEntry, PayoutRequest
+from .stats import refresh_affiliate_stats
+
+logger = logging.getLogger(__name__)
+
+SETTLE_SQL = """
+WITH batch (affiliate_id, payout_request_id) AS (VALUES {batch}),
+settled AS (
+    UPDATE {commissions} AS c
+    SET status = 'paid', paid_at = %s, updated_at = %s, payout_request_id = batch.payout_request_id
+    FROM batch
+    WHERE c.affiliate_id = batch.affiliate_id
+      AND c.status = 'pending'
+      AND (c.payout_request_id IS NULL OR c.payout_request_id = batch.payout_request_id)
+      AND c.id IN ({selection})
+    RETURNING c.id, c.affiliate_id, c.payout_request_id, c.commission_amount
+),
+deltas AS (
+    SELECT affiliate_id, payout_request_id, COUNT(*) AS commissions, SUM(commission_amount) AS amount
+    FROM settled
+    GROUP BY affiliate_id, payout_request_id
+),
+affiliate_deltas AS (
+    SELECT affiliate_id, SUM(amount) AS amount FROM deltas GROUP BY affiliate_id
+),
+payouts AS (
+    UPDATE {payouts} AS p
+    SET amount = deltas.amount, status = 'completed', processed_at = %s, updated_at = %s
+    FROM deltas
+    WHERE p.id = deltas.payout_request_id
+),
+stats AS (
+    UPDATE {stats} AS s
+    SET total_commission_paid = s.total_commission_paid + affiliate_deltas.amount,
+        total_commission_pending = GREATEST(s.total_commission_pending - affiliate_deltas.amount, 0),
+        last_updated = %s
+    FROM affiliate_deltas
+    WHERE s.user_id = affiliate_deltas.affiliate_id
+    RETURNING s.user_id
+),
+ledger AS (
+    INSERT INTO {ledger} ({ledger_columns})
+    SELECT affiliate_id, 'debit', -commission_amount, id, payout_request_id, 'Payout ' || payout_request_id, %s
+    FROM settled
+    RETURNING affiliate_id, entry_type, amount
+),
+balances AS ({balance_upsert})
+SELECT deltas.affiliate_id, deltas.payout_request_id, deltas.commissions, deltas.amount,
+       stats.user_id IS NOT NULL
+FROM deltas LEFT JOIN stats ON stats.user_id = deltas.affiliate_id
+"""
+
+SETTLED_COLUMNS = ('affiliate_id', 'payout_request_id', 'commissions', 'amount', 'has_stats')
+
+
+class SettlementError(Exception):
+    pass
+
+
+def _settle(commissions, payout_request_ids, paid_at):
+    """Run SETTLE_SQL for `commissions` with [(affiliate_id, payout_request_id)]; one row per request paid"""
+    if not payout_request_ids:
+        return []
+    selection, selection_params = commissions.order_by().values('pk').query.sql_with_params()
+    sql = SETTLE_SQL.format(
+        batch=', '.join(['(%s::bigint, %s::bigint)'] * len(payout_request_ids)),
+        commissions=connection.ops.quote_name(AffiliateCommission._meta.db_table),
+        payouts=connection.ops.quote_name(PayoutRequest._meta.db_table),
+        stats=connection.ops.quote_name(AffiliateStats._meta.db_table),
+        ledger=connection.ops.quote_name(LedgerEntry._meta.db_table),
+        ledger_columns=', '.join(LEDGER_COLUMNS),
+        balance_upsert=balance_upsert_sql('ledger'),
+        selection=selection,
+    )
+    params = [value for pair in payout_request_ids for value in pair]
+    params += [paid_at, paid_at, *selection_params, paid_at, paid_at, paid_at, paid_at, paid_at]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [dict(zip(SETTLED_COLUMNS, row)) for row in cursor.fetchall()]
+
+
+def _result(rows, paid_at):
+    missing_stats = [row['affiliate_id'] for row in rows if not row['has_stats']]
+    if missing_stats:
+        refresh_affiliate_stats(missing_stats)
+    return {
+        'commissions': sum(row['commissions'] for row in rows),
+        'amount': sum((row['amount'] for row in rows), Decimal('0.00')),
+        'affiliates': len(rows),
+        'payout_requests': sorted(row['payout_request_id'] for row in rows),
+        'paid_at': paid_at,
+    }
+
+
+def settle_commissions(commissions, payment_method='bank_transfer', payment_details=None, notes='', paid_at=None):
+    """
+    Mark the pending commissions in `commissions` (a queryset) paid,
+    except those reserved for a payout request. Every affiliate involved
+    gets one completed PayoutRequest for its share.
+    """
+    paid_at = paid_at or timezone.now()
+    pending = commissions.filter(status='pending', payout_request__isnull=True)
+    with transaction.atomic():
+        affiliate_ids = list(pending.order_by().values_list('affiliate_id', flat=True).distinct())
+        payouts = PayoutRequest.objects.bulk_create([
+            PayoutRequest(
+                affiliate_id=affiliate_id,
+                amount=Decimal('0.00'),
+                status='processing',
+                payment_method=payment_method,
+                payment_details=payment_details or {},
+                admin_notes=notes or None,
+            )
+            for affiliate_id in affiliate_ids
+        ])
+        rows = _settle(pending, [(payout.affiliate_id, payout.id) for payout in payouts], paid_at)
+
+        # Affiliates whose commissions a concurrent settlement paid first
+        used = {row['payout_request_id'] for row in rows}
+        PayoutRequest.objects.filter(id__in=[payout.id for payout in payouts if payout.id not in used]).delete()
+        result = _result(rows, paid_at)
+
+    logger.info(
+        'Commissions settled',
+        extra={'commissions': result['commissions'], 'amount': str(result['amount']), 'affiliates': result['affiliates']},
+    )
+    return result
+
+
+def settle_payout_request(payout_request_id, paid_at=None):
+    """
+    Pay a pending payout request from the affiliate's oldest pending
+    commissions, as many as fit in the requested amount. The request is
+    completed with the amount actually settled.
+    """
+    paid_at = paid_at or timezone.now()
+    with transaction.atomic():
+        try:
+            payout = PayoutRequest.objects.select_for_update().get(id=payout_request_id)
+        except PayoutRequest.DoesNotExist:
+            raise SettlementError(f"Payout request {payout_request_id} does not exist")
+        # Processing requests belong to the payout engine
+        if payout.status not in ('pending', 'approved'):
+            raise SettlementError(f"Payout request {payout.id} is already {payout.status}")
+
+        running_total = Window(Sum('commission_amount'), order_by=[F('created_at').asc(), F('id').asc()])
+        selection = (
+            AffiliateCommission.objects.filter(affiliate_id=payout.affiliate_id, status='pending')
+            .filter(Q(payout_request__isnull=True) | Q(payout_request=payout))
+            .annotate(running_total=running_total)
+            .filter(running_total__lte=payout.amount)
+        )
+        rows = _settle(selection, [(payout.affiliate_id, payout.id)], paid_at)
+        if not rows:
+            raise SettlementError(f"No pending commissions of {payout.affiliate_id} fit payout request {payout.id}")
+        result = _result(rows, paid_at)
+
+    logger.info(
+        'Payout request settled',
+        extra={'payout_request_id': payout.id, 'commissions': result['commissions'], 'amount': str(result['amount'])},
+    )
+    return result
+
+
+def settle_reserved(payout_request_ids, paid_at=None):
+    """
+    Settle payout requests that the payout engine paid: their reserved
+    commissions become paid and the requests completed, in one statement.
+    """
+    paid_at = paid_at or timezone.now()
+    with transaction.atomic():
+        batch = list(PayoutRequest.objects.filter(id__in=payout_request_ids).values_list('affiliate_id', 'id'))
+        reserved = AffiliateCommission.objects.filter(payout_request_id__in=payout_request_ids)
+        result = _result(_settle(reserved, batch, paid_at), paid_at)
+    return result
@@ -0,0 +1,71 @@
+"""
+Set-based AffiliateStats refresh.
+
+refresh_affiliate_stats() recomputes a whole chunk of affiliates with
+two grouped queries and writes them back with one bulk_update/bulk_create.
+Totals are read from CommissionHistory, so archiving commissions leaves
+them unchanged; AffiliateStats.update_stats() refreshes a chunk of one.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AffiliateStats
+from .queries import affiliate_ids_with_commissions, commission_totals_by_affiliate, referral_counts_by_affiliate
+
+STATS_FIELDS = [
+    'total_referrals', 'active_referrals', 'total_commission_earned',
+    'total_commission_paid', 'total_commission_pending', 'last_updated',
+]
+
+
+def _chunks(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def refresh_affiliate_stats_chunk(affiliate_ids):
+    """Recompute and store AffiliateStats for these affiliate ids; returns how many were written"""
+    affiliate_ids = list(affiliate_ids)
+    if not affiliate_ids:
+        return 0
+
+    commissions = commission_totals_by_affiliate(affiliate_ids)
+    referrals = referral_counts_by_affiliate(affiliate_ids)
+    now = timezone.now()
+    zero = Decimal('0.00')
+
+    with transaction.atomic():
+        existing = {
+            stats.user_id: stats
+            for stats in AffiliateStats.objects.select_for_update().filter(user_id__in=affiliate_ids)
+        }
+        to_update, to_create = [], []
+        for affiliate_id in affiliate_ids:
+            stats = existing.get(affiliate_id) or AffiliateStats(user_id=affiliate_id)
+            totals = commissions.get(affiliate_id, {})
+            counts = referrals.get(affiliate_id, {})
+            stats.total_referrals = counts.get('total', 0)
+            stats.active_referrals = counts.get('active', 0)
+            stats.total_commission_earned = totals.get('earned') or zero
+            stats.total_commission_paid = totals.get('paid') or zero
+            stats.total_commission_pending = totals.get('pending') or zero
+            # bulk_update() skips auto_now
+            stats.last_updated = now
+            (to_update if stats.pk else to_create).append(stats)
+
+        AffiliateStats.objects.bulk_update(to_update, STATS_FIELDS)
+        AffiliateStats.objects.bulk_create(to_create, ignore_conflicts=True)
+    return len(affiliate_ids)
+
+
+def refresh_affiliate_stats(affiliate_ids=None, chunk_size=500):
+    """
+    Refresh stats for the given affiliates (every affiliate with a
+    commission when None), chunk_size affiliates per transaction.
+    """
+    if affiliate_ids is None:
+        affiliate_ids = affiliate_ids_with_commissions()
+    affiliate_ids = sorted(set(affiliate_ids))
+    return sum(refresh_affiliate_stats_chunk(chunk) for chunk in _chunks(affiliate_ids, chunk_size))
@@ -1,90 +1,44 @@
 """
 Celery tasks for processing automatic commissions
 """
-from celery import shared_task
+from celery import chord, group, shared_task
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
 from django.utils import timezone
-from django.db import transaction
 from datetime import timedelta
-from decimal import Decimal
 import logging
 
-from apps.subscriptions.models import Payment
-from .models import AffiliateCommission, AffiliateStats
+# Configures the Celery app that .delay() sends through
+import clinical_platform.celery  # noqa: F401
+from clinical_platform.archive import archive
+
+from . import queries
+from .ledger import take_balance_snapshots
+from .payouts import process_payouts as run_payouts
+from .reconciliation import run_phase
+from .stats import refresh_affiliate_stats_chunk as refresh_stats_chunk
 
 logger = logging.getLogger(__name__)
 
+COMMISSION_REPORT_SUBJECT = "Weekly Commission Report - Clinical Nutrition Platform"
+
 @shared_task
 def process_affiliate_commissions():
     """
     Automatic commission processing task
-    Runs daily to process new payments
+    Runs daily: creates commissions for last week's payments in chunked bulk inserts
     """
     logger.info("🚀 Starting automatic commission processing")
     
-    processed_count = 0
-    total_commission_amount = Decimal('0.00')
-    commission_rate = Decimal('0.30')  # 30%
-    
     try:
-        # Find successful payments whose commissions haven't been processed
-        new_payments = Payment.objects.filter(
-            status='succeeded',
-            affiliate_commission__isnull=True,  # Commission not processed
-            subscription__user__referred_by__isnull=False,  # User was referred
-            created_at__gte=timezone.now() - timedelta(days=7)  # Last week
-        ).select_related(
-            'subscription__user__referred_by',
-            'subscription__plan'
-        )
+        result = run_phase('commissions', since=timezone.now() - timedelta(days=7))
         
-        logger.info(f"📊 Found {new_payments.count()} new payments")
-        
-        for payment in new_payments:
-            try:
-                with transaction.atomic():
-                    subscription = payment.subscription
-                    referred_user = subscription.user
-                    affiliate = referred_user.referred_by
-                    
-                    if not affiliate:
-                        continue
-                    
-                    # Calculate commission (30% of amount)
-                    commission_amount = payment.amount * commission_rate
-                    
-                    # Create commission record
-                    commission = AffiliateCommission.objects.create(
-                        affiliate=affiliate,
-                        referred_user=referred_user,
-                        payment=payment,
-                        commission_amount=commission_amount,
-                        commission_percentage=commission_rate * 100,
-                        commission_type='subscription',
-                        status='pending'
-                    )
-                    
-                    # Update payment to record commission
-                    payment.affiliate_commission = commission_amount
-                    payment.save()
-                    
-                    # Update affiliate stats
-                    stats, created = AffiliateStats.objects.get_or_create(user=affiliate)
-                    stats.update_stats()
-                    
-                    processed_count += 1
-                    total_commission_amount += commission_amount
-                    
-                    logger.info(f"✅ Commission created: {affiliate.email} - ${commission_amount}")
-                
-            except Exception as e:
-                logger.error(f"❌ Error processing payment {payment.id}: {str(e)}")
-                continue
-        
-        logger.info(f"✅ Commission processing finished: {processed_count} commissions, total ${total_commission_amount}")
+        logger.info(f"✅ Commission processing finished: {result['rows']} commissions, total ${result['amount']}")
         
         return {
-            'processed_count': processed_count,
-            'total_amount': float(total_commission_amount),
+            'processed_count': result['rows'],
+            'total_amount': float(result['amount']),
             'status': 'success'
         }
         
@@ -98,154 +52,239 @@ def process_affiliate_commissions():
         }
 
 @shared_task
-def update_affiliate_stats():
+def process_payouts():
     """
-    Task to update affiliate stats
-    Runs daily to update all stats
+    Payout engine task
+    Runs hourly: pays approved payout requests through PAYOUT_RAIL in batches
     """
-    logger.info("🔄 Starting affiliates stats update")
+    logger.info("💸 Starting payout processing")
     
     try:
-        # Get all affiliates
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        affiliates = User.objects.filter(
-            affiliate_commissions__isnull=False
-        ).distinct()
+        result = run_payouts()
         
-        updated_count = 0
-        for affiliate in affiliates:
-            try:
-                stats, created = AffiliateStats.objects.get_or_create(user=affiliate)
-                stats.update_stats()
-                updated_count += 1
-                
-                if created:
-                    logger.info(f"➕ Created new stats: {affiliate.email}")
-                
-            except Exception as e:
-                logger.error(f"❌ Error updating stats for {affiliate.email}: {str(e)}")
-                continue
+        logger.info(
+            f"✅ Payouts finished: {result['paid']} paid (${result['amount']}), "
+            f"{result['failed']} failed, {result['requeued']} requeued"
+        )
         
-        logger.info(f"✅ Updated stats for {updated_count} affiliates")
+        return {
+            'paid_count': result['paid'],
+            'failed_count': result['failed'],
+            'total_amount': float(result['amount']),
+            'status': 'success'
+        }
         
+    except Exception as e:
+        logger.error(f"❌ Error processing payouts: {str(e)}")
         return {
-            'updated_count': updated_count,
+            'paid_count': 0,
+            'failed_count': 0,
+            'total_amount': 0,
+            'status': 'error',
+            'error': str(e)
+        }
+
+@shared_task
+def snapshot_affiliate_balances():
+    """
+    Ledger snapshot task
+    Runs daily: copies every affiliate balance into today's snapshot
+    """
+    try:
+        count = take_balance_snapshots()
+        logger.info(f"📸 Snapshotted {count} affiliate balances")
+        return {
+            'snapshot_count': count,
             'status': 'success'
         }
         
     except Exception as e:
-        logger.error(f"❌ Error updating stats: {str(e)}")
+        logger.error(f"❌ Error snapshotting balances: {str(e)}")
         return {
-            'updated_count': 0,
+            'snapshot_count': 0,
             'status': 'error',
             'error': str(e)
         }
 
 @shared_task
-def send_commission_notifications():
+def update_affiliate_stats(chunk_size=500):
     """
-    Task to send commission notifications
-    Runs weekly to send reports to affiliates
+    Task to update affiliate stats
+    Runs daily: splits affiliates into chunks refreshed by a chord of subtasks
     """
-    logger.info("📧 Starting commission notifications sending")
+    logger.info("🔄 Starting affiliates stats update")
     
     try:
-        from django.core.mail import send_mail
-        from django.conf import settings
-        from django.contrib.auth import get_user_model
+        affiliate_ids = sorted(queries.affiliate_ids_with_commissions())
+        chunks = [affiliate_ids[start:start + chunk_size] for start in range(0, len(affiliate_ids), chunk_size)]
+        if chunks:
+            chord(
+                update_affiliate_stats_chunk.s(chunk, index, len(chunks)) for index, chunk in enumerate(chunks)
+            )(finish_affiliate_stats_update.s())
         
-        User = get_user_model()
+        logger.info(f"🔄 Queued stats refresh for {len(affiliate_ids)} affiliates in {len(chunks)} chunks")
         
-        # Get affiliates with pending commissions
-        affiliates_with_pending = User.objects.filter(
-            affiliate_commissions__status='pending'
-        ).distinct()
+        return {
+            'affiliates': len(affiliate_ids),
+            'chunks': len(chunks),
+            'status': 'success'
+        }
         
-        sent_count = 0
-        for affiliate in affiliates_with_pending:
-            try:
-                # Calculate pending commissions
-                pending_commissions = AffiliateCommission.objects.filter(
-                    affiliate=affiliate,
-                    status='pending'
-                )
-                total_pending = sum(c.commission_amount for c in pending_commissions)
-                
-                if total_pending > 0:
-                    # Send email
-                    subject = f"Weekly Commission Report - Clinical Nutrition Platform"
-                    message = f"""
-Hello {affiliate.first_name or affiliate.email},
+    except Exception as e:
+        logger.error(f"❌ Error updating stats: {str(e)}")
+        return {
+            'affiliates': 0,
+            'status': 'error',
+            'error': str(e)
+        }
 
-You have pending commissions in the affiliate system:
 
-💰 Total pending commissions: ${total_pending:.2f}
-📊 Number of commissions: {pending_commissions.count()}
+@shared_task
+def update_affiliate_stats_chunk(affiliate_ids, index, total):
+    """
+    Refresh one chunk of affiliate stats: one grouped aggregate and one bulk write
+    Failures are returned rather than raised so the chord callback still runs
+    """
+    try:
+        updated_count = refresh_stats_chunk(affiliate_ids)
+        logger.info(f"📊 Stats chunk {index + 1}/{total}: updated {updated_count} affiliates")
+        return {
+            'chunk': index,
+            'updated_count': updated_count,
+            'status': 'success'
+        }
+    except Exception as e:
+        logger.error(
+            f"❌ Stats chunk {index + 1}/{total} failed (affiliates {affiliate_ids[0]}-{affiliate_ids[-1]}): {str(e)}"
+        )
+        return {
+            'chunk': index,
+            'updated_count': 0,
+            'affiliate_ids': affiliate_ids,
+            'status': 'error',
+            'error': str(e)
+        }
 
-You can request a payout from the affiliate dashboard on the site.
 
-Thank you for partnering with us!
+@shared_task
+def finish_affiliate_stats_update(results):
+    """Chord callback: totals of the stats refresh and the chunks that failed"""
+    failed = [result for result in results if result['status'] != 'success']
+    updated_count = sum(result['updated_count'] for result in results)
+    if failed:
+        logger.error(f"❌ Stats update: {len(failed)}/{len(results)} chunks failed, {updated_count} affiliates updated")
+    else:
+        logger.info(f"✅ Updated stats for {updated_count} affiliates in {len(results)} chunks")
+    return {
+        'updated_count': updated_count,
+        'chunks': len(results),
+        'failed_chunks': [
+            {'chunk': result['chunk'], 'affiliate_ids': result['affiliate_ids'], 'error': result['error']}
+            for result in failed
+        ],
+        'status': 'error' if failed else 'success'
+    }
 
-Clinical Nutrition Platform Team
-                    """
-                    
-                    send_mail(
-                        subject,
-                        message,
-                        settings.DEFAULT_FROM_EMAIL,
-                        [affiliate.email],
-                        fail_silently=True
-                    )
-                    
-                    sent_count += 1
-                    logger.info(f"📧 Notification sent to: {affiliate.email}")
-                
-            except Exception as e:
-                logger.error(f"❌ خطأ في إرسال إشعار إلى {affiliate.email}: {str(e)}")
-                continue
+@shared_task
+def send_commission_notifications(chunk_size=100):
+    """
+    Task to send commission notifications
+    Runs weekly: one grouped query, then chunks of emails sent in parallel subtasks
+    """
+    logger.info("📧 Starting commission notifications sending")
+    
+    try:
+        # Plain strings so the rows serialize into the subtask messages
+        rows = [
+            (row['email'], row['first_name'] or row['email'], f"{row['pending_total']:.2f}", row['pending_count'])
+            for row in queries.pending_commission_rows().iterator()
+        ]
+        chunks = [rows[start:start + chunk_size] for start in range(0, len(rows), chunk_size)]
+        if chunks:
+            group(send_commission_notification_chunk.s(chunk) for chunk in chunks).apply_async()
         
-        logger.info(f"✅ تم إرسال {sent_count} إشعار")
+        logger.info(f"📧 Queued notifications for {len(rows)} affiliates in {len(chunks)} chunks")
         
         return {
-            'sent_count': sent_count,
+            'affiliates': len(rows),
+            'chunks': len(chunks),
             'status': 'success'
         }
         
     except Exception as e:
         logger.error(f"❌ Error sending notifications: {str(e)}")
+        return {
+            'affiliates': 0,
+            'status': 'error',
+            'error': str(e)
+        }
+
+
+@shared_task
+def send_commission_notification_chunk(rows):
+    """
+    Send one chunk of weekly commission reports over a single SMTP connection
+    rows: (email, name, pending_total, pending_count)
+    A refused address is recorded and the rest of the chunk is still sent
+    """
+    sent_count = 0
+    failed = []
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception as e:
+        logger.error(f"❌ Could not open mail connection for {len(rows)} commission notifications: {str(e)}")
         return {
             'sent_count': 0,
+            'failed': [email for email, *_ in rows],
             'status': 'error',
             'error': str(e)
         }
+    
+    try:
+        for email, name, pending_total, pending_count in rows:
+            message = EmailMessage(
+                COMMISSION_REPORT_SUBJECT,
+                render_to_string('affiliates/email/commission_report.txt', {
+                    'name': name,
+                    'pending_total': pending_total,
+                    'pending_count': pending_count,
+                }),
+                settings.DEFAULT_FROM_EMAIL,
+                [email],
+                connection=connection,
+            )
+            try:
+                sent_count += message.send()
+            except Exception as e:
+                logger.error(f"❌ Error sending commission notification to {email}: {str(e)}")
+                failed.append(email)
+    finally:
+        connection.close()
+    
+    logger.info(f"✅ Sent {sent_count} commission notifications, {len(failed)} failed")
+    return {
+        'sent_count': sent_count,
+        'failed': failed,
+        'status': 'error' if failed else 'success'
+    }
 
 @shared_task
 def cleanup_old_commissions():
     """
     Task to clean up old commissions
-    Runs monthly to archive old commissions
+    Runs monthly to move old paid commissions to the archive table
     """
     logger.info("🧹 Starting old commissions cleanup")
     
     try:
-        # Archive paid commissions older than a year
-        old_date = timezone.now() - timedelta(days=365)
-        old_commissions = AffiliateCommission.objects.filter(
-            status='paid',
-            paid_at__lt=old_date
-        )
-        
-        archived_count = old_commissions.count()
-        
-        # Archiving logic can be added here
-        # e.g., moving data to an archive table
+        # Paid commissions older than COMMISSION_ARCHIVE_DAYS move to affiliates_commission_archive
+        result = archive('commissions')
         
-        logger.info(f"📦 Found {archived_count} old commissions for archiving")
+        logger.info(f"📦 Archived {result['archived']} old commissions in {result['chunks']} chunks")
         
         return {
-            'archived_count': archived_count,
+            'archived_count': result['archived'],
             'status': 'success'
         }
         
@@ -0,0 +1,112 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from .ledger import balance_of, credit_commissions
+from .models import AffiliateCommission, PayoutRequest
+from .payouts import FakePayoutRail, STALE_PROCESSING_AFTER, process_payout_batch, process_payouts
+
+
+class PayoutEngineTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.affiliate = User.objects.create_user(
+            email='affiliate@example.com', username='affiliate', password='x', first_name='A', last_name='A',
+        )
+        self.referred = User.objects.create_user(
+            email='referred@example.com', username='referred', password='x', first_name='R', last_name='R',
+        )
+
+    def commissions(self, *amounts):
+        commissions = [
+            AffiliateCommission.objects.create(
+                affiliate=self.affiliate, referred_user=self.referred,
+                commission_amount=Decimal(amount), commission_type='subscription',
+            )
+            for amount in amounts
+        ]
+        credit_commissions(commissions)
+        return commissions
+
+    def payout(self, amount, status='approved', payment_details=None):
+        return PayoutRequest.objects.create(
+            affiliate=self.affiliate, amount=Decimal(amount), status=status,
+            payment_method='bank_transfer', payment_details=payment_details or {},
+        )
+
+    def statuses(self, commissions):
+        return [AffiliateCommission.objects.get(id=commission.id).status for commission in commissions]
+
+    def test_funded_payout_is_paid_and_debited(self):
+        commissions = self.commissions('10.00', '20.00')
+        payout = self.payout('30.00')
+
+        result = process_payout_batch(FakePayoutRail())
+
+        payout.refresh_from_db()
+        self.assertEqual(result, {'paid': 1, 'failed': 0, 'amount': Decimal('30.00')})
+        self.assertEqual(payout.status, 'completed')
+        self.assertEqual(payout.rail_reference, f"fake_{payout.id}")
+        self.assertEqual(self.statuses(commissions), ['paid', 'paid'])
+        self.assertEqual(balance_of(self.affiliate.id), Decimal('0.00'))
+
+    def test_unfunded_payout_fails(self):
+        commissions = self.commissions('50.00')
+        payout = self.payout('20.00')
+
+        result = process_payout_batch(FakePayoutRail())
+
+        payout.refresh_from_db()
+        self.assertEqual(result['failed'], 1)
+        self.assertEqual(payout.status, 'failed')
+        self.assertEqual(self.statuses(commissions), ['pending'])
+        self.assertIsNone(AffiliateCommission.objects.get(id=commissions[0].id).payout_request_id)
+        self.assertEqual(balance_of(self.affiliate.id), Decimal('50.00'))
+
+    def test_partial_funding_lowers_amount(self):
+        commissions = self.commissions('10.00', '20.00', '30.00')
+        payout = self.payout('35.00')
+
+        process_payout_batch(FakePayoutRail())
+
+        payout.refresh_from_db()
+        self.assertEqual(payout.status, 'completed')
+        self.assertEqual(payout.amount, Decimal('30.00'))
+        self.assertEqual(self.statuses(commissions), ['paid', 'paid', 'pending'])
+        self.assertEqual(balance_of(self.affiliate.id), Decimal('30.00'))
+
+    def test_failed_rail_call_releases_commissions(self):
+        commissions = self.commissions('10.00')
+        payout = self.payout('10.00', payment_details={'simulate_failure': True})
+
+        result = process_payout_batch(FakePayoutRail())
+
+        payout.refresh_from_db()
+        self.assertEqual(result, {'paid': 0, 'failed': 1, 'amount': Decimal('0.00')})
+        self.assertEqual(payout.status, 'failed')
+        self.assertEqual(payout.rejection_reason, 'Simulated failure')
+        commission = AffiliateCommission.objects.get(id=commissions[0].id)
+        self.assertEqual((commission.status, commission.payout_request_id), ('pending', None))
+        self.assertEqual(balance_of(self.affiliate.id), Decimal('10.00'))
+
+    def test_requeued_request_keeps_its_reservation(self):
+        reserved, spare = self.commissions('10.00', '10.00')
+        payout = self.payout('20.00', status='processing')
+        # A crashed run had reserved one commission and lowered the amount
+        PayoutRequest.objects.filter(id=payout.id).update(
+            amount=Decimal('10.00'), updated_at=timezone.now() - STALE_PROCESSING_AFTER - timedelta(minutes=1),
+        )
+        AffiliateCommission.objects.filter(id=reserved.id).update(payout_request=payout)
+
+        totals = process_payouts(FakePayoutRail())
+
+        payout.refresh_from_db()
+        self.assertEqual(totals['requeued'], 1)
+        self.assertEqual((totals['paid'], totals['amount']), (1, Decimal('10.00')))
+        self.assertEqual((payout.status, payout.amount), ('completed', Decimal('10.00')))
+        self.assertEqual(self.statuses([reserved, spare]), ['paid', 'pending'])
+        self.assertIsNone(AffiliateCommission.objects.get(id=spare.id).payout_request_id)
+        self.assertEqual(balance_of(self.affiliate.id), Decimal('10.00'))
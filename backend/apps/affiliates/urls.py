@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
     AffiliateStatsView, AffiliateCommissionsView, ReferralsView,
-    PayoutRequestsView, generate_referral_link, affiliate_dashboard
+    PayoutRequestsView, SettlementView, generate_referral_link, affiliate_dashboard,
+    affiliate_health_check
 )
 
 urlpatterns = [
@@ -9,6 +10,8 @@ urlpatterns = [
     path('commissions/', AffiliateCommissionsView.as_view(), name='affiliate_commissions'),
     path('referrals/', ReferralsView.as_view(), name='affiliate_referrals'),
     path('payouts/', PayoutRequestsView.as_view(), name='payout_requests'),
+    path('settlements/', SettlementView.as_view(), name='affiliate_settlements'),
     path('generate-link/', generate_referral_link, name='generate_referral_link'),
     path('dashboard/', affiliate_dashboard, name='affiliate_dashboard'),
+    path('health/', affiliate_health_check, name='affiliate_health'),
 ]
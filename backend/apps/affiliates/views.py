@@ -1,9 +1,18 @@
+from decimal import Decimal
+
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.conf import settings
 from django.db.models import Q
+from django.http import HttpResponseForbidden, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from .health import affiliate_health
+from .ledger import balance_of
 from .models import AffiliateCommission, AffiliateStats, PayoutRequest
+from .settlement import SettlementError, settle_commissions, settle_payout_request
 from .serializers import (
     AffiliateCommissionSerializer, AffiliateStatsSerializer,
     PayoutRequestSerializer, CreatePayoutRequestSerializer
@@ -99,15 +108,15 @@ class PayoutRequestsView(APIView):
         )
         
         if serializer.is_valid():
-            # Check if user has any pending payout requests
-            pending_requests = PayoutRequest.objects.filter(
+            # Check if user has a payout request that is not finished yet
+            open_requests = PayoutRequest.objects.filter(
                 affiliate=request.user,
-                status='pending'
+                status__in=['pending', 'approved', 'processing']
             )
             
-            if pending_requests.exists():
+            if open_requests.exists():
                 return Response({
-                    'error': 'You already have a pending payout request'
+                    'error': 'You already have an open payout request'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             payout_request = serializer.save(affiliate=request.user)
@@ -120,6 +129,48 @@ class PayoutRequestsView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class SettlementView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    
+    def post(self, request):
+        """Mark commissions paid: a payout_request id, or commission_ids / affiliate email"""
+        payout_request_id = request.data.get('payout_request')
+        commission_ids = request.data.get('commission_ids')
+        affiliate_email = request.data.get('affiliate')
+        
+        try:
+            if payout_request_id:
+                result = settle_payout_request(int(payout_request_id))
+            elif commission_ids or affiliate_email:
+                commissions = AffiliateCommission.objects.all()
+                if commission_ids:
+                    commissions = commissions.filter(id__in=[int(value) for value in commission_ids])
+                if affiliate_email:
+                    commissions = commissions.filter(affiliate__email=affiliate_email)
+                result = settle_commissions(
+                    commissions,
+                    payment_method=request.data.get('payment_method') or 'bank_transfer',
+                    notes=request.data.get('notes') or f'Settled via API by {request.user.email}',
+                )
+            else:
+                return Response({
+                    'error': 'payout_request, commission_ids or affiliate is required'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        except (TypeError, ValueError):
+            return Response({
+                'error': 'payout_request and commission_ids must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except SettlementError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_409_CONFLICT)
+        
+        return Response({
+            'message': 'Commissions settled',
+            'settlement': result
+        }, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 def generate_referral_link(request):
     """Generate or refresh affiliate link"""
@@ -127,9 +178,9 @@ def generate_referral_link(request):
     
     # Generate new referral code if needed
     if not request.user.referral_code:
-        import uuid
-        request.user.referral_code = str(uuid.uuid4())[:8].upper()
-        request.user.save()
+        from apps.accounts.allocators import allocate_referral_code
+        request.user.referral_code = allocate_referral_code()
+        request.user.save(update_fields=['referral_code'])
     
     affiliate_link = f"{getattr(settings, 'FRONTEND_URL', 'http://localhost:3000')}/register?ref={request.user.referral_code}"
     
@@ -172,10 +223,10 @@ def affiliate_dashboard(request):
     referral_code = request.user.referral_code
     if not referral_code:
         # Generate a new referral code if user doesn't have one
-        import uuid
-        referral_code = str(uuid.uuid4())[:8].upper()
+        from apps.accounts.allocators import allocate_referral_code
+        referral_code = allocate_referral_code()
         request.user.referral_code = referral_code
-        request.user.save()
+        request.user.save(update_fields=['referral_code'])
     
     affiliate_link = f"{getattr(settings, 'FRONTEND_URL', 'http://localhost:3000')}/register?ref={referral_code}"
     
@@ -185,19 +236,31 @@ def affiliate_dashboard(request):
         affiliate=request.user,
         created_at__gte=current_month_start,
         status='paid'
-    ).aggregate(total=Sum('commission_amount'))['total'] or 0
+    ).aggregate(total=Sum('commission_amount'))['total'] or Decimal('0.00')
     
-    # Available balance is total earned minus total paid
-    available_balance = float(stats.total_commission_earned) - float(stats.total_commission_paid)
+    # Materialized ledger balance: credits less payouts and reversals
+    available_balance = balance_of(request.user.id)
     
+    # Decimals are rendered as JSON numbers, without float arithmetic
     return Response({
-        'total_earnings': float(stats.total_commission_earned),
+        'total_earnings': stats.total_commission_earned,
         'available_balance': available_balance,
         'total_referrals': stats.total_referrals,
-        'monthly_earnings': float(monthly_earnings),
+        'monthly_earnings': monthly_earnings,
         'affiliate_link': affiliate_link,
         'referral_code': referral_code,
         'recent_commissions': AffiliateCommissionSerializer(recent_commissions, many=True).data,
         'recent_referrals': UserSerializer(recent_referrals, many=True).data,
         'recent_payouts': PayoutRequestSerializer(pending_payouts, many=True).data,
     }, status=status.HTTP_200_OK)
+
+
+@require_GET
+def affiliate_health_check(request):
+    """Cached affiliate health report for monitoring (staff session or HEALTH_CHECK_TOKEN bearer)"""
+    token = settings.HEALTH_CHECK_TOKEN
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (request.user.is_staff or (token and constant_time_compare(supplied, token))):
+        return HttpResponseForbidden()
+    report = affiliate_health()
+    return JsonResponse(report, status=503 if report['status'] == 'error' else 200)
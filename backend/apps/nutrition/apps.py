@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class NutritionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.nutrition'
+    
+    def ready(self):
+        import apps.nutrition.signals
@@ -0,0 +1,80 @@
+"""
+Async WhatsApp endpoint, routed instead of WhatsAppMessagesView when
+ASYNC_VIEWS is on. The WhatsApp API round trip is awaited on the event
+loop rather than holding a worker thread.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+
+from apps.accounts.async_auth import async_jwt_view, json_body
+from clinical_platform.archive import cutoff as archive_cutoff
+from . import whatsapp
+from .models import WhatsAppMessage
+from .serializers import SendWhatsAppMessageSerializer, WhatsAppMessageSerializer
+
+logger = logging.getLogger(__name__)
+
+
+@async_jwt_view(['GET', 'POST'])
+async def whatsapp_messages(request):
+    """Get WhatsApp message history, or send a WhatsApp message"""
+    if request.method == 'GET':
+        # Bounded to the hot months so only their partitions are scanned
+        messages = [
+            message async for message in WhatsAppMessage.objects.filter(
+                user=request.user, created_at__gte=archive_cutoff('whatsapp_messages')
+            )
+        ]
+        return JsonResponse({
+            'messages': WhatsAppMessageSerializer(messages, many=True).data
+        }, status=200)
+
+    data = json_body(request)
+    if data is None:
+        return JsonResponse({'error': 'Request body must be a JSON object'}, status=400)
+
+    serializer = SendWhatsAppMessageSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    phone_number = serializer.validated_data['phone_number']
+    message_content = serializer.validated_data['message']
+
+    try:
+        message_id = await whatsapp.asend_text(phone_number, message_content)
+    except whatsapp.WhatsAppError as e:
+        logger.warning('WhatsApp send failed', extra={'user_id': request.user.id, 'error': str(e)})
+        await WhatsAppMessage.objects.acreate(
+            user=request.user,
+            phone_number=phone_number,
+            message_type='outgoing',
+            content=message_content,
+            status='failed'
+        )
+        return JsonResponse({'error': 'WhatsApp message could not be sent'}, status=502)
+
+    whatsapp_message = await WhatsAppMessage.objects.acreate(
+        user=request.user,
+        phone_number=phone_number,
+        message_type='outgoing',
+        content=message_content,
+        whatsapp_message_id=message_id,
+        status='sent'
+    )
+
+    # Demo: Auto-reply with nutrition tip
+    if not whatsapp.is_configured():
+        await WhatsAppMessage.objects.acreate(
+            user=request.user,
+            phone_number=phone_number,
+            message_type='incoming',
+            content=await sync_to_async(whatsapp.nutrition_tip)(request.user),
+            status='delivered'
+        )
+
+    return JsonResponse({
+        'message': whatsapp.sent_message_text(),
+        'sent_message': WhatsAppMessageSerializer(whatsapp_message).data
+    }, status=201)
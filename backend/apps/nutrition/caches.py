@@ -0,0 +1,4 @@
+from clinical_platform.cache import tiered_cache
+
+# Disease list as served by DiseasesView; invalidated on disease changes
+disease_list_cache = tiered_cache('diseases', timeout=3600)
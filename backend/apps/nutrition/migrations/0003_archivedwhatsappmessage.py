@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('nutrition', '0002_nutritionplan_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedWhatsAppMessage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('phone_number', models.CharField(max_length=20)),
+                ('message_type', models.CharField(choices=[('incoming', 'Incoming'), ('outgoing', 'Outgoing')], max_length=10)),
+                ('content', models.TextField()),
+                ('whatsapp_message_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Archived WhatsApp Message',
+                'verbose_name_plural': 'Archived WhatsApp Messages',
+                'db_table': 'nutrition_whatsapp_message_archive',
+                'indexes': [models.Index(fields=['user', 'created_at'], name='nutrition_wa_arch_user_idx')],
+            },
+        ),
+    ]
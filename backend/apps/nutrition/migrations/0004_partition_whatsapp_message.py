@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0003_archivedwhatsappmessage'),
+    ]
+
+    operations = [
+        # State only: the unique index goes away when
+        # `manage.py partition_tables --convert` rebuilds the table
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='whatsappmessage',
+                    name='whatsapp_message_id',
+                    field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+                ),
+            ],
+        ),
+    ]
@@ -159,6 +159,7 @@ class NutritionPlan(models.Model):
 
 
 class WhatsAppMessage(models.Model):
+    """Partitioned by month on created_at by `partition_tables --convert` (clinical_platform.partitioning)"""
     MESSAGE_TYPE_CHOICES = [
         ('incoming', _('Incoming')),
         ('outgoing', _('Outgoing')),
@@ -174,7 +175,7 @@ class WhatsAppMessage(models.Model):
     content = models.TextField()
     
     # WhatsApp API specific fields
-    whatsapp_message_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    whatsapp_message_id = models.CharField(max_length=100, db_index=True, null=True, blank=True)
     status = models.CharField(
         max_length=20,
         choices=[
@@ -196,3 +197,31 @@ class WhatsAppMessage(models.Model):
     
     def __str__(self):
         return f"{self.message_type} message to/from {self.phone_number}"
+
+
+class ArchivedWhatsAppMessage(models.Model):
+    """WhatsApp messages moved out of nutrition_whatsapp_message by clinical_platform.archive"""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    phone_number = models.CharField(max_length=20)
+    message_type = models.CharField(max_length=10, choices=WhatsAppMessage.MESSAGE_TYPE_CHOICES)
+    content = models.TextField()
+    whatsapp_message_id = models.CharField(max_length=100, null=True, blank=True)
+    status = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    
+    archived_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'nutrition_whatsapp_message_archive'
+        verbose_name = _('Archived WhatsApp Message')
+        verbose_name_plural = _('Archived WhatsApp Messages')
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='nutrition_wa_arch_user_idx'),
+        ]
+    
+    @staticmethod
+    def archivable(cutoff):
+        return WhatsAppMessage.objects.filter(created_at__lt=cutoff)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .caches import disease_list_cache
+from .models import Disease
+
+
+@receiver(post_save, sender=Disease)
+@receiver(post_delete, sender=Disease)
+def invalidate_disease_list(sender, **kwargs):
+    """Drop the cached disease list whenever a disease changes"""
+    disease_list_cache.invalidate_on_commit()
@@ -1,14 +1,20 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     DiseasesView, NutritionPlansView, NutritionPlanDetailView,
     WhatsAppMessagesView, calculate_calories, nutrition_demo
 )
 
+if settings.ASYNC_VIEWS:
+    from .async_views import whatsapp_messages as whatsapp_view
+else:
+    whatsapp_view = WhatsAppMessagesView.as_view()
+
 urlpatterns = [
     path('diseases/', DiseasesView.as_view(), name='diseases'),
     path('plans/', NutritionPlansView.as_view(), name='nutrition_plans'),
     path('plans/<int:plan_id>/', NutritionPlanDetailView.as_view(), name='nutrition_plan_detail'),
     path('calculate/', calculate_calories, name='calculate_calories'),
-    path('whatsapp/', WhatsAppMessagesView.as_view(), name='whatsapp_messages'),
+    path('whatsapp/', whatsapp_view, name='whatsapp_messages'),
     path('demo/', nutrition_demo, name='nutrition_demo'),
 ]
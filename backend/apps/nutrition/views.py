@@ -3,22 +3,31 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
+import logging
+
+from clinical_platform.archive import cutoff as archive_cutoff
+from . import whatsapp
+from .caches import disease_list_cache
 from .models import Disease, NutritionPlan, WhatsAppMessage
 from .serializers import (
     DiseaseSerializer, NutritionPlanSerializer, CreateNutritionPlanSerializer,
     WhatsAppMessageSerializer, SendWhatsAppMessageSerializer
 )
 
+logger = logging.getLogger(__name__)
+
 
 class DiseasesView(APIView):
     permission_classes = [permissions.AllowAny]
     
     def get(self, request):
         """Get list of all diseases"""
-        diseases = Disease.objects.all()
-        serializer = DiseaseSerializer(diseases, many=True)
+        diseases = disease_list_cache.get_or_set(
+            'all',
+            lambda: list(DiseaseSerializer(Disease.objects.all(), many=True).data)
+        )
         return Response({
-            'diseases': serializer.data
+            'diseases': diseases
         }, status=status.HTTP_200_OK)
 
 
@@ -160,71 +169,62 @@ def calculate_calories(request):
 class WhatsAppMessagesView(APIView):
     def get(self, request):
         """Get WhatsApp message history"""
-        messages = WhatsAppMessage.objects.filter(user=request.user)
+        # Bounded to the hot months so only their partitions are scanned
+        messages = WhatsAppMessage.objects.filter(
+            user=request.user, created_at__gte=archive_cutoff('whatsapp_messages')
+        )
         serializer = WhatsAppMessageSerializer(messages, many=True)
         return Response({
             'messages': serializer.data
         }, status=status.HTTP_200_OK)
     
     def post(self, request):
-        """Send WhatsApp message (demo implementation)"""
+        """Send WhatsApp message (demo mode unless the WhatsApp API is configured)"""
         serializer = SendWhatsAppMessageSerializer(data=request.data)
         if serializer.is_valid():
             phone_number = serializer.validated_data['phone_number']
             message_content = serializer.validated_data['message']
             
-            # Demo implementation - just save the message
-            # In production, integrate with WhatsApp Business API
+            try:
+                message_id = whatsapp.send_text(phone_number, message_content)
+            except whatsapp.WhatsAppError as e:
+                logger.warning('WhatsApp send failed', extra={'user_id': request.user.id, 'error': str(e)})
+                WhatsAppMessage.objects.create(
+                    user=request.user,
+                    phone_number=phone_number,
+                    message_type='outgoing',
+                    content=message_content,
+                    status='failed'
+                )
+                return Response({
+                    'error': 'WhatsApp message could not be sent'
+                }, status=status.HTTP_502_BAD_GATEWAY)
+            
             whatsapp_message = WhatsAppMessage.objects.create(
                 user=request.user,
                 phone_number=phone_number,
                 message_type='outgoing',
                 content=message_content,
+                whatsapp_message_id=message_id,
                 status='sent'
             )
             
             # Demo: Auto-reply with nutrition tip
-            auto_reply_content = self._generate_nutrition_tip(request.user)
-            WhatsAppMessage.objects.create(
-                user=request.user,
-                phone_number=phone_number,
-                message_type='incoming',
-                content=auto_reply_content,
-                status='delivered'
-            )
+            if not whatsapp.is_configured():
+                WhatsAppMessage.objects.create(
+                    user=request.user,
+                    phone_number=phone_number,
+                    message_type='incoming',
+                    content=whatsapp.nutrition_tip(request.user),
+                    status='delivered'
+                )
             
             return Response({
-                'message': 'WhatsApp message sent successfully (demo)',
+                'message': whatsapp.sent_message_text(),
                 'sent_message': WhatsAppMessageSerializer(whatsapp_message).data
             }, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def _generate_nutrition_tip(self, user):
-        """Generate a nutrition tip based on user's profile"""
-        tips = [
-            "💧 Remember to drink at least 8 glasses of water daily!",
-            "🥗 Include colorful vegetables in every meal for optimal nutrition.",
-            "🏃‍♂️ Combine your nutrition plan with regular physical activity.",
-            "😴 Get 7-9 hours of sleep for better metabolism and recovery.",
-            "🍎 Choose whole foods over processed options when possible.",
-        ]
-        
-        # Try to get user's latest nutrition plan for personalized tips
-        try:
-            latest_plan = user.nutrition_plans.filter(is_active=True).first()
-            if latest_plan:
-                if latest_plan.goal == 'lose':
-                    return "🎯 Focus on portion control and increase your protein intake to support your weight loss goal!"
-                elif latest_plan.goal == 'gain':
-                    return "💪 Add healthy calorie-dense foods like nuts, avocados, and lean proteins to support weight gain!"
-                else:
-                    return "⚖️ Maintain your current healthy eating patterns and stay consistent with your nutrition plan!"
-        except:
-            pass
-        
-        import random
-        return random.choice(tips)
 
 
 @api_view(['GET'])
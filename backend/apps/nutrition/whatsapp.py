@@ -0,0 +1,96 @@
+"""
+WhatsApp Business (Cloud API) text messages.
+
+Without WHATSAPP_API_TOKEN and WHATSAPP_PHONE_NUMBER_ID the send helpers
+run in demo mode: nothing leaves the server and no message id is returned.
+"""
+import random
+
+from django.conf import settings
+
+from clinical_platform.async_http import get_async_client
+
+NUTRITION_TIPS = [
+    "💧 Remember to drink at least 8 glasses of water daily!",
+    "🥗 Include colorful vegetables in every meal for optimal nutrition.",
+    "🏃‍♂️ Combine your nutrition plan with regular physical activity.",
+    "😴 Get 7-9 hours of sleep for better metabolism and recovery.",
+    "🍎 Choose whole foods over processed options when possible.",
+]
+
+
+class WhatsAppError(Exception):
+    pass
+
+
+def is_configured():
+    return bool(settings.WHATSAPP_API_TOKEN and settings.WHATSAPP_PHONE_NUMBER_ID)
+
+
+def sent_message_text():
+    if is_configured():
+        return 'WhatsApp message sent successfully'
+    return 'WhatsApp message sent successfully (demo)'
+
+
+def _request_args(phone_number, body):
+    url = f"{settings.WHATSAPP_API_URL}/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages"
+    payload = {
+        'messaging_product': 'whatsapp',
+        'to': phone_number,
+        'type': 'text',
+        'text': {'body': body},
+    }
+    headers = {'Authorization': f"Bearer {settings.WHATSAPP_API_TOKEN}"}
+    return url, payload, headers
+
+
+def _message_id(status_code, data):
+    if status_code >= 400:
+        raise WhatsAppError(data.get('error', {}).get('message', f"HTTP {status_code}"))
+    return data['messages'][0]['id']
+
+
+def send_text(phone_number, body):
+    """Send a text message; returns the WhatsApp message id (None in demo mode)"""
+    if not is_configured():
+        return None
+    import requests
+
+    url, payload, headers = _request_args(phone_number, body)
+    try:
+        response = requests.post(url, json=payload, headers=headers, timeout=settings.WHATSAPP_TIMEOUT)
+        return _message_id(response.status_code, response.json())
+    except (requests.RequestException, ValueError, KeyError) as e:
+        raise WhatsAppError(str(e))
+
+
+async def asend_text(phone_number, body):
+    """Async send_text for async views"""
+    if not is_configured():
+        return None
+    url, payload, headers = _request_args(phone_number, body)
+    try:
+        response = await get_async_client().post(url, json=payload, headers=headers, timeout=settings.WHATSAPP_TIMEOUT)
+        return _message_id(response.status_code, response.json())
+    except WhatsAppError:
+        raise
+    except Exception as e:
+        raise WhatsAppError(str(e))
+
+
+def nutrition_tip(user):
+    """Generate a nutrition tip based on user's profile"""
+    # Try to get user's latest nutrition plan for personalized tips
+    try:
+        latest_plan = user.nutrition_plans.filter(is_active=True).first()
+        if latest_plan:
+            if latest_plan.goal == 'lose':
+                return "🎯 Focus on portion control and increase your protein intake to support your weight loss goal!"
+            elif latest_plan.goal == 'gain':
+                return "💪 Add healthy calorie-dense foods like nuts, avocados, and lean proteins to support weight gain!"
+            else:
+                return "⚖️ Maintain your current healthy eating patterns and stay consistent with your nutrition plan!"
+    except Exception:
+        pass
+    return random.choice(NUTRITION_TIPS)
@@ -0,0 +1,188 @@
+"""
+Async Stripe calls for the async subscription views.
+
+stripe-python 7.x is blocking, so the async views talk to the Stripe
+REST API directly through the shared httpx.AsyncClient. Responses are
+plain dicts; errors are raised as ``stripe.StripeError`` so callers
+handle them the same way as StripeService.
+"""
+import logging
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.utils import timezone
+
+from clinical_platform.async_http import get_async_client
+from clinical_platform.metrics import observe_stripe
+from .models import Subscription, SubscriptionPlan
+from .stripe_client import stripe
+from .stripe_service import subscription_period
+
+logger = logging.getLogger(__name__)
+
+
+def encode_params(params, prefix=None):
+    """Flatten nested params into Stripe's form encoding (a[b]=c, items[0][price]=p)"""
+    pairs = []
+    for key, value in params.items():
+        name = f"{prefix}[{key}]" if prefix else key
+        pairs.extend(_encode_value(name, value))
+    return pairs
+
+
+def _encode_value(name, value):
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        return encode_params(value, name)
+    if isinstance(value, (list, tuple)):
+        pairs = []
+        for index, item in enumerate(value):
+            pairs.extend(_encode_value(f"{name}[{index}]", item))
+        return pairs
+    if isinstance(value, bool):
+        return [(name, 'true' if value else 'false')]
+    return [(name, str(value))]
+
+
+async def stripe_request(method, path, operation, params=None):
+    """Call the Stripe API and return the decoded JSON body"""
+    headers = {
+        'Authorization': f"Bearer {settings.STRIPE_SECRET_KEY}",
+        'Content-Type': 'application/x-www-form-urlencoded',
+    }
+    if stripe.api_version:
+        headers['Stripe-Version'] = stripe.api_version
+    url = f"{settings.STRIPE_API_BASE}{path}"
+
+    with observe_stripe(operation):
+        try:
+            response = await get_async_client().request(
+                method, url, content=urlencode(encode_params(params or {})), headers=headers,
+                timeout=settings.STRIPE_TIMEOUT,
+            )
+        except Exception as e:
+            raise stripe.APIConnectionError(f"Could not reach Stripe: {str(e)}")
+        try:
+            body = response.json()
+        except ValueError:
+            raise stripe.APIError(
+                f"Invalid response from Stripe (HTTP {response.status_code})",
+                http_body=response.text,
+                http_status=response.status_code,
+            )
+        if response.status_code >= 400:
+            error = body.get('error', {})
+            raise stripe.StripeError(
+                error.get('message', 'Stripe request failed'),
+                http_body=response.text,
+                http_status=response.status_code,
+                json_body=body,
+                code=error.get('code'),
+            )
+    return body
+
+
+class AsyncStripeService:
+    @staticmethod
+    async def create_customer(user):
+        """Create a Stripe customer for the user"""
+        return await stripe_request('POST', '/v1/customers', 'customer.create', {
+            'email': user.email,
+            'name': user.full_name,
+            'metadata': {'user_id': user.id, 'user_type': user.user_type},
+        })
+
+    @staticmethod
+    async def create_subscription(user, plan_id, payment_method_id):
+        """Async counterpart of StripeService.create_subscription"""
+        log_fields = {'user_id': user.id, 'plan_id': plan_id}
+        try:
+            plan = await SubscriptionPlan.objects.aget(id=plan_id, is_active=True)
+            customer = await AsyncStripeService.create_customer(user)
+            log_fields['customer_id'] = customer['id']
+
+            try:
+                await stripe_request(
+                    'POST', f"/v1/payment_methods/{payment_method_id}/attach", 'payment_method.attach',
+                    {'customer': customer['id']},
+                )
+            except stripe.StripeError as e:
+                logger.warning('PaymentMethod attach failed', extra={**log_fields, 'error': str(e)})
+
+            try:
+                await stripe_request('POST', f"/v1/customers/{customer['id']}", 'customer.modify', {
+                    'invoice_settings': {'default_payment_method': payment_method_id},
+                })
+            except stripe.StripeError as e:
+                logger.warning('Customer modify failed', extra={**log_fields, 'error': str(e)})
+
+            subscription = await stripe_request('POST', '/v1/subscriptions', 'subscription.create', {
+                'customer': customer['id'],
+                'items': [{'price': plan.stripe_price_id}],
+                'default_payment_method': payment_method_id,
+                'expand': ['latest_invoice.payment_intent'],
+                'metadata': {'user_id': user.id, 'plan_id': plan.id},
+            })
+            log_fields['stripe_subscription_id'] = subscription['id']
+
+            current_period_start, current_period_end = subscription_period(subscription)
+            db_subscription = await Subscription.objects.acreate(
+                user=user,
+                plan=plan,
+                stripe_subscription_id=subscription['id'],
+                stripe_customer_id=customer['id'],
+                status=subscription['status'],
+                current_period_start=current_period_start,
+                current_period_end=current_period_end,
+            )
+            logger.info('Subscription created', extra={**log_fields, 'subscription_id': db_subscription.id, 'status': subscription['status']})
+
+            client_secret = None
+            invoice = subscription.get('latest_invoice')
+            if isinstance(invoice, dict) and isinstance(invoice.get('payment_intent'), dict):
+                client_secret = invoice['payment_intent'].get('client_secret')
+            else:
+                logger.warning('No payment_intent found in latest_invoice', extra=log_fields)
+
+            return {
+                'subscription': db_subscription,
+                'client_secret': client_secret,
+                'subscription_id': subscription['id']
+            }
+
+        except SubscriptionPlan.DoesNotExist:
+            raise Exception("Invalid subscription plan")
+        except stripe.StripeError as e:
+            logger.warning('Stripe error creating subscription', extra={**log_fields, 'error': str(e)})
+            raise Exception(f"Stripe error: {str(e)}")
+
+    @staticmethod
+    async def cancel_subscription(subscription, cancel_at_period_end=True):
+        """Async counterpart of StripeService.cancel_subscription"""
+        subscription_id = subscription.stripe_subscription_id
+        try:
+            if cancel_at_period_end:
+                await stripe_request(
+                    'POST', f"/v1/subscriptions/{subscription_id}", 'subscription.modify',
+                    {'cancel_at_period_end': True},
+                )
+                subscription.cancel_at_period_end = True
+            else:
+                await stripe_request('DELETE', f"/v1/subscriptions/{subscription_id}", 'subscription.delete')
+                subscription.status = 'canceled'
+                subscription.canceled_at = timezone.now()
+        except stripe.StripeError as e:
+            raise Exception(f"Stripe error: {str(e)}")
+
+        await subscription.asave()
+        return subscription
+
+    @staticmethod
+    async def create_payment_intent(user, plan, amount, currency):
+        """Create a payment intent for a plan"""
+        return await stripe_request('POST', '/v1/payment_intents', 'payment_intent.create', {
+            'amount': amount,
+            'currency': currency,
+            'metadata': {'user_id': user.id, 'plan_id': plan.id, 'plan_name': plan.name},
+        })
@@ -0,0 +1,122 @@
+"""
+Async versions of the Stripe-bound subscription endpoints.
+
+Enabled with ASYNC_VIEWS (on by default when SERVER_MODE=asgi). While a
+request waits on Stripe the worker's event loop keeps serving others,
+instead of a sync worker thread being blocked for the round trip.
+Responses match the sync views.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+
+from apps.accounts.async_auth import async_jwt_view, json_body
+from .async_stripe import AsyncStripeService
+from .models import Subscription, SubscriptionPlan
+from .serializers import CancelSubscriptionSerializer, CreateSubscriptionSerializer, SubscriptionSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def _invalid_json():
+    return JsonResponse({'error': 'Request body must be a JSON object'}, status=400)
+
+
+@sync_to_async
+def _serialize_subscription(subscription):
+    return SubscriptionSerializer(subscription).data
+
+
+@async_jwt_view(['POST'])
+async def create_subscription(request):
+    """Create a subscription with Stripe"""
+    data = json_body(request)
+    if data is None:
+        return _invalid_json()
+
+    serializer = CreateSubscriptionSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        logger.info('Invalid subscription request', extra={'user_id': request.user.id, 'fields': sorted(serializer.errors)})
+        return JsonResponse(serializer.errors, status=400)
+
+    existing = await Subscription.objects.filter(user=request.user).afirst()
+    if existing and existing.is_active:
+        return JsonResponse({'error': 'User already has an active subscription'}, status=400)
+
+    try:
+        result = await AsyncStripeService.create_subscription(
+            user=request.user,
+            plan_id=serializer.validated_data['plan_id'],
+            payment_method_id=serializer.validated_data['payment_method_id']
+        )
+    except Exception as e:
+        logger.warning('Subscription creation failed', extra={'user_id': request.user.id, 'error': str(e)})
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'message': 'Subscription created successfully',
+        'subscription': await _serialize_subscription(result['subscription']),
+        'client_secret': result['client_secret']
+    }, status=201)
+
+
+@async_jwt_view(['POST'])
+async def cancel_subscription(request):
+    """Cancel the user's subscription"""
+    data = json_body(request)
+    if data is None:
+        return _invalid_json()
+
+    subscription = await Subscription.objects.select_related('plan').filter(user=request.user).afirst()
+    if subscription is None:
+        return JsonResponse({'error': 'No active subscription found'}, status=404)
+
+    serializer = CancelSubscriptionSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    try:
+        subscription = await AsyncStripeService.cancel_subscription(
+            subscription,
+            serializer.validated_data.get('cancel_at_period_end', True)
+        )
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'message': 'Subscription canceled successfully',
+        'subscription': await _serialize_subscription(subscription)
+    }, status=200)
+
+
+@async_jwt_view(['POST'])
+async def create_payment_intent(request):
+    """Create a payment intent for subscription payments"""
+    data = json_body(request)
+    if data is None:
+        return _invalid_json()
+
+    plan_id = data.get('plan_id')
+    if not plan_id:
+        return JsonResponse({'error': 'plan_id is required'}, status=400)
+
+    try:
+        plan = await SubscriptionPlan.objects.aget(id=plan_id, is_active=True)
+    except (SubscriptionPlan.DoesNotExist, ValueError):
+        return JsonResponse({'error': 'Invalid subscription plan'}, status=400)
+
+    # Calculate amount in cents
+    amount = int(float(plan.price) * 100)
+    currency = plan.currency.lower()
+
+    try:
+        intent = await AsyncStripeService.create_payment_intent(request.user, plan, amount, currency)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'client_secret': intent['client_secret'],
+        'amount': amount,
+        'currency': currency
+    }, status=200)
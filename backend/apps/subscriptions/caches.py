@@ -0,0 +1,4 @@
+from clinical_platform.cache import tiered_cache
+
+# Active plans as served by SubscriptionPlansView; invalidated on plan changes
+plan_catalogue_cache = tiered_cache('subscription-plans', timeout=3600)
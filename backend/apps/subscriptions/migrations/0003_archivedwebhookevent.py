@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0002_alter_payment_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedWebhookEvent',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('stripe_event_id', models.CharField(db_index=True, max_length=100)),
+                ('event_type', models.CharField(max_length=100)),
+                ('processed', models.BooleanField()),
+                ('data', models.JSONField()),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Archived Webhook Event',
+                'verbose_name_plural': 'Archived Webhook Events',
+                'db_table': 'subscriptions_webhook_event_archive',
+            },
+        ),
+    ]
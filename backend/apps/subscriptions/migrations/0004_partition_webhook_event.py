@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0003_archivedwebhookevent'),
+    ]
+
+    operations = [
+        # State only: the unique index goes away when
+        # `manage.py partition_tables --convert` rebuilds the table
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='webhookevent',
+                    name='stripe_event_id',
+                    field=models.CharField(db_index=True, max_length=100),
+                ),
+            ],
+        ),
+    ]
@@ -91,6 +91,7 @@ class Payment(models.Model):
         ('pending', _('Pending')),
         ('failed', _('Failed')),
         ('canceled', _('Canceled')),
+        ('refunded', _('Refunded')),
     ]
     
     subscription = models.ForeignKey(
@@ -130,7 +131,9 @@ class Payment(models.Model):
 
 
 class WebhookEvent(models.Model):
-    stripe_event_id = models.CharField(max_length=100, unique=True)
+    """Partitioned by month on created_at by `partition_tables --convert` (clinical_platform.partitioning)"""
+    # Not unique: the partitioned table can only enforce (id, created_at)
+    stripe_event_id = models.CharField(max_length=100, db_index=True)
     event_type = models.CharField(max_length=100)
     processed = models.BooleanField(default=False)
     data = models.JSONField()
@@ -145,3 +148,24 @@ class WebhookEvent(models.Model):
     
     def __str__(self):
         return f"{self.event_type} - {self.stripe_event_id}"
+
+
+class ArchivedWebhookEvent(models.Model):
+    """Processed webhook events moved out of subscriptions_webhook_event by clinical_platform.archive"""
+    id = models.BigIntegerField(primary_key=True)
+    stripe_event_id = models.CharField(max_length=100, db_index=True)
+    event_type = models.CharField(max_length=100)
+    processed = models.BooleanField()
+    data = models.JSONField()
+    created_at = models.DateTimeField()
+    
+    archived_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'subscriptions_webhook_event_archive'
+        verbose_name = _('Archived Webhook Event')
+        verbose_name_plural = _('Archived Webhook Events')
+    
+    @staticmethod
+    def archivable(cutoff):
+        return WebhookEvent.objects.filter(processed=True, created_at__lt=cutoff)
@@ -1,11 +1,17 @@
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from apps.subscriptions.models import Subscription, Payment
+from apps.subscriptions.models import Subscription, SubscriptionPlan, Payment
+from apps.affiliates.ledger import credit_commissions
 from apps.affiliates.models import AffiliateCommission, AffiliateStats
 from decimal import Decimal
 from django.db import transaction
 from django.utils import timezone
+from apps.subscriptions.caches import plan_catalogue_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
 
 @receiver(post_save, sender=Subscription)
 def create_payment_and_commission_on_subscription(sender, instance, created, **kwargs):
@@ -31,7 +37,7 @@ def create_payment_and_commission_on_subscription(sender, instance, created, **k
                 if instance.user.referred_by:
                     commission_amount = payment.amount * Decimal('0.30')
                     
-                    AffiliateCommission.objects.create(
+                    commission = AffiliateCommission.objects.create(
                         affiliate=instance.user.referred_by,
                         referred_user=instance.user,
                         payment=payment,
@@ -40,6 +46,7 @@ def create_payment_and_commission_on_subscription(sender, instance, created, **k
                         commission_type='subscription',
                         status='pending'
                     )
+                    credit_commissions([commission])
                     
                     # Update payment
                     payment.affiliate_commission = commission_amount
@@ -49,5 +56,12 @@ def create_payment_and_commission_on_subscription(sender, instance, created, **k
                     stats, created = AffiliateStats.objects.get_or_create(user=instance.user.referred_by)
                     stats.update_stats()
                     
-        except Exception as e:
-            print(f'Error creating automatic commission: {str(e)}')
+        except Exception:
+            logger.exception('Error creating automatic commission', extra={'subscription_id': instance.id})
+
+
+@receiver(post_save, sender=SubscriptionPlan)
+@receiver(post_delete, sender=SubscriptionPlan)
+def invalidate_plan_catalogue(sender, **kwargs):
+    """Drop the cached plan catalogue whenever a plan changes"""
+    plan_catalogue_cache.invalidate_on_commit()
@@ -0,0 +1,17 @@
+"""
+The ``stripe`` module, imported and configured on first use.
+
+Import it from here instead of ``import stripe`` so loading the
+subscriptions views does not import the Stripe SDK at startup.
+"""
+from django.conf import settings
+
+from clinical_platform.lazy import LazyModule
+
+
+def _configure(module):
+    module.api_key = settings.STRIPE_SECRET_KEY
+    module.api_base = settings.STRIPE_API_BASE
+
+
+stripe = LazyModule('stripe', _configure)
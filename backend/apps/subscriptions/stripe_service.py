@@ -1,10 +1,39 @@
-import stripe
-from django.conf import settings
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
 from django.utils import timezone
 from .models import Subscription, SubscriptionPlan, Payment
+from .stripe_client import stripe
+from apps.affiliates.ledger import cancel_commissions, credit_commissions, reverse_commission_share
 from apps.affiliates.models import AffiliateCommission
+from clinical_platform.metrics import observe_stripe
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+logger = logging.getLogger(__name__)
+
+
+def subscription_period(stripe_subscription):
+    """Current period bounds of a Stripe subscription, defaulting to now + 30 days"""
+    current_period_start = None
+    current_period_end = None
+    
+    if stripe_subscription.get('current_period_start'):
+        current_period_start = timezone.datetime.fromtimestamp(
+            stripe_subscription['current_period_start'], tz=timezone.utc
+        )
+    
+    if stripe_subscription.get('current_period_end'):
+        current_period_end = timezone.datetime.fromtimestamp(
+            stripe_subscription['current_period_end'], tz=timezone.utc
+        )
+    
+    # If periods are not available, use current time and add 30 days
+    if not current_period_start:
+        current_period_start = timezone.now()
+    if not current_period_end:
+        current_period_end = current_period_start + timedelta(days=30)
+    return current_period_start, current_period_end
 
 
 class StripeService:
@@ -12,14 +41,15 @@ class StripeService:
     def create_customer(user):
         """Create a Stripe customer for the user"""
         try:
-            customer = stripe.Customer.create(
-                email=user.email,
-                name=user.full_name,
-                metadata={
-                    'user_id': user.id,
-                    'user_type': user.user_type
-                }
-            )
+            with observe_stripe('customer.create'):
+                customer = stripe.Customer.create(
+                    email=user.email,
+                    name=user.full_name,
+                    metadata={
+                        'user_id': user.id,
+                        'user_type': user.user_type
+                    }
+                )
             return customer
         except stripe.StripeError as e:
             raise Exception(f"Failed to create Stripe customer: {str(e)}")
@@ -28,85 +58,57 @@ class StripeService:
     def create_subscription(user, plan_id, payment_method_id):
         """Create a subscription for the user"""
         try:
-            print(f"🔍 Creating subscription for user {user.id}, plan {plan_id}, payment_method {payment_method_id}")
+            log_fields = {'user_id': user.id, 'plan_id': plan_id}
+            logger.debug('Creating subscription', extra=log_fields)
             plan = SubscriptionPlan.objects.get(id=plan_id, is_active=True)
-            print(f"✅ Plan found: {plan.name} - {plan.stripe_price_id}")
             
             # Create or get customer
             customer = StripeService.create_customer(user)
-            print(f"✅ Customer created: {customer.id}")
+            log_fields['customer_id'] = customer.id
             
             # Try to attach payment method to customer (handle if already attached)
             try:
-                stripe.PaymentMethod.attach(
-                    payment_method_id,
-                    customer=customer.id,
-                )
+                with observe_stripe('payment_method.attach'):
+                    stripe.PaymentMethod.attach(
+                        payment_method_id,
+                        customer=customer.id,
+                    )
             except stripe.StripeError as e:
                 # If payment method is already attached or has issues, 
                 # we'll still try to create the subscription
-                print(f"PaymentMethod attach warning: {str(e)}")
+                logger.warning('PaymentMethod attach failed', extra={**log_fields, 'error': str(e)})
             
             # Set as default payment method
             try:
-                stripe.Customer.modify(
-                    customer.id,
-                    invoice_settings={
-                        'default_payment_method': payment_method_id,
-                    },
-                )
+                with observe_stripe('customer.modify'):
+                    stripe.Customer.modify(
+                        customer.id,
+                        invoice_settings={
+                            'default_payment_method': payment_method_id,
+                        },
+                    )
             except stripe.StripeError as e:
-                print(f"Customer modify warning: {str(e)}")
+                logger.warning('Customer modify failed', extra={**log_fields, 'error': str(e)})
             
             # Create subscription with immediate payment
-            print(f"🔍 Creating Stripe subscription...")
-            subscription = stripe.Subscription.create(
-                customer=customer.id,
-                items=[{
-                    'price': plan.stripe_price_id,
-                }],
-                default_payment_method=payment_method_id,
-                expand=['latest_invoice.payment_intent'],
-                metadata={
-                    'user_id': user.id,
-                    'plan_id': plan.id,
-                }
-            )
-            print(f"✅ Stripe subscription created: {subscription.id}")
-            print(f"   Status: {subscription.status}")
-            print(f"   Current period start: {getattr(subscription, 'current_period_start', 'Not available')}")
-            print(f"   Current period end: {getattr(subscription, 'current_period_end', 'Not available')}")
-            
-            # Save subscription to database
-            # Handle current_period_start and current_period_end safely
-            current_period_start = None
-            current_period_end = None
-            
-            if hasattr(subscription, 'current_period_start') and subscription.current_period_start:
-                current_period_start = timezone.datetime.fromtimestamp(
-                    subscription.current_period_start, tz=timezone.utc
-                )
-            
-            if hasattr(subscription, 'current_period_end') and subscription.current_period_end:
-                current_period_end = timezone.datetime.fromtimestamp(
-                    subscription.current_period_end, tz=timezone.utc
+            with observe_stripe('subscription.create'):
+                subscription = stripe.Subscription.create(
+                    customer=customer.id,
+                    items=[{
+                        'price': plan.stripe_price_id,
+                    }],
+                    default_payment_method=payment_method_id,
+                    expand=['latest_invoice.payment_intent'],
+                    metadata={
+                        'user_id': user.id,
+                        'plan_id': plan.id,
+                    }
                 )
+            log_fields['stripe_subscription_id'] = subscription.id
+            logger.debug('Stripe subscription created', extra={**log_fields, 'status': subscription.status})
             
-            # If periods are not available, use current time and add 30 days
-            if not current_period_start:
-                current_period_start = timezone.now()
-            if not current_period_end:
-                from datetime import timedelta
-                current_period_end = current_period_start + timedelta(days=30)
-            
-            print(f"🔍 Saving subscription to database...")
-            print(f"   User: {user.id}")
-            print(f"   Plan: {plan.id}")
-            print(f"   Stripe Subscription ID: {subscription.id}")
-            print(f"   Customer ID: {customer.id}")
-            print(f"   Status: {subscription.status}")
-            print(f"   Period start: {current_period_start}")
-            print(f"   Period end: {current_period_end}")
+            # Save subscription to database
+            current_period_start, current_period_end = subscription_period(subscription)
             
             db_subscription = Subscription.objects.create(
                 user=user,
@@ -117,7 +119,7 @@ class StripeService:
                 current_period_start=current_period_start,
                 current_period_end=current_period_end,
             )
-            print(f"✅ Database subscription created: {db_subscription.id}")
+            logger.info('Subscription created', extra={**log_fields, 'subscription_id': db_subscription.id, 'status': subscription.status})
             
             # Get client_secret safely
             client_secret = None
@@ -125,13 +127,12 @@ class StripeService:
                 if hasattr(subscription, 'latest_invoice') and subscription.latest_invoice:
                     if hasattr(subscription.latest_invoice, 'payment_intent') and subscription.latest_invoice.payment_intent:
                         client_secret = subscription.latest_invoice.payment_intent.client_secret
-                        print(f"✅ Client secret obtained: {client_secret[:20]}...")
                     else:
-                        print("⚠️ No payment_intent found in latest_invoice")
+                        logger.warning('No payment_intent found in latest_invoice', extra=log_fields)
                 else:
-                    print("⚠️ No latest_invoice found in subscription")
+                    logger.warning('No latest_invoice found in subscription', extra=log_fields)
             except Exception as e:
-                print(f"⚠️ Could not get client_secret: {str(e)}")
+                logger.warning('Could not get client_secret', extra={**log_fields, 'error': str(e)})
             
             return {
                 'subscription': db_subscription,
@@ -140,15 +141,13 @@ class StripeService:
             }
             
         except SubscriptionPlan.DoesNotExist:
-            print(f"❌ Subscription plan not found: {plan_id}")
+            logger.info('Subscription plan not found', extra={'user_id': user.id, 'plan_id': plan_id})
             raise Exception("Invalid subscription plan")
         except stripe.StripeError as e:
-            print(f"❌ Stripe error: {str(e)}")
+            logger.warning('Stripe error creating subscription', extra={'user_id': user.id, 'plan_id': plan_id, 'error': str(e)})
             raise Exception(f"Stripe error: {str(e)}")
         except Exception as e:
-            print(f"❌ Unexpected error in create_subscription: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception('Unexpected error in create_subscription', extra={'user_id': user.id, 'plan_id': plan_id})
             raise Exception(f"Subscription creation failed: {str(e)}")
     
     @staticmethod
@@ -159,14 +158,16 @@ class StripeService:
             
             if cancel_at_period_end:
                 # Cancel at period end
-                stripe_sub = stripe.Subscription.modify(
-                    subscription_id,
-                    cancel_at_period_end=True
-                )
+                with observe_stripe('subscription.modify'):
+                    stripe_sub = stripe.Subscription.modify(
+                        subscription_id,
+                        cancel_at_period_end=True
+                    )
                 subscription.cancel_at_period_end = True
             else:
                 # Cancel immediately
-                stripe_sub = stripe.Subscription.delete(subscription_id)
+                with observe_stripe('subscription.delete'):
+                    stripe_sub = stripe.Subscription.delete(subscription_id)
                 subscription.status = 'canceled'
                 subscription.canceled_at = timezone.now()
             
@@ -190,9 +191,11 @@ class StripeService:
                 StripeService._handle_subscription_updated(event['data']['object'])
             elif event['type'] == 'customer.subscription.deleted':
                 StripeService._handle_subscription_deleted(event['data']['object'])
+            elif event['type'] == 'charge.refunded':
+                StripeService._handle_charge_refunded(event['data']['object'])
                 
-        except Exception as e:
-            print(f"Error handling webhook event: {str(e)}")
+        except Exception:
+            logger.exception('Error handling webhook event', extra={'event_id': event.get('id'), 'event_type': event.get('type')})
     
     @staticmethod
     def _handle_payment_succeeded(invoice):
@@ -217,16 +220,43 @@ class StripeService:
                 payment.save()
                 
                 # Create affiliate commission record
-                AffiliateCommission.objects.create(
+                commission = AffiliateCommission.objects.create(
                     affiliate=subscription.user.referred_by,
                     referred_user=subscription.user,
                     payment=payment,
                     commission_amount=commission_amount,
                     commission_type='subscription'
                 )
+                credit_commissions([commission])
             
         except Subscription.DoesNotExist:
-            print(f"Subscription not found for payment: {subscription_id}")
+            logger.warning('Subscription not found for payment', extra={'stripe_subscription_id': subscription_id})
+    
+    @staticmethod
+    def _handle_charge_refunded(charge):
+        """
+        Reverse affiliate commissions for a refund. A full refund marks the
+        payment refunded and cancels its commissions; a partial one reverses
+        the refunded share (amount_refunded is cumulative) and leaves both
+        statuses alone.
+        """
+        with transaction.atomic():
+            # Locked so concurrent refund events for the charge apply in turn
+            payment = (
+                Payment.objects.select_for_update()
+                .filter(stripe_payment_intent_id=charge.get('payment_intent')).first()
+            )
+            if payment is None:
+                logger.warning('Payment not found for refund', extra={'payment_intent': charge.get('payment_intent')})
+                return
+            
+            if charge.get('refunded'):
+                payment.status = 'refunded'
+                payment.save(update_fields=['status', 'updated_at'])
+                cancel_commissions(payment.commissions.all(), reason=f'Refund of payment {payment.id}')
+            elif charge.get('amount') and charge.get('amount_refunded'):
+                share = Decimal(charge['amount_refunded']) / Decimal(charge['amount'])
+                reverse_commission_share(payment.commissions.all(), share, reason=f'Partial refund of payment {payment.id}')
     
     @staticmethod
     def _handle_payment_failed(invoice):
@@ -238,7 +268,7 @@ class StripeService:
             subscription.save()
             
         except Subscription.DoesNotExist:
-            print(f"Subscription not found for failed payment: {subscription_id}")
+            logger.warning('Subscription not found for failed payment', extra={'stripe_subscription_id': subscription_id})
     
     @staticmethod
     def _handle_subscription_updated(stripe_subscription):
@@ -258,7 +288,7 @@ class StripeService:
             subscription.save()
             
         except Subscription.DoesNotExist:
-            print(f"Subscription not found for update: {stripe_subscription['id']}")
+            logger.warning('Subscription not found for update', extra={'stripe_subscription_id': stripe_subscription['id']})
     
     @staticmethod
     def _handle_subscription_deleted(stripe_subscription):
@@ -272,4 +302,4 @@ class StripeService:
             subscription.save()
             
         except Subscription.DoesNotExist:
-            print(f"Subscription not found for deletion: {stripe_subscription['id']}")
+            logger.warning('Subscription not found for deletion', extra={'stripe_subscription_id': stripe_subscription['id']})
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import parse_qsl
+
+import httpx
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.affiliates.ledger import balance_of, credit_commissions
+from apps.affiliates.models import AffiliateCommission, LedgerEntry
+from .async_stripe import stripe_request
+from .models import Payment, Subscription, SubscriptionPlan
+from .stripe_service import StripeService
+
+
+@override_settings(STRIPE_SECRET_KEY='sk_test_123', STRIPE_API_BASE='https://stripe.test', STRIPE_TIMEOUT=5)
+class StripeRequestTests(SimpleTestCase):
+    async def request(self, *args):
+        sent = []
+
+        def handler(request):
+            sent.append(request)
+            return httpx.Response(200, json={'id': 'sub_123'})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with mock.patch('apps.subscriptions.async_stripe.get_async_client', return_value=client):
+            body = await stripe_request(*args)
+        await client.aclose()
+        return body, sent[0]
+
+    async def test_params_are_form_encoded(self):
+        body, request = await self.request('POST', '/v1/subscriptions', 'subscription.create', {
+            'customer': 'cus_1',
+            'items': [{'price': 'price_1'}],
+            'expand': ['latest_invoice.payment_intent'],
+            'metadata': {'user_id': 7},
+        })
+        self.assertEqual(body, {'id': 'sub_123'})
+        self.assertEqual(str(request.url), 'https://stripe.test/v1/subscriptions')
+        self.assertEqual(request.headers['Content-Type'], 'application/x-www-form-urlencoded')
+        self.assertEqual(request.headers['Authorization'], 'Bearer sk_test_123')
+        self.assertEqual(parse_qsl(request.content.decode()), [
+            ('customer', 'cus_1'),
+            ('items[0][price]', 'price_1'),
+            ('expand[0]', 'latest_invoice.payment_intent'),
+            ('metadata[user_id]', '7'),
+        ])
+
+    async def test_request_without_params(self):
+        body, request = await self.request('DELETE', '/v1/subscriptions/sub_123', 'subscription.delete')
+        self.assertEqual(body, {'id': 'sub_123'})
+        self.assertEqual(request.method, 'DELETE')
+        self.assertEqual(request.content, b'')
+
+
+class ChargeRefundedTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.affiliate = User.objects.create_user(
+            email='affiliate@example.com', username='affiliate', password='x', first_name='A', last_name='A',
+        )
+        customer = User.objects.create_user(
+            email='customer@example.com', username='customer', password='x', first_name='C', last_name='C',
+            referred_by=self.affiliate,
+        )
+        plan = SubscriptionPlan.objects.create(
+            name='Basic', description='', price=Decimal('100.00'), plan_type='basic',
+            stripe_price_id='price_1', stripe_product_id='prod_1',
+        )
+        now = timezone.now()
+        # Not active, so the post_save signal does not create its own payment
+        subscription = Subscription.objects.create(
+            user=customer, plan=plan, stripe_subscription_id='sub_1', stripe_customer_id='cus_1',
+            status='incomplete', current_period_start=now, current_period_end=now + timedelta(days=30),
+        )
+        self.payment = Payment.objects.create(
+            subscription=subscription, stripe_payment_intent_id='pi_1', amount=Decimal('100.00'), status='succeeded',
+        )
+        self.commission = AffiliateCommission.objects.create(
+            affiliate=self.affiliate, referred_user=customer, payment=self.payment,
+            commission_amount=Decimal('30.00'), commission_type='subscription',
+        )
+        credit_commissions([self.commission])
+
+    def refund(self, amount_refunded, refunded=False):
+        StripeService._handle_charge_refunded({
+            'payment_intent': 'pi_1', 'amount': 10000, 'amount_refunded': amount_refunded, 'refunded': refunded,
+        })
+        self.payment.refresh_from_db()
+        self.commission.refresh_from_db()
+
+    def reversals(self):
+        return list(
+            LedgerEntry.objects.filter(commission=self.commission, entry_type='reversal')
+            .order_by('id').values_list('amount', flat=True)
+        )
+
+    def test_full_refund_cancels_commission(self):
+        self.refund(10000, refunded=True)
+        self.assertEqual(self.payment.status, 'refunded')
+        self.assertEqual(self.commission.status, 'cancelled')
+        self.assertEqual(self.reversals(), [Decimal('-30.00')])
+        self.assertEqual(balance_of(self.affiliate.id), Decimal('0.00'))
+
+    def test_partial_refund_reverses_its_share(self):
+        self.refund(2500)
+        self.assertEqual(self.payment.status, 'succeeded')
+        self.assertEqual(self.commission.status, 'pending')
+        self.assertEqual(self.reversals(), [Decimal('-7.50')])
+        self.assertEqual(balance_of(self.affiliate.id), Decimal('22.50'))
+
+    def test_replayed_partial_refund_posts_nothing(self):
+        self.refund(2500)
+        self.refund(2500)
+        self.assertEqual(self.reversals(), [Decimal('-7.50')])
+
+    def test_partial_then_full_refund_reverses_the_rest(self):
+        self.refund(2500)
+        self.refund(5000)
+        self.refund(10000, refunded=True)
+        self.assertEqual(self.commission.status, 'cancelled')
+        self.assertEqual(self.reversals(), [Decimal('-7.50'), Decimal('-7.50'), Decimal('-15.00')])
+        self.assertEqual(balance_of(self.affiliate.id), Decimal('0.00'))
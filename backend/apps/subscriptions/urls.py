@@ -1,14 +1,25 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     SubscriptionPlansView, CreateSubscriptionView, SubscriptionStatusView,
     CancelSubscriptionView, create_payment_intent, stripe_webhook
 )
 
+if settings.ASYNC_VIEWS:
+    from . import async_views
+    create_subscription_view = async_views.create_subscription
+    cancel_subscription_view = async_views.cancel_subscription
+    create_payment_intent_view = async_views.create_payment_intent
+else:
+    create_subscription_view = CreateSubscriptionView.as_view()
+    cancel_subscription_view = CancelSubscriptionView.as_view()
+    create_payment_intent_view = create_payment_intent
+
 urlpatterns = [
     path('plans/', SubscriptionPlansView.as_view(), name='subscription_plans'),
-    path('create/', CreateSubscriptionView.as_view(), name='create_subscription'),
+    path('create/', create_subscription_view, name='create_subscription'),
     path('status/', SubscriptionStatusView.as_view(), name='subscription_status'),
-    path('cancel/', CancelSubscriptionView.as_view(), name='cancel_subscription'),
-    path('payment-intent/', create_payment_intent, name='create_payment_intent'),
+    path('cancel/', cancel_subscription_view, name='cancel_subscription'),
+    path('payment-intent/', create_payment_intent_view, name='create_payment_intent'),
     path('webhook/', stripe_webhook, name='stripe_webhook'),
 ]
@@ -1,40 +1,48 @@
-import stripe
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.conf import settings
+from django.db import transaction
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
 import json
+import logging
 
 from .models import SubscriptionPlan, Subscription, WebhookEvent
 from .serializers import (
     SubscriptionPlanSerializer, SubscriptionSerializer,
     CreateSubscriptionSerializer, CancelSubscriptionSerializer
 )
+from .stripe_client import stripe
 from .stripe_service import StripeService
+from .caches import plan_catalogue_cache
+from clinical_platform.archive import cutoff as archive_cutoff
+from clinical_platform.metrics import observe_stripe
+from clinical_platform.partitioning import advisory_xact_lock
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+logger = logging.getLogger(__name__)
 
 
 class SubscriptionPlansView(APIView):
     permission_classes = [permissions.AllowAny]
     
     def get(self, request):
-        plans = SubscriptionPlan.objects.filter(is_active=True)
-        serializer = SubscriptionPlanSerializer(plans, many=True)
+        plans = plan_catalogue_cache.get_or_set(
+            'active',
+            lambda: list(SubscriptionPlanSerializer(
+                SubscriptionPlan.objects.filter(is_active=True), many=True
+            ).data)
+        )
         return Response({
-            'plans': serializer.data
+            'plans': plans
         }, status=status.HTTP_200_OK)
 
 
 class CreateSubscriptionView(APIView):
     def post(self, request):
-        print(f"Create subscription request data: {request.data}")  # Debug log
-        
         serializer = CreateSubscriptionSerializer(data=request.data)
         if serializer.is_valid():
             try:
@@ -57,12 +65,12 @@ class CreateSubscriptionView(APIView):
                 }, status=status.HTTP_201_CREATED)
                 
             except Exception as e:
-                print(f"Subscription creation error: {str(e)}")  # Debug log
+                logger.warning('Subscription creation failed', extra={'user_id': request.user.id, 'error': str(e)})
                 return Response({
                     'error': str(e)
                 }, status=status.HTTP_400_BAD_REQUEST)
         
-        print(f"Serializer errors: {serializer.errors}")  # Debug log
+        logger.info('Invalid subscription request', extra={'user_id': request.user.id, 'fields': sorted(serializer.errors)})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -134,15 +142,16 @@ def create_payment_intent(request):
         currency = plan.currency.lower()
         
         # Create payment intent
-        intent = stripe.PaymentIntent.create(
-            amount=amount,
-            currency=currency,
-            metadata={
-                'user_id': request.user.id,
-                'plan_id': plan.id,
-                'plan_name': plan.name
-            }
-        )
+        with observe_stripe('payment_intent.create'):
+            intent = stripe.PaymentIntent.create(
+                amount=amount,
+                currency=currency,
+                metadata={
+                    'user_id': request.user.id,
+                    'plan_id': plan.id,
+                    'plan_name': plan.name
+                }
+            )
         
         return Response({
             'client_secret': intent.client_secret,
@@ -177,15 +186,23 @@ def stripe_webhook(request):
     except stripe.error.SignatureVerificationError:
         return HttpResponse(status=400)
     
-    # Check if we've already processed this event
-    webhook_event, created = WebhookEvent.objects.get_or_create(
-        stripe_event_id=event['id'],
-        defaults={
-            'event_type': event['type'],
-            'data': event['data'],
-            'processed': False
-        }
-    )
+    # Check if we've already processed this event. stripe_event_id cannot be
+    # unique on the partitioned table, so concurrent deliveries serialize on
+    # an advisory lock; the created_at bound limits the lookup to hot months.
+    with transaction.atomic():
+        advisory_xact_lock(f"stripe-event:{event['id']}")
+        webhook_event = WebhookEvent.objects.filter(
+            stripe_event_id=event['id'],
+            created_at__gte=archive_cutoff('webhook_events'),
+        ).first()
+        created = webhook_event is None
+        if created:
+            webhook_event = WebhookEvent.objects.create(
+                stripe_event_id=event['id'],
+                event_type=event['type'],
+                data=event['data'],
+                processed=False
+            )
     
     if not created and webhook_event.processed:
         return HttpResponse(status=200)
@@ -193,10 +210,11 @@ def stripe_webhook(request):
     # Process the event
     try:
         StripeService.handle_webhook_event(event)
-        webhook_event.processed = True
-        webhook_event.save()
-    except Exception as e:
-        print(f"Error processing webhook: {str(e)}")
+        WebhookEvent.objects.filter(
+            pk=webhook_event.pk, created_at=webhook_event.created_at
+        ).update(processed=True)
+    except Exception:
+        logger.exception('Error processing webhook', extra={'event_id': event['id'], 'event_type': event['type']})
         return HttpResponse(status=500)
     
     return HttpResponse(status=200)
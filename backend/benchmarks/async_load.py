@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""
+Concurrent-request capacity of one worker, sync (WSGI) vs async (ASGI).
+
+1. Start a stub Stripe API that answers after a fixed delay:
+
+    python benchmarks/async_load.py stub --port 12111 --latency-ms 300
+
+2. Start one worker of each kind against the stub (needs a database with
+   an active plan and a user to log in as):
+
+    STRIPE_API_BASE=http://127.0.0.1:12111 GUNICORN_PROFILE=gthread GUNICORN_WORKERS=1 \\
+        GUNICORN_BIND=:8000 gunicorn -c python:clinical_platform.gunicorn_conf
+    STRIPE_API_BASE=http://127.0.0.1:12111 GUNICORN_PROFILE=uvicorn GUNICORN_WORKERS=1 \\
+        GUNICORN_BIND=:8001 gunicorn -c python:clinical_platform.gunicorn_conf
+
+3. Drive both with increasing concurrency:
+
+    python benchmarks/async_load.py run --target sync=http://127.0.0.1:8000 \\
+        --target async=http://127.0.0.1:8001 --email patient@example.com \\
+        --password patient123 --plan-id 1 --concurrency 4,16,64,128
+
+By default each request is POST /api/subscriptions/payment-intent/, which
+does one database read and one Stripe call.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+_ids = itertools.count(1)
+_ids_lock = threading.Lock()
+
+STUB_OBJECTS = {
+    'customers': 'customer',
+    'payment_intents': 'payment_intent',
+    'payment_methods': 'payment_method',
+    'subscriptions': 'subscription',
+}
+
+
+class StubStripeHandler(BaseHTTPRequestHandler):
+    latency = 0.3
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        time.sleep(self.latency)
+
+        resource = self.path.split('?')[0].split('/')[2] if self.path.count('/') >= 2 else ''
+        object_name = STUB_OBJECTS.get(resource, resource.rstrip('s'))
+        with _ids_lock:
+            n = next(_ids)
+        now = int(time.time())
+        body = json.dumps({
+            'id': f"{object_name[:3]}_stub{n}",
+            'object': object_name,
+            'status': 'active',
+            'client_secret': f"pi_stub{n}_secret_stub",
+            'current_period_start': now,
+            'current_period_end': now + 30 * 86400,
+            'latest_invoice': {
+                'id': f"in_stub{n}",
+                'object': 'invoice',
+                'payment_intent': {'id': f"pi_stub{n}", 'object': 'payment_intent', 'client_secret': f"pi_stub{n}_secret_stub"},
+            },
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_stub(port, latency_ms):
+    StubStripeHandler.latency = latency_ms / 1000
+    ThreadingHTTPServer.daemon_threads = True
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubStripeHandler)
+    print(f"🧪 Stub Stripe API on http://127.0.0.1:{port} ({latency_ms:.0f}ms per call)")
+    server.serve_forever()
+
+
+async def login(client, base_url, email, password):
+    response = await client.post(f"{base_url}/api/auth/login/", json={'email': email, 'password': password})
+    response.raise_for_status()
+    return response.json()['tokens']['access']
+
+
+async def drive(client, url, token, body, concurrency, total):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=body, headers={'Authorization': f"Bearer {token}"})
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'rps': total / elapsed,
+        'p50': quantiles[49] * 1000,
+        'p95': quantiles[94] * 1000,
+        'errors': errors,
+    }
+
+
+async def run_load(args):
+    targets = [target.split('=', 1) for target in args.target]
+    levels = [int(level) for level in args.concurrency.split(',')]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        tokens = {name: await login(client, base_url, args.email, args.password) for name, base_url in targets}
+
+        print(f"🚦 POST {args.path}, {args.requests} requests per level")
+        print("=" * 66)
+        print(f"{'Target':<10} {'Concurrency':>12} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'errors':>8}")
+        print("-" * 66)
+        for name, base_url in targets:
+            for level in levels:
+                result = await drive(
+                    client, f"{base_url}{args.path}", tokens[name], {'plan_id': args.plan_id},
+                    level, max(args.requests, level),
+                )
+                print(f"{name:<10} {level:>12} {result['rps']:>10.1f} {result['p50']:>10.1f} "
+                      f"{result['p95']:>10.1f} {result['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stub = subparsers.add_parser('stub', help='Run the stub Stripe API')
+    stub.add_argument('--port', type=int, default=12111)
+    stub.add_argument('--latency-ms', type=float, default=300)
+
+    run = subparsers.add_parser('run', help='Drive one or more servers')
+    run.add_argument('--target', action='append', required=True, help='name=base_url, repeatable')
+    run.add_argument('--email', required=True)
+    run.add_argument('--password', required=True)
+    run.add_argument('--plan-id', type=int, default=1)
+    run.add_argument('--path', default='/api/subscriptions/payment-intent/')
+    run.add_argument('--concurrency', default='4,16,64,128')
+    run.add_argument('--requests', type=int, default=256)
+    run.add_argument('--timeout', type=float, default=60)
+
+    args = parser.parse_args()
+    if args.command == 'stub':
+        run_stub(args.port, args.latency_ms)
+    else:
+        asyncio.run(run_load(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Requests/sec with and without persistent database connections.
+
+Drives an endpoint through the Django test client. The client detaches
+close_old_connections from request_started/request_finished, so the
+benchmark calls it around every request the way a real worker's handler
+does; that is what applies CONN_MAX_AGE and the health checks. Needs a
+reachable database.
+
+    python benchmarks/db_connections.py [--requests 500] [--path /api/nutrition/diseases/]
+"""
+import argparse
+import os
+import sys
+import time
+
+import django
+
+# Setup Django
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clinical_platform.settings')
+django.setup()
+
+from django.db import close_old_connections, connections
+from django.test import Client
+
+from clinical_platform.db import connection_stats
+
+
+def run(path, requests, conn_max_age, health_checks):
+    connection = connections['default']
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    connection.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+
+    client = Client(HTTP_HOST='localhost')
+    before = connection_stats()
+    started = time.monotonic()
+    for _ in range(requests):
+        close_old_connections()
+        response = client.get(path)
+        close_old_connections()
+        assert response.status_code == 200, (response.status_code, response.content[:200])
+    elapsed = time.monotonic() - started
+    after = connection_stats()
+    return requests / elapsed, after['connections_opened'] - before['connections_opened']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--path', default='/api/nutrition/diseases/')
+    args = parser.parse_args()
+
+    print(f"🔌 {args.requests} requests to {args.path}")
+    print("=" * 60)
+    print(f"{'Mode':<28} {'req/s':>10} {'connections opened':>20}")
+    print("-" * 60)
+    modes = (
+        ('per-request (CONN_MAX_AGE=0)', 0, False),
+        ('persistent', 60, False),
+        ('persistent + health checks', 60, True),
+    )
+    for label, conn_max_age, health_checks in modes:
+        rate, opened = run(args.path, args.requests, conn_max_age, health_checks)
+        print(f"{label:<28} {rate:>10.1f} {opened:>20}")
+
+
+if __name__ == '__main__':
+    main()
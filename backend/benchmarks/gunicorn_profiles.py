@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+Gunicorn profile harness: cold start, memory per worker and throughput.
+
+Starts gunicorn with clinical_platform.gunicorn_conf once per profile
+(with and without preload) and measures:
+
+  cold start   seconds from exec until the first endpoint answers
+  RSS/worker   resident memory of each worker process
+  PSS total    proportional set size of master + workers, i.e. memory
+               really used once copy-on-write sharing is accounted for
+               (Linux only, from /proc/<pid>/smaps_rollup)
+  req/s        keep-alive GET throughput per endpoint for --seconds
+
+Needs a reachable database (and Redis, unless CACHE_BACKEND=locmem).
+
+    python benchmarks/gunicorn_profiles.py [--profiles sync,gthread,uvicorn]
+        [--workers 2] [--seconds 10] [--concurrency 16]
+        [--endpoint /api/subscriptions/plans/ --endpoint /api/nutrition/diseases/]
+"""
+import argparse
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ENDPOINTS = ['/api/subscriptions/plans/', '/api/nutrition/diseases/', '/api/nutrition/demo/']
+
+
+def child_pids(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                fields = stat.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def memory_kb(pid):
+    """(rss, pss) in kB"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as rollup:
+            for line in rollup:
+                key, _, rest = line.partition(':')
+                if key in ('Rss', 'Pss'):
+                    values[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values.get('Rss', 0), values.get('Pss', 0)
+
+
+def wait_until_ready(port, path, deadline):
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', path)
+            status = connection.getresponse().status
+            connection.close()
+            if status < 500:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.05)
+    return False
+
+
+def throughput(port, path, seconds, concurrency):
+    stop_at = time.monotonic() + seconds
+
+    def worker():
+        done = 0
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        while time.monotonic() < stop_at:
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status < 500:
+                    done += 1
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        connection.close()
+        return done
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        total = sum(pool.map(lambda _: worker(), range(concurrency)))
+    return total / seconds
+
+
+def run_profile(profile, preload, args, port):
+    env = dict(
+        os.environ,
+        GUNICORN_PROFILE=profile,
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_PRELOAD=str(preload),
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_MAX_REQUESTS='0',
+    )
+    started = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'python:clinical_platform.gunicorn_conf'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        if not wait_until_ready(port, args.endpoint[0], started + args.startup_timeout):
+            process.kill()
+            error = process.stderr.read().decode(errors='replace')[-2000:]
+            raise RuntimeError(f"{profile} did not start:\n{error}")
+        cold_start = time.monotonic() - started
+
+        # Let every worker finish booting before measuring memory
+        time.sleep(1)
+        workers = child_pids(process.pid)
+        worker_memory = [memory_kb(pid) for pid in workers]
+        _, master_pss = memory_kb(process.pid)
+        rss_per_worker = sum(rss for rss, _ in worker_memory) / max(len(workers), 1) / 1024
+        pss_total = (master_pss + sum(pss for _, pss in worker_memory)) / 1024
+
+        rates = [throughput(port, path, args.seconds, args.concurrency) for path in args.endpoint]
+        return cold_start, rss_per_worker, pss_total, rates
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default='sync,gthread,uvicorn')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--startup-timeout', type=float, default=60)
+    parser.add_argument('--endpoint', action='append')
+    args = parser.parse_args()
+    args.endpoint = args.endpoint or DEFAULT_ENDPOINTS
+
+    print(f"🦄 {args.workers} workers per profile, {args.concurrency} concurrent clients, {args.seconds:.0f}s per endpoint")
+    for index, path in enumerate(args.endpoint, 1):
+        print(f"   [{index}] {path}")
+    header = f"{'Profile':<10} {'Preload':<8} {'Cold start s':>12} {'RSS/worker MB':>14} {'PSS total MB':>13}"
+    header += ''.join(f" {f'[{index}] req/s':>12}" for index in range(1, len(args.endpoint) + 1))
+    print("=" * len(header))
+    print(header)
+    print("-" * len(header))
+
+    for profile in args.profiles.split(','):
+        for preload in (False, True):
+            try:
+                cold_start, rss, pss, rates = run_profile(profile, preload, args, args.port)
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                continue
+            row = f"{profile:<10} {str(preload):<8} {cold_start:>12.2f} {rss:>14.1f} {pss:>13.1f}"
+            row += ''.join(f" {rate:>12.1f}" for rate in rates)
+            print(row)
+
+
+if __name__ == '__main__':
+    main()
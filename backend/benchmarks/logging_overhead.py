@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Per-request logging overhead: the old print()/blocking FileHandler path
+against the background JSON writer.
+
+Each simulated request emits what CreateSubscriptionView and
+StripeService.create_subscription used to print (about 20 lines) or what
+they log now (two DEBUG records plus one INFO record). Both handlers run
+at DEBUG (3 records per request) and at INFO (1 record), so comparing
+rows of the same level shows the handler change and comparing levels
+shows what gating DEBUG off saves. Output goes to files in a temporary
+directory; --sink-latency-us adds a delay to every write to mimic a slow
+disk or a blocked stdout pipe.
+
+    python benchmarks/logging_overhead.py [--requests 2000] [--threads 8] [--sink-latency-us 50]
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clinical_platform.structured_logging import BackgroundQueueHandler, JsonFormatter
+
+REQUEST_DATA = {'plan_id': 3, 'payment_method_id': 'pm_1NvQk2LkdIwHu7ix', 'billing': {'name': 'Jane Doe'}}
+
+
+class SlowStream(io.TextIOWrapper):
+    """Text file whose writes take at least ``latency`` seconds"""
+
+    latency = 0.0
+
+    def write(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().write(text)
+
+
+def open_sink(path, latency):
+    stream = SlowStream(open(path, 'wb'), encoding='utf-8', line_buffering=True)
+    stream.latency = latency
+    return stream
+
+
+def old_print_request(stream):
+    print(f"Create subscription request data: {REQUEST_DATA}", file=stream)
+    print("🔍 Creating subscription for user 42, plan 3, payment_method pm_1NvQk2LkdIwHu7ix", file=stream)
+    print("✅ Plan found: Pro - price_1Nv", file=stream)
+    print("✅ Customer created: cus_Oj3", file=stream)
+    print("🔍 Creating Stripe subscription...", file=stream)
+    for line in ('created: sub_1', 'Status: active', 'Current period start: 1700000000',
+                 'Current period end: 1702592000', 'Saving subscription to database...',
+                 'User: 42', 'Plan: 3', 'Stripe Subscription ID: sub_1', 'Customer ID: cus_Oj3',
+                 'Status: active', 'Period start: 2023-11-14', 'Period end: 2023-12-14',
+                 'Database subscription created: 17', 'Client secret obtained: pi_3Nv_secret...'):
+        print(f"   {line}", file=stream)
+
+
+def new_logging_request(logger):
+    fields = {'user_id': 42, 'plan_id': 3}
+    logger.debug('Creating subscription', extra=fields)
+    fields['customer_id'] = 'cus_Oj3'
+    fields['stripe_subscription_id'] = 'sub_1'
+    logger.debug('Stripe subscription created', extra={**fields, 'status': 'active'})
+    logger.info('Subscription created', extra={**fields, 'subscription_id': 17, 'status': 'active'})
+
+
+def make_logger(name, level):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger
+
+
+def run(requests, threads, work):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: work(), range(requests)))
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--sink-latency-us', type=float, default=50)
+    args = parser.parse_args()
+    latency = args.sink_latency_us / 1e6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = []
+
+        stream = open_sink(os.path.join(tmp, 'stdout.txt'), latency)
+        results.append(('print() x20', run(args.requests, args.threads, lambda: old_print_request(stream))))
+        stream.close()
+
+        drains = []
+        for level in (logging.DEBUG, logging.INFO):
+            level_name = logging.getLevelName(level)
+            logger = make_logger(f'benchmark.blocking.{level_name}', level)
+            handler = logging.StreamHandler(open_sink(os.path.join(tmp, f'blocking-{level_name}.log'), latency))
+            handler.setFormatter(JsonFormatter())
+            logger.addHandler(handler)
+            results.append((f'blocking JSON, {level_name}', run(args.requests, args.threads, lambda: new_logging_request(logger))))
+            handler.close()
+
+            logger = make_logger(f'benchmark.background.{level_name}', level)
+            handler = BackgroundQueueHandler(filename=os.path.join(tmp, f'background-{level_name}.log'), console=False)
+            handler.setFormatter(JsonFormatter())
+            for target in handler.targets:
+                target.stream.close()
+                target.stream = open_sink(target.baseFilename, latency)
+            logger.addHandler(handler)
+            results.append((f'background JSON, {level_name}', run(args.requests, args.threads, lambda: new_logging_request(logger))))
+            drain_started = time.perf_counter()
+            handler.flush_and_stop()
+            drains.append((level_name, time.perf_counter() - drain_started, handler.dropped))
+
+    print(f"📝 {args.requests} requests, {args.threads} threads, {args.sink_latency_us:.0f}us per write")
+    print("=" * 56)
+    print(f"{'Mode':<30} {'us/request':>12}")
+    print("-" * 56)
+    for label, per_request in results:
+        print(f"{label:<30} {per_request:>12.1f}")
+    print("-" * 56)
+    for level_name, drain, dropped in drains:
+        print(f"Background writer ({level_name}) drained in {drain:.2f}s, dropped {dropped} records")
+
+
+if __name__ == '__main__':
+    main()
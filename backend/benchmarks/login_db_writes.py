@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Count the database queries and writes issued by one login, with and
+without Django sessions (API_SESSION_AUTH). Needs a reachable database.
+
+    python benchmarks/login_db_writes.py [--logins 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+import django
+
+# Setup Django
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clinical_platform.settings')
+django.setup()
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from apps.accounts.models import User
+
+EMAIL = 'session-benchmark@example.com'
+PASSWORD = 'BenchmarkPass123!'
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+# Hashing cost is irrelevant to query counts, so use the cheapest hasher
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def run_logins(session_auth, logins):
+    with override_settings(API_SESSION_AUTH=session_auth, PASSWORD_HASHERS=FAST_HASHERS):
+        client = Client(HTTP_HOST='localhost')
+        started = time.monotonic()
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(logins):
+                response = client.post('/api/auth/login/', {'email': EMAIL, 'password': PASSWORD},
+                                        content_type='application/json')
+                assert response.status_code == 200, response.content
+                client.cookies.clear()
+        elapsed = time.monotonic() - started
+    writes = [q for q in ctx.captured_queries if q['sql'].lstrip().upper().startswith(WRITE_PREFIXES)]
+    return len(ctx.captured_queries) / logins, len(writes) / logins, logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=20)
+    args = parser.parse_args()
+
+    with override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+        User.objects.filter(email=EMAIL).delete()
+        User.objects.create_user(email=EMAIL, username='session-benchmark', password=PASSWORD,
+                                 first_name='Session', last_name='Benchmark')
+    try:
+        print(f"🔑 Queries per login ({args.logins} logins each)")
+        print("=" * 60)
+        print(f"{'Mode':<14} {'queries':>10} {'writes':>10} {'logins/s':>12}")
+        print("-" * 60)
+        results = {}
+        for label, session_auth in (('session+JWT', True), ('JWT only', False)):
+            results[label] = run_logins(session_auth, args.logins)
+            queries, writes, rate = results[label]
+            print(f"{label:<14} {queries:>10.1f} {writes:>10.1f} {rate:>12.1f}")
+        removed = results['session+JWT'][1] - results['JWT only'][1]
+        print("-" * 60)
+        print(f"Writes removed per login: {removed:.1f}")
+    finally:
+        User.objects.filter(email=EMAIL).delete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Login throughput benchmark - password verifications (and optionally full
+logins) per second for each configured hasher.
+
+    python benchmarks/login_throughput.py [--seconds 5] [--threads 4] [--full]
+
+--full also measures authenticate() through the configured backend
+(AUTHENTICATION_BACKENDS, i.e. the hash semaphore) on all threads and
+posts to /api/auth/login/ through the test client; it needs a reachable
+database.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+# Setup Django
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clinical_platform.settings')
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.test.utils import override_settings
+
+HASHERS = {
+    'pbkdf2': 'apps.accounts.hashers.ConfigurablePBKDF2PasswordHasher',
+    'scrypt': 'apps.accounts.hashers.ConfigurableScryptPasswordHasher',
+    'argon2': 'apps.accounts.hashers.ConfigurableArgon2PasswordHasher',
+}
+PASSWORD = 'BenchmarkPass123!'
+
+
+def available_hashers():
+    names = ['pbkdf2', 'scrypt']
+    if importlib.util.find_spec('argon2'):
+        names.append('argon2')
+    else:
+        print("argon2-cffi not installed, skipping argon2")
+    return names
+
+
+def measure(func, seconds, threads):
+    """Run func repeatedly on `threads` threads for `seconds`; return calls/sec"""
+    deadline = time.monotonic() + seconds
+
+    def loop():
+        count = 0
+        while time.monotonic() < deadline:
+            func()
+            count += 1
+        return count
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        total = sum(pool.map(lambda _: loop(), range(threads)))
+    return total / (time.monotonic() - started)
+
+
+def bench_verify(name, seconds, threads):
+    with override_settings(PASSWORD_HASHERS=[HASHERS[name]]):
+        encoded = make_password(PASSWORD)
+        single = measure(lambda: check_password(PASSWORD, encoded), seconds, 1)
+        parallel = measure(lambda: check_password(PASSWORD, encoded), seconds, threads)
+    return single, parallel
+
+
+def bench_full_login(name, seconds, threads):
+    """(authenticate() calls/s on `threads` threads, login requests/s) for one hasher"""
+    from django.contrib.auth import authenticate
+    from django.test import Client
+    from apps.accounts.models import User
+
+    email = 'login-benchmark@example.com'
+    with override_settings(PASSWORD_HASHERS=[HASHERS[name]]):
+        User.objects.filter(email=email).delete()
+        User.objects.create_user(
+            email=email, username='login-benchmark', password=PASSWORD,
+            first_name='Login', last_name='Benchmark'
+        )
+        client = Client(HTTP_HOST='localhost')
+
+        def backend_login():
+            assert authenticate(username=email, password=PASSWORD) is not None
+
+        def request_login():
+            response = client.post('/api/auth/login/', {'email': email, 'password': PASSWORD},
+                                   content_type='application/json')
+            assert response.status_code == 200, (response.status_code, response.content[:200])
+
+        try:
+            return measure(backend_login, seconds, threads), measure(request_login, seconds, 1)
+        finally:
+            User.objects.filter(email=email).delete()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--full', action='store_true', help='Also benchmark the full login endpoint')
+    args = parser.parse_args()
+
+    print(f"🔐 Login throughput ({args.threads} threads, {os.cpu_count()} cores)")
+    if args.full:
+        print(f"Backends: {', '.join(settings.AUTHENTICATION_BACKENDS)}")
+    print("=" * 82)
+    print(f"{'Hasher':<8} {'verify/s (1 core)':>18} {'verify/s (pool)':>16} {'per core':>10} "
+          f"{'backend/s':>11} {'logins/s':>10}")
+    print("-" * 82)
+    for name in available_hashers():
+        single, parallel = bench_verify(name, args.seconds, args.threads)
+        if args.full:
+            backend, logins = bench_full_login(name, args.seconds, args.threads)
+            full = f"{backend:>11.1f} {logins:>10.1f}"
+        else:
+            full = f"{'-':>11} {'-':>10}"
+        print(f"{name:<8} {single:>18.1f} {parallel:>16.1f} {parallel / args.threads:>10.1f} {full}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Startup time of a web worker and of an ops script, plus an import profile.
+
+Each scenario runs in a fresh interpreter --repeat times:
+
+  ops-script   django.setup(), which is what every backend script pays
+  worker-boot  django.setup() + WSGI application + URLconf import
+
+The table shows the median in-process time (setup only) and the median
+wall time (including interpreter start). One extra run with
+``-X importtime`` lists the most expensive top-level imports, and the
+script reports which heavy modules (Stripe, Celery, Pillow, httpx, ...)
+got imported even though startup should not need them.
+
+The exit status is 1 if a median exceeds --max-ms or a heavy module is
+loaded at startup, so the script can gate a CI job:
+
+    python benchmarks/startup_time.py [--repeat 5] [--max-ms 1500] [--top 15]
+
+Runs with DEBUG=False (production app list) unless --debug is given.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Not `requests`: rest_framework.compat imports it whenever it is installed
+HEAVY_MODULES = ['stripe', 'celery.app', 'kombu', 'PIL', 'httpx', 'django_extensions']
+
+CHILD = '''
+import json, os, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clinical_platform.settings')
+import django
+django.setup()
+if {boot_worker}:
+    import clinical_platform.wsgi
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+SCENARIOS = {
+    'ops-script': False,
+    'worker-boot': True,
+}
+
+
+def run_child(boot_worker, env, importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', CHILD.format(boot_worker=boot_worker, heavy=HEAVY_MODULES)]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1]), wall, result.stderr
+
+
+def top_imports(importtime_output, top):
+    """Top-level imports (not nested ones) by cumulative microseconds"""
+    entries = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented beyond the single separator space
+        if name.startswith('  '):
+            continue
+        entries.append((int(cumulative_us), name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None, help='fail if a median setup time exceeds this')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--debug', action='store_true', help='measure with DEBUG=True (dev apps)')
+    args = parser.parse_args()
+
+    env = dict(os.environ, DEBUG=str(args.debug))
+    failed = False
+
+    print(f"⏱️  Startup time, {args.repeat} runs per scenario, DEBUG={args.debug}")
+    print("=" * 60)
+    print(f"{'Scenario':<14} {'setup ms':>12} {'wall ms':>12}  heavy modules loaded")
+    print("-" * 60)
+    for name, boot_worker in SCENARIOS.items():
+        setups, walls, loaded = [], [], []
+        for _ in range(args.repeat):
+            report, wall, _ = run_child(boot_worker, env)
+            setups.append(report['elapsed'] * 1000)
+            walls.append(wall * 1000)
+            loaded = report['loaded']
+        setup_ms = statistics.median(setups)
+        print(f"{name:<14} {setup_ms:>12.0f} {statistics.median(walls):>12.0f}  {', '.join(loaded) or '-'}")
+        if loaded or (args.max_ms is not None and setup_ms > args.max_ms):
+            failed = True
+
+    _, _, importtime_output = run_child(True, env, importtime=True)
+    print()
+    print("🐢 Slowest top-level imports (worker-boot, -X importtime)")
+    print("-" * 60)
+    for cumulative_us, module in top_imports(importtime_output, args.top):
+        print(f"{module:<44} {cumulative_us / 1000:>10.1f} ms")
+
+    if failed:
+        print()
+        print("❌ Startup budget exceeded or heavy modules imported at startup")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -34,6 +34,47 @@ CELERY_BEAT_SCHEDULE = {
             'expires': 3600,
         }
     },
+    
+    'process-payouts': {
+        'task': 'apps.affiliates.tasks.process_payouts',
+        'schedule': crontab(minute=15),
+        'options': {
+            'expires': 3000,
+        }
+    },
+    
+    'snapshot-affiliate-balances': {
+        'task': 'apps.affiliates.tasks.snapshot_affiliate_balances',
+        'schedule': crontab(hour=23, minute=55),
+        'options': {
+            'expires': 600,
+        }
+    },
+    
+    'maintain-partitions': {
+        'task': 'clinical_platform.tasks.maintain_partitions',
+        'schedule': crontab(hour=5, minute=0),
+        'options': {
+            'expires': 3600,
+        }
+    },
+    
+    'archive-old-rows': {
+        'task': 'clinical_platform.tasks.archive_old_rows',
+        'schedule': crontab(hour=4, minute=30),
+        'kwargs': {'names': ['webhook_events', 'whatsapp_messages']},
+        'options': {
+            'expires': 3600,
+        }
+    },
+    
+    'purge-expired-tokens': {
+        'task': 'apps.accounts.tasks.purge_expired_tokens',
+        'schedule': crontab(minute=30),
+        'options': {
+            'expires': 1800,
+        }
+    },
 }
 
 CELERY_TIMEZONE = 'UTC'
@@ -45,7 +86,13 @@ CELERY_TASK_ROUTES = {
 CELERY_TASK_DEFAULT_PRIORITY = 5
 CELERY_TASK_ROUTES_PRIORITY = {
     'apps.affiliates.tasks.process_affiliate_commissions': 8,
+    'apps.affiliates.tasks.process_payouts': 7,
     'apps.affiliates.tasks.update_affiliate_stats': 6,
+    'apps.affiliates.tasks.update_affiliate_stats_chunk': 6,
+    'apps.affiliates.tasks.finish_affiliate_stats_update': 6,
     'apps.affiliates.tasks.send_commission_notifications': 4,
+    'apps.affiliates.tasks.send_commission_notification_chunk': 4,
     'apps.affiliates.tasks.cleanup_old_commissions': 2,
+    'clinical_platform.tasks.archive_old_rows': 2,
+    'clinical_platform.tasks.maintain_partitions': 3,
 }
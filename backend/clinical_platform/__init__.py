@@ -0,0 +1,15 @@
+# The Celery app (and celery_schedule) is loaded on first use rather than
+# with Django: web workers and ops scripts that never enqueue a task skip
+# importing Celery entirely. Task modules import clinical_platform.celery,
+# so the app is configured before any .delay(). `celery -A clinical_platform`
+# resolves ``app`` through __getattr__.
+
+
+def __getattr__(name):
+    if name in ('app', 'celery_app'):
+        from .celery import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ('celery_app',)
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class PlatformConfig(AppConfig):
+    """Project-level hooks (database connection stats, instrumentation)"""
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'clinical_platform'
+    verbose_name = 'Clinical Platform'
+    
+    def ready(self):
+        import clinical_platform.db
+        import clinical_platform.metrics
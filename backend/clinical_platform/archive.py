@@ -0,0 +1,109 @@
+"""
+Cold storage for rows that are only kept for history.
+
+Each chunk is moved with a single statement,
+
+    WITH batch AS (SELECT pk ... ORDER BY pk LIMIT n FOR UPDATE SKIP LOCKED),
+         moved AS (DELETE FROM hot ... RETURNING *)
+    INSERT INTO archive SELECT ... FROM moved
+
+so a row is never in both tables or in neither, and rows another
+transaction is writing are left for the next run. An archive model
+mirrors every column of its hot model plus ``archived_at`` and says which
+rows are old enough through ``archivable(cutoff)``.
+
+Partitioned tables (partitioning.py) are archived a month at a time
+instead, once the whole month is past the cutoff.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# name: (archive model, setting with the age in days after which rows move)
+ARCHIVES = {
+    'commissions': ('affiliates.ArchivedCommission', 'COMMISSION_ARCHIVE_DAYS'),
+    'webhook_events': ('subscriptions.ArchivedWebhookEvent', 'WEBHOOK_EVENT_ARCHIVE_DAYS'),
+    'whatsapp_messages': ('nutrition.ArchivedWhatsAppMessage', 'WHATSAPP_MESSAGE_ARCHIVE_DAYS'),
+}
+
+
+def _move_chunk(queryset, archive_model, chunk_size):
+    model = queryset.model
+    quote = connection.ops.quote_name
+    pk = quote(model._meta.pk.column)
+    columns = ', '.join(quote(field.column) for field in model._meta.concrete_fields)
+    with transaction.atomic():
+        batch, params = (
+            queryset.order_by('pk').select_for_update(skip_locked=True).values('pk')[:chunk_size]
+            .query.sql_with_params()
+        )
+        sql = f"""
+        WITH batch AS ({batch}),
+        moved AS (
+            DELETE FROM {quote(model._meta.db_table)} WHERE {pk} IN (SELECT * FROM batch)
+            RETURNING {columns}
+        )
+        INSERT INTO {quote(archive_model._meta.db_table)} ({columns}, archived_at)
+        SELECT {columns}, %s FROM moved
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, timezone.now()])
+            return cursor.rowcount
+
+
+def archive_rows(queryset, archive_model, chunk_size=5000, sleep_seconds=0, max_chunks=None):
+    """Move the rows of `queryset` into archive_model's table, chunk_size rows per transaction"""
+    chunks = 0
+    archived = 0
+    while max_chunks is None or chunks < max_chunks:
+        moved = _move_chunk(queryset, archive_model, chunk_size)
+        if not moved:
+            break
+        chunks += 1
+        archived += moved
+        logger.info(f"Archived {moved} {queryset.model._meta.db_table} rows into {archive_model._meta.db_table}")
+        if moved < chunk_size:
+            break
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+    return {'chunks': chunks, 'archived': archived}
+
+
+def cutoff(name, now=None):
+    """Age limit of the `name` archive: older rows move out of the hot table"""
+    return (now or timezone.now()) - timedelta(days=getattr(settings, ARCHIVES[name][1]))
+
+
+def archivable(name, now=None):
+    """The rows the `name` archive would take now, and its archive model"""
+    from . import partitioning  # imports this module
+
+    archive_model = apps.get_model(ARCHIVES[name][0])
+    if partitioning.is_archived_by_partition(name):
+        model = apps.get_model(partitioning.PARTITIONED[name].model)
+        return model.objects.filter(created_at__lt=partitioning.expired_before(name, now)), archive_model
+    return archive_model.archivable(cutoff(name, now)), archive_model
+
+
+def archive(name, chunk_size=None, sleep_seconds=0, max_chunks=None):
+    """Run the `name` archive (see ARCHIVES) with its configured age"""
+    from . import partitioning  # imports this module
+
+    if partitioning.is_archived_by_partition(name):
+        result = partitioning.archive_expired_partitions(name)
+        return {'name': name, 'chunks': len(result['partitions']), **result}
+    queryset, archive_model = archivable(name)
+    result = archive_rows(
+        queryset, archive_model,
+        chunk_size=chunk_size or settings.ARCHIVE_CHUNK_SIZE,
+        sleep_seconds=sleep_seconds,
+        max_chunks=max_chunks,
+    )
+    return {'name': name, **result}
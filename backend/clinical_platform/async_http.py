@@ -0,0 +1,28 @@
+"""
+Shared httpx.AsyncClient for async views.
+
+An AsyncClient (and its connection pool) is bound to the event loop it
+was first used on, so one client is kept per loop. Under uvicorn each
+worker has a single long-lived loop and gets keep-alive reuse; under
+WSGI every async view runs in a fresh loop and its client goes away
+with it.
+"""
+import asyncio
+import weakref
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """AsyncClient for the running event loop"""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        )
+        _clients[loop] = client
+    return client
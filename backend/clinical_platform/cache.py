@@ -0,0 +1,249 @@
+"""
+Two-tier cache: a per-process LRU in front of the shared Django cache
+(Redis in production, local memory in development).
+
+Usage::
+
+    plans_cache = tiered_cache('subscription-plans', timeout=3600)
+    data = plans_cache.get_or_set('active', lambda: build_plans())
+    plans_cache.invalidate_on_commit()   # e.g. from a post_save signal
+
+Keys are namespaced and versioned. ``invalidate()`` bumps the namespace
+version in the shared cache, which orphans every key in every process.
+Other processes notice within ``version_ttl`` seconds. ``get_or_set`` is
+single-flight: concurrent misses for the same key compute the value once
+per process (thread lock) and once across processes (cache.add lock).
+
+The cache fails open: when the shared backend errors (e.g. Redis is
+down) the error is logged and counted, and reads fall through to the
+producer. Signal receivers invalidate with ``invalidate_on_commit()`` so
+a cache outage cannot fail the write that triggered it.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.db import transaction
+
+from .metrics import cache_events
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class LocalLRU:
+    """Small thread-safe LRU with per-entry expiry"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache:
+    def __init__(self, namespace, timeout=300, local_timeout=30, local_maxsize=256,
+                 version_ttl=2, lock_timeout=10, alias='default'):
+        self.namespace = namespace
+        self.timeout = timeout
+        self.local_timeout = min(local_timeout, timeout)
+        self.version_ttl = version_ttl
+        self.lock_timeout = lock_timeout
+        self.alias = alias
+        self.local = LocalLRU(local_maxsize)
+        self._version = None
+        self._version_checked_at = 0.0
+        # Striped locks keep single-flight memory bounded for per-user keys
+        self._key_locks = [threading.Lock() for _ in range(64)]
+        self._stats_lock = threading.Lock()
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0, 'errors': 0}
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+        cache_events.labels(self.namespace, name).inc()
+
+    @property
+    def _version_key(self):
+        return f"{self.namespace}:__version__"
+
+    def _current_version(self):
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked_at >= self.version_ttl:
+            version = self.shared.get(self._version_key)
+            if version is None:
+                self.shared.add(self._version_key, 1, timeout=None)
+                version = self.shared.get(self._version_key, 1)
+            if version != self._version:
+                self.local.clear()
+            self._version = version
+            self._version_checked_at = now
+        return self._version
+
+    def _shared_key(self, key, version):
+        return f"{self.namespace}:v{version}:{key}"
+
+    def _shared_error(self, operation):
+        self._count('errors')
+        logger.warning('Shared cache unavailable', exc_info=True,
+                       extra={'namespace': self.namespace, 'operation': operation})
+
+    def get(self, key, default=None):
+        try:
+            version = self._current_version()
+        except Exception:
+            self._shared_error('get')
+            version = None
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self._count('local_hits')
+            return value
+        if version is not None:
+            try:
+                value = self.shared.get(self._shared_key(key, version), _MISSING)
+            except Exception:
+                self._shared_error('get')
+            if value is not _MISSING:
+                self._count('shared_hits')
+                self.local.set(key, value, self.local_timeout)
+                return value
+        self._count('misses')
+        return default
+
+    def set(self, key, value, timeout=None):
+        try:
+            version = self._current_version()
+            self.shared.set(self._shared_key(key, version), value, timeout or self.timeout)
+        except Exception:
+            self._shared_error('set')
+        self.local.set(key, value, self.local_timeout)
+
+    def _key_lock(self, key):
+        return self._key_locks[hash(key) % len(self._key_locks)]
+
+    def get_or_set(self, key, producer, timeout=None):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._key_lock(key):
+            # Another thread may have filled it while we waited
+            value = self.local.get(key)
+            if value is not _MISSING:
+                return value
+
+            try:
+                shared_key = self._shared_key(key, self._current_version())
+                lock_key = f"{shared_key}:lock"
+                acquired = self.shared.add(lock_key, 1, timeout=self.lock_timeout)
+            except Exception:
+                self._shared_error('lock')
+                value = producer()
+                self.local.set(key, value, self.local_timeout)
+                return value
+
+            if not acquired:
+                # Another process is computing it; wait briefly for its result
+                deadline = time.monotonic() + self.lock_timeout
+                while time.monotonic() < deadline:
+                    try:
+                        value = self.shared.get(shared_key, _MISSING)
+                    except Exception:
+                        self._shared_error('get')
+                        break
+                    if value is not _MISSING:
+                        self.local.set(key, value, self.local_timeout)
+                        return value
+                    time.sleep(0.05)
+            try:
+                value = producer()
+                self.set(key, value, timeout)
+            finally:
+                # Only the holder may release the lock
+                if acquired:
+                    try:
+                        self.shared.delete(lock_key)
+                    except Exception:
+                        self._shared_error('unlock')
+            return value
+
+    def delete(self, key):
+        try:
+            self.shared.delete(self._shared_key(key, self._current_version()))
+        except Exception:
+            self._shared_error('delete')
+        self.local.clear()
+
+    def invalidate(self):
+        """Drop every key in this namespace, in all processes"""
+        self.local.clear()
+        self._version = None
+        try:
+            try:
+                self.shared.incr(self._version_key)
+            except ValueError:
+                self.shared.add(self._version_key, 2, timeout=None)
+        except Exception:
+            self._shared_error('invalidate')
+            return
+        self._count('invalidations')
+
+    def invalidate_on_commit(self):
+        """invalidate() once the current transaction commits (now outside one)"""
+        transaction.on_commit(self.invalidate)
+
+    def hit_ratio(self):
+        hits = self.stats['local_hits'] + self.stats['shared_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else None
+
+
+def tiered_cache(namespace, **options):
+    """Return the process-wide TieredCache for a namespace"""
+    with _registry_lock:
+        if namespace not in _registry:
+            _registry[namespace] = TieredCache(namespace, **options)
+        return _registry[namespace]
+
+
+def cache_stats():
+    """Hit/miss counters of every tiered cache in this process"""
+    stats = {}
+    for namespace, cache in list(_registry.items()):
+        ratio = cache.hit_ratio()
+        stats[namespace] = {
+            **cache.stats,
+            'hit_ratio': round(ratio, 4) if ratio is not None else None,
+        }
+    return stats
@@ -0,0 +1,27 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clinical_platform.settings')
+
+app = Celery('clinical_platform')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+from celery_schedule import CELERY_BEAT_SCHEDULE, CELERY_TASK_ROUTES, CELERY_TIMEZONE  # noqa: E402
+
+app.conf.beat_schedule = CELERY_BEAT_SCHEDULE
+app.conf.task_routes = CELERY_TASK_ROUTES
+app.conf.timezone = CELERY_TIMEZONE
+
+app.autodiscover_tasks()
+
+# Per-task connection and Prometheus instrumentation; connected here so
+# processes that never load Celery do not import it for these hooks
+from celery.signals import task_postrun, task_prerun  # noqa: E402
+
+from .db import count_task_started  # noqa: E402
+from .metrics import record_task_end, record_task_start  # noqa: E402
+
+task_prerun.connect(count_task_started)
+task_prerun.connect(record_task_start)
+task_postrun.connect(record_task_end)
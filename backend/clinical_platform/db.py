@@ -0,0 +1,60 @@
+"""
+Per-process database connection statistics.
+
+With persistent connections (CONN_MAX_AGE) a request or Celery task
+should normally reuse the connection opened by an earlier one; these
+counters show how often that actually happens.
+"""
+import os
+import threading
+
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_lock = threading.Lock()
+_stats = {
+    'connections_opened': 0,
+    'units_of_work': 0,
+    'connections_reused': 0,
+}
+
+
+def _record_unit_of_work(alias='default'):
+    # Runs after Django's close_old_connections handler, so an open
+    # connection at this point is one that will be reused
+    reused = connections[alias].connection is not None
+    with _lock:
+        _stats['units_of_work'] += 1
+        if reused:
+            _stats['connections_reused'] += 1
+
+
+@receiver(connection_created)
+def count_connection_created(sender, connection, **kwargs):
+    with _lock:
+        _stats['connections_opened'] += 1
+
+
+@receiver(request_started)
+def count_request_started(sender, **kwargs):
+    _record_unit_of_work()
+
+
+def count_task_started(**kwargs):
+    # Connected to task_prerun in clinical_platform.celery
+    _record_unit_of_work()
+
+
+def connection_stats():
+    """Snapshot of this process's connection counters"""
+    with _lock:
+        stats = dict(_stats)
+    units = stats['units_of_work']
+    stats['reuse_ratio'] = round(stats['connections_reused'] / units, 4) if units else None
+    stats['pid'] = os.getpid()
+    settings_dict = connections['default'].settings_dict
+    stats['conn_max_age'] = settings_dict.get('CONN_MAX_AGE')
+    stats['health_checks'] = settings_dict.get('CONN_HEALTH_CHECKS')
+    return stats
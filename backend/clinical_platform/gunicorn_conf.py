@@ -0,0 +1,117 @@
+"""
+Gunicorn configuration, selected by profile.
+
+    gunicorn -c python:clinical_platform.gunicorn_conf
+
+GUNICORN_PROFILE picks the worker model:
+
+    sync     one request per process; 2 x CPU + 1 workers
+    gthread  threaded workers (default); CPU + 1 workers x GUNICORN_THREADS
+    uvicorn  ASGI workers for the async views (sets SERVER_MODE=asgi); CPU workers
+
+GUNICORN_WORKERS / GUNICORN_THREADS override the profile defaults. With
+GUNICORN_PRELOAD (on by default) Django is imported once in the master
+and workers share those pages copy-on-write; gc.freeze() keeps the
+collector from touching (and so copying) them. Workers are recycled
+after GUNICORN_MAX_REQUESTS requests, with jitter so they do not all
+restart together. benchmarks/gunicorn_profiles.py compares profiles.
+"""
+import gc
+import multiprocessing
+import os
+import shutil
+import sys
+
+from decouple import config
+
+PROFILE = config('GUNICORN_PROFILE', default='gthread')
+_cpus = multiprocessing.cpu_count()
+
+PROFILES = {
+    'sync': {
+        'worker_class': 'sync',
+        'workers': 2 * _cpus + 1,
+        'threads': 1,
+        'wsgi_app': 'clinical_platform.wsgi:application',
+    },
+    'gthread': {
+        'worker_class': 'gthread',
+        'workers': _cpus + 1,
+        'threads': 4,
+        'wsgi_app': 'clinical_platform.wsgi:application',
+    },
+    'uvicorn': {
+        'worker_class': 'uvicorn.workers.UvicornWorker',
+        'workers': _cpus,
+        'threads': 1,
+        'wsgi_app': 'clinical_platform.asgi:application',
+    },
+}
+
+if PROFILE not in PROFILES:
+    raise RuntimeError(f"Unknown GUNICORN_PROFILE {PROFILE!r}; expected one of {', '.join(PROFILES)}")
+_profile = PROFILES[PROFILE]
+
+if PROFILE == 'uvicorn':
+    # Read by Django settings, which (with preload) are loaded after this module
+    os.environ.setdefault('SERVER_MODE', 'asgi')
+
+wsgi_app = _profile['wsgi_app']
+worker_class = _profile['worker_class']
+workers = config('GUNICORN_WORKERS', default=_profile['workers'], cast=int)
+threads = config('GUNICORN_THREADS', default=_profile['threads'], cast=int)
+
+bind = config('GUNICORN_BIND', default='0.0.0.0:8000')
+preload_app = config('GUNICORN_PRELOAD', default=True, cast=bool)
+max_requests = config('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = config('GUNICORN_MAX_REQUESTS_JITTER', default=100, cast=int)
+timeout = config('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = config('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+keepalive = config('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+# Heartbeat files on tmpfs; an overlay filesystem can stall workers
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = None
+errorlog = '-'
+
+
+def _django_ready():
+    if 'django.apps' not in sys.modules:
+        return False
+    from django.apps import apps
+    return apps.ready
+
+
+def on_starting(server):
+    # prometheus_client multiprocess files from a previous run would be
+    # summed into this one's metrics
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def when_ready(server):
+    server.log.info(
+        f"Profile {PROFILE}: {workers} x {worker_class} workers, {threads} threads, "
+        f"preload={preload_app}, max_requests={max_requests}+{max_requests_jitter}"
+    )
+    if preload_app:
+        # Everything allocated so far is shared with workers; stop the GC
+        # from writing to those pages and un-sharing them
+        gc.freeze()
+
+
+def pre_fork(server, worker):
+    if _django_ready():
+        # Workers must not inherit the master's database sockets
+        from django.db import connections
+        connections.close_all()
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
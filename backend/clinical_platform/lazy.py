@@ -0,0 +1,41 @@
+"""
+Deferred imports for heavy modules that most processes never touch.
+
+    stripe = LazyModule('stripe', configure=set_api_key)
+
+The real module is imported (and ``configure`` run on it once) on the
+first attribute access, so importing a views module no longer pays for
+the import at worker boot or ops-script start.
+"""
+import importlib
+import threading
+
+
+class LazyModule:
+    def __init__(self, name, configure=None):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_configure', configure)
+        object.__setattr__(self, '_module', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with self._lock:
+                module = self._module
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    if self._configure is not None:
+                        self._configure(module)
+                    object.__setattr__(self, '_module', module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule {self._name!r} ({state})>"
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from clinical_platform.archive import ARCHIVES, archivable, archive
+
+
+class Command(BaseCommand):
+    help = 'Move old commissions, webhook events and WhatsApp messages to their archive tables in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', choices=list(ARCHIVES),
+                            help='Archive only this kind of row (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows per transaction (ARCHIVE_CHUNK_SIZE)')
+        parser.add_argument('--sleep', type=float, default=0.1, help='Seconds to pause between chunks')
+        parser.add_argument('--max-chunks', type=int, default=None, help='Stop each archive after this many chunks')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would move')
+
+    def handle(self, *args, **options):
+        for name in options['only'] or ARCHIVES:
+            if options['dry_run']:
+                queryset, archive_model = archivable(name)
+                self.stdout.write(f"{name}: {queryset.count()} rows would move to {archive_model._meta.db_table}")
+                continue
+            result = archive(
+                name,
+                chunk_size=options['chunk_size'],
+                sleep_seconds=options['sleep'],
+                max_chunks=options['max_chunks'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: archived {result['archived']} rows in {result['chunks']} chunks"
+            ))
@@ -0,0 +1,36 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from clinical_platform.partitioning import PARTITIONED, convert_to_partitioned, maintain_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly partitions and archive expired ones; --convert partitions existing tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', choices=list(PARTITIONED),
+                            help='Only this table (repeatable)')
+        parser.add_argument('--convert', action='store_true',
+                            help='Rebuild unpartitioned tables as partitioned ones (locks each table while copying)')
+        parser.add_argument('--months-ahead', type=int, default=None,
+                            help='Months of partitions to create ahead (PARTITION_MONTHS_AHEAD)')
+
+    def handle(self, *args, **options):
+        names = options['only'] or list(PARTITIONED)
+        if options['convert']:
+            for name in names:
+                table = PARTITIONED[name]
+                copied = convert_to_partitioned(apps.get_model(table.model), table.indexes, options['months_ahead'])
+                if copied is None:
+                    self.stdout.write(f"{name}: already partitioned")
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"{name}: partitioned, {copied} rows copied"))
+
+        for name, result in maintain_partitions(names, months_ahead=options['months_ahead']).items():
+            if not result['partitioned']:
+                self.stdout.write(self.style.WARNING(f"{name}: not partitioned (run with --convert)"))
+                continue
+            self.stdout.write(
+                f"{name}: created {', '.join(result['created']) or 'no partitions'}; "
+                f"archived {result['archived']} rows and dropped {', '.join(result['dropped']) or 'none'}"
+            )
@@ -0,0 +1,106 @@
+"""
+Prometheus metrics for the API, Stripe calls, Celery tasks and caches.
+
+Under gunicorn (or any multi-process server) set PROMETHEUS_MULTIPROC_DIR
+to an empty, writable directory shared by every worker *before* the
+processes start; prometheus_client then writes samples to mmap files in
+that directory and the /metrics view aggregates them. Celery workers on
+the same host can share the directory, so their task metrics show up in
+the same scrape. Without the variable, metrics are per-process.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+http_request_duration = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by route',
+    ['view', 'method', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+http_request_db_duration = Histogram(
+    'http_request_db_seconds',
+    'Total SQL time per request (sampled requests only)',
+    ['view'],
+    buckets=LATENCY_BUCKETS,
+)
+http_request_queries = Histogram(
+    'http_request_queries',
+    'SQL statements per request (sampled requests only)',
+    ['view'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+)
+stripe_request_duration = Histogram(
+    'stripe_request_duration_seconds',
+    'Latency of Stripe API calls',
+    ['operation', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+celery_task_duration = Histogram(
+    'celery_task_duration_seconds',
+    'Celery task run time',
+    ['task'],
+    buckets=TASK_BUCKETS,
+)
+celery_tasks = Counter(
+    'celery_tasks_total',
+    'Finished Celery tasks by state',
+    ['task', 'state'],
+)
+cache_events = Counter(
+    'tiered_cache_events_total',
+    'Tiered cache lookups and invalidations (hit ratio = hits / (hits + misses))',
+    ['namespace', 'event'],
+)
+
+
+@contextmanager
+def observe_stripe(operation):
+    """Time a Stripe API call, labelled by outcome"""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        stripe_request_duration.labels(operation, outcome).observe(time.perf_counter() - started)
+
+
+# task_id -> start time; entries are removed in task_postrun.
+# Both handlers are connected in clinical_platform.celery.
+_task_started = {}
+
+
+def record_task_start(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+def record_task_end(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        celery_task_duration.labels(task.name).observe(time.perf_counter() - started)
+    # SUCCESS, FAILURE or RETRY
+    celery_tasks.labels(task.name, (state or 'unknown').lower()).inc()
+
+
+def render_metrics():
+    """Exposition text and content type for the scrape endpoint"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
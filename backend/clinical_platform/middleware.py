@@ -0,0 +1,208 @@
+"""
+Request-level SQL instrumentation.
+
+A sampled fraction of requests (SQL_INSTRUMENTATION_SAMPLE_RATE) is run
+under ``connection.execute_wrapper`` to record query count, total SQL
+time and the slowest statements. Sampled responses get a
+``Server-Timing`` header, every sample is logged with structured fields
+and folded into per-view histograms served by the internal metrics
+endpoint. Unsampled requests only pay for one ``random()`` call.
+"""
+import bisect
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .metrics import http_request_db_duration, http_request_duration, http_request_queries
+
+logger = logging.getLogger('clinical_platform.sql')
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+SQL_MS_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+MAX_SQL_LENGTH = 500
+
+
+class QueryRecorder:
+    """execute_wrapper that times every statement"""
+
+    def __init__(self, keep_slowest=3):
+        self.keep_slowest = keep_slowest
+        self.count = 0
+        self.total = 0.0
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.total += duration
+            # Statements only, never params, so no patient/payment data is kept
+            self.slowest.append((duration, sql[:MAX_SQL_LENGTH]))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[self.keep_slowest:]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def as_dict(self):
+        labels = [f"le_{bucket}" for bucket in self.buckets] + ['le_inf']
+        return {'buckets': dict(zip(labels, self.counts)), 'sum': round(self.sum, 3)}
+
+
+class SQLStatsRegistry:
+    """Per-view aggregates of sampled requests (per process)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, query_count, sql_ms, total_ms):
+        with self._lock:
+            entry = self._views.get(view)
+            if entry is None:
+                entry = self._views[view] = {
+                    'requests': 0,
+                    'queries': Histogram(QUERY_COUNT_BUCKETS),
+                    'sql_ms': Histogram(SQL_MS_BUCKETS),
+                    'max_queries': 0,
+                    'max_sql_ms': 0.0,
+                    'total_ms': 0.0,
+                }
+            entry['requests'] += 1
+            entry['queries'].observe(query_count)
+            entry['sql_ms'].observe(sql_ms)
+            entry['max_queries'] = max(entry['max_queries'], query_count)
+            entry['max_sql_ms'] = max(entry['max_sql_ms'], sql_ms)
+            entry['total_ms'] += total_ms
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {
+                    'requests': entry['requests'],
+                    'avg_queries': round(entry['queries'].sum / entry['requests'], 2),
+                    'avg_sql_ms': round(entry['sql_ms'].sum / entry['requests'], 3),
+                    'avg_total_ms': round(entry['total_ms'] / entry['requests'], 3),
+                    'max_queries': entry['max_queries'],
+                    'max_sql_ms': round(entry['max_sql_ms'], 3),
+                    'queries': entry['queries'].as_dict(),
+                    'sql_ms': entry['sql_ms'].as_dict(),
+                }
+                for view, entry in self._views.items()
+            }
+
+
+sql_stats = SQLStatsRegistry()
+
+
+def view_name(request):
+    """Stable low-cardinality label for the view that handled a request"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class QueryInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SQL_INSTRUMENTATION_SAMPLE_RATE', 0.1)
+        self.slow_request_ms = getattr(settings, 'SQL_SLOW_REQUEST_MS', 500)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            # Under ASGI the ORM runs on sync_to_async worker threads, whose
+            # connections an execute_wrapper installed here cannot see
+            return self.get_response(request)
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        sql_ms = recorder.total * 1000
+
+        view = view_name(request)
+        sql_stats.record(view, recorder.count, sql_ms, total_ms)
+        http_request_db_duration.labels(view).observe(recorder.total)
+        http_request_queries.labels(view).observe(recorder.count)
+
+        response['Server-Timing'] = (
+            f'db;dur={sql_ms:.1f};desc="{recorder.count} queries", app;dur={total_ms:.1f}'
+        )
+
+        fields = {
+            'view': view,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_ms': round(sql_ms, 2),
+            'total_ms': round(total_ms, 2),
+        }
+        if total_ms >= self.slow_request_ms:
+            fields['slowest'] = [
+                {'ms': round(duration * 1000, 2), 'sql': sql} for duration, sql in recorder.slowest
+            ]
+            logger.warning('slow request %s: %d queries, %.1fms SQL', view, recorder.count, sql_ms, extra=fields)
+        else:
+            logger.info('request %s: %d queries, %.1fms SQL', view, recorder.count, sql_ms, extra=fields)
+        return response
+
+
+class MetricsMiddleware:
+    """Latency of every request, by route, for the Prometheus scrape"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    def observe(self, request, response, started):
+        http_request_duration.labels(
+            view_name(request), request.method, response.status_code
+        ).observe(time.perf_counter() - started)
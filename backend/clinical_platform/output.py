@@ -0,0 +1,88 @@
+"""
+Streaming row output for management commands: table, JSON or CSV.
+
+Rows are written as they arrive, so a command can feed a queryset
+``.iterator()`` straight through without holding the result in memory.
+``json`` emits one array with an element per line (closed by close()),
+``csv`` a header plus rows, and ``table`` fixed-width columns for a
+terminal.
+"""
+import csv
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+OUTPUT_FORMATS = ('table', 'json', 'csv')
+
+
+class Column:
+    def __init__(self, key, header=None, width=12):
+        self.key = key
+        self.header = header or key
+        self.width = width
+
+
+def _display(value):
+    if value is None:
+        return '-'
+    if isinstance(value, Decimal):
+        return f"{value:.2f}"
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, datetime.date):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+class RowWriter:
+    """Write dict rows to a text stream in one of OUTPUT_FORMATS"""
+
+    def __init__(self, stream, fmt, columns):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format {fmt!r}")
+        self.stream = stream
+        self.fmt = fmt
+        self.columns = columns
+        self.count = 0
+        self._csv = csv.writer(stream, lineterminator='\n') if fmt == 'csv' else None
+        self._started = False
+
+    def _start(self):
+        self._started = True
+        if self.fmt == 'table':
+            header = ' '.join(f"{column.header:<{column.width}}" for column in self.columns)
+            self.stream.write(header.rstrip() + '\n')
+            self.stream.write('-' * len(header) + '\n')
+        elif self.fmt == 'csv':
+            self._csv.writerow([column.key for column in self.columns])
+        else:
+            self.stream.write('[\n')
+
+    def write(self, row):
+        if not self._started:
+            self._start()
+        if self.fmt == 'table':
+            line = ' '.join(f"{_display(row.get(column.key)):<{column.width}}" for column in self.columns)
+            self.stream.write(line.rstrip() + '\n')
+        elif self.fmt == 'csv':
+            self._csv.writerow(['' if row.get(column.key) is None else row.get(column.key) for column in self.columns])
+        else:
+            item = {column.key: row.get(column.key) for column in self.columns}
+            # Every write ends a line, so the separator leads the next element
+            self.stream.write((',' if self.count else ' ') + json.dumps(item, cls=DjangoJSONEncoder) + '\n')
+        self.count += 1
+
+    def write_all(self, rows):
+        for row in rows:
+            self.write(row)
+        self.close()
+        return self.count
+
+    def close(self):
+        if not self._started:
+            self._start()
+        if self.fmt == 'json':
+            self.stream.write(']\n')
+        self.stream.flush()
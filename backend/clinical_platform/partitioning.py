@@ -0,0 +1,242 @@
+"""
+Monthly range partitioning of append-heavy tables.
+
+A partitioned table is split on created_at into one partition per
+calendar month (``<table>_pYYYY_MM``, UTC) plus a default partition for
+rows outside them. Queries bounded on created_at only scan the months
+they cover. Archiving (archive.py) works a whole month at a time: once
+a month is past the archive age its partition is copied into the
+archive table with one INSERT ... SELECT, then detached and dropped, so
+the hot table never sees a DELETE.
+
+Tables are converted by ``manage.py partition_tables --convert``, never
+by a migration, because the rebuild holds an exclusive lock while it
+copies the rows.
+
+Postgres requires every unique constraint of a partitioned table to
+contain the partition key, so the primary key becomes (id, created_at)
+and columns that were unique become plain indexes; Stripe webhook
+dedupe takes an advisory lock instead of relying on a unique index.
+
+Payment is not partitioned: commissions reference it by id, and a
+foreign key can only point at a partitioned table through a unique key
+that includes created_at.
+"""
+import logging
+from datetime import datetime, timezone as dt_timezone
+from typing import NamedTuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from . import archive
+
+logger = logging.getLogger(__name__)
+
+# How long archiving a partition waits for its locks before leaving it for the next run
+LOCK_TIMEOUT = '5s'
+
+
+class PartitionedTable(NamedTuple):
+    model: str
+    # Column tuples indexed on every partition
+    indexes: tuple
+
+
+# Keys match archive.ARCHIVES: a month is dropped once it is past that archive's age
+PARTITIONED = {
+    'webhook_events': PartitionedTable('subscriptions.WebhookEvent', (('stripe_event_id',), ('created_at',))),
+    'whatsapp_messages': PartitionedTable('nutrition.WhatsAppMessage', (('user_id', 'created_at'), ('whatsapp_message_id',))),
+}
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _month(moment, months=0):
+    """UTC midnight on the first of the month `months` after `moment`'s"""
+    moment = moment.astimezone(dt_timezone.utc)
+    year, month = divmod(moment.year * 12 + moment.month - 1 + months, 12)
+    return datetime(year, month + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y_%m}"
+
+
+def partition_month(table, partition):
+    """First moment of a monthly partition's range, or None for the default partition"""
+    try:
+        return datetime.strptime(partition[len(table) + 2:], '%Y_%m').replace(tzinfo=dt_timezone.utc)
+    except ValueError:
+        return None
+
+
+def table_of(name):
+    return apps.get_model(PARTITIONED[name].model)._meta.db_table
+
+
+def is_partitioned(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s)",
+            [table],
+        )
+        return cursor.fetchone()[0]
+
+
+def partitions(table):
+    """Names of the partitions attached to `table`"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s ORDER BY c.relname",
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_partitions(table, first_month, last_month):
+    """Create the missing monthly partitions from first_month to last_month and the default one"""
+    existing = set(partitions(table))
+    created = []
+    with connection.cursor() as cursor:
+        month = _month(first_month)
+        while month <= last_month:
+            name = partition_name(table, month)
+            if name not in existing:
+                cursor.execute(
+                    f"CREATE TABLE {_quote(name)} PARTITION OF {_quote(table)} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_month(month, 1).isoformat()}')"
+                )
+                created.append(name)
+            month = _month(month, 1)
+        if f"{table}_default" not in existing:
+            cursor.execute(f"CREATE TABLE {_quote(table + '_default')} PARTITION OF {_quote(table)} DEFAULT")
+            created.append(f"{table}_default")
+    return created
+
+
+def convert_to_partitioned(model, indexes, months_ahead=None):
+    """
+    Rebuild `model`'s table as a partitioned table with the same columns
+    and rows, under an exclusive lock; returns the rows copied, or None
+    when it already is partitioned.
+    """
+    table = model._meta.db_table
+    if is_partitioned(table):
+        return None
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    old, sequence = f"{table}_unpartitioned", f"{table}_part_id_seq"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {_quote(table)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"ALTER TABLE {_quote(table)} RENAME TO {_quote(old)}")
+        cursor.execute(f"CREATE TABLE {_quote(table)} (LIKE {_quote(old)} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+        cursor.execute(f"CREATE SEQUENCE {_quote(sequence)} OWNED BY {_quote(table)}.id")
+        cursor.execute(f"ALTER TABLE {_quote(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+        cursor.execute(f"ALTER TABLE {_quote(table)} ADD CONSTRAINT {_quote(table + '_part_pkey')} PRIMARY KEY (id, created_at)")
+        for field in model._meta.concrete_fields:
+            if field.remote_field and field.db_constraint:
+                target = field.remote_field.model._meta.db_table
+                cursor.execute(
+                    f"ALTER TABLE {_quote(table)} ADD CONSTRAINT {_quote(f'{table}_{field.column}_part_fk')} "
+                    f"FOREIGN KEY ({_quote(field.column)}) REFERENCES {_quote(target)} ({_quote(field.target_field.column)}) "
+                    f"DEFERRABLE INITIALLY DEFERRED"
+                )
+        for columns in indexes:
+            index = f"{table}_{'_'.join(columns)}_part_idx"
+            cursor.execute(
+                f"CREATE INDEX {_quote(index)} "
+                f"ON {_quote(table)} ({', '.join(_quote(column) for column in columns)})"
+            )
+
+        cursor.execute(f"SELECT MIN(created_at) FROM {_quote(old)}")
+        now = timezone.now()
+        create_partitions(table, cursor.fetchone()[0] or now, _month(now, months_ahead))
+        cursor.execute(f"INSERT INTO {_quote(table)} SELECT * FROM {_quote(old)}")
+        copied = cursor.rowcount
+        cursor.execute(f"SELECT setval('{sequence}', COALESCE(MAX(id), 0) + 1, false) FROM {_quote(table)}")
+        cursor.execute(f"DROP TABLE {_quote(old)}")
+
+    logger.info('Table converted to monthly partitions', extra={'table': table, 'rows': copied})
+    return copied
+
+
+def is_archived_by_partition(name):
+    """Whether the `name` archive (archive.ARCHIVES) moves whole partitions"""
+    return name in PARTITIONED and is_partitioned(table_of(name))
+
+
+def expired_before(name, now=None):
+    """Start of the month holding `name`'s archive cutoff; partitions ending by then are expired"""
+    return _month(archive.cutoff(name, now))
+
+
+def archive_expired_partitions(name, now=None):
+    """
+    Move every monthly partition of `name` that ends before its archive
+    cutoff into the archive table, then detach and drop it; one partition
+    per transaction. Partitions whose locks are not granted within
+    LOCK_TIMEOUT are left for the next run.
+    """
+    model = apps.get_model(PARTITIONED[name].model)
+    archive_model = apps.get_model(archive.ARCHIVES[name][0])
+    table = model._meta.db_table
+    columns = ', '.join(_quote(field.column) for field in model._meta.concrete_fields)
+    expired = expired_before(name, now)
+    result = {'partitions': [], 'archived': 0}
+    for partition in partitions(table):
+        month = partition_month(table, partition)
+        if month is None or _month(month, 1) > expired:
+            continue
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("SELECT set_config('lock_timeout', %s, true)", [LOCK_TIMEOUT])
+                # Blocks writes to this month only; the parent is locked just for the detach
+                cursor.execute(f"LOCK TABLE {_quote(partition)} IN SHARE MODE")
+                cursor.execute(
+                    f"INSERT INTO {_quote(archive_model._meta.db_table)} ({columns}, archived_at) "
+                    f"SELECT {columns}, %s FROM {_quote(partition)}",
+                    [timezone.now()],
+                )
+                archived = cursor.rowcount
+                cursor.execute(f"ALTER TABLE {_quote(table)} DETACH PARTITION {_quote(partition)}")
+                cursor.execute(f"DROP TABLE {_quote(partition)}")
+        except OperationalError as e:
+            logger.warning('Partition left for the next run', extra={'partition': partition, 'error': str(e)})
+            continue
+        logger.info('Partition archived and dropped', extra={'partition': partition, 'rows': archived})
+        result['partitions'].append(partition)
+        result['archived'] += archived
+    return result
+
+
+def maintain_partitions(names=None, months_ahead=None, now=None):
+    """Create the coming months' partitions and archive expired ones; {name: result}"""
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    now = now or timezone.now()
+    results = {}
+    for name in names or PARTITIONED:
+        table = table_of(name)
+        if not is_partitioned(table):
+            results[name] = {'partitioned': False, 'created': [], 'dropped': [], 'archived': 0}
+            continue
+        with transaction.atomic():
+            created = create_partitions(table, now, _month(now, months_ahead))
+        expired = archive_expired_partitions(name, now)
+        results[name] = {
+            'partitioned': True, 'created': created, 'dropped': expired['partitions'], 'archived': expired['archived'],
+        }
+    return results
+
+
+def advisory_xact_lock(key):
+    """Hold a Postgres advisory lock on `key` until the current transaction ends"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))", [key])
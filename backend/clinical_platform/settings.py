@@ -27,11 +27,18 @@ DJANGO_APPS = [
 THIRD_PARTY_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
+]
+
+# Development tooling (shell_plus, runserver_plus, ...); kept out of
+# production workers, which would otherwise import it at every boot
+DEV_APPS = [
     'django_extensions',
 ]
 
 LOCAL_APPS = [
+    'clinical_platform.apps.PlatformConfig',
     'apps.accounts',
     'apps.subscriptions',
     'apps.affiliates',
@@ -39,8 +46,12 @@ LOCAL_APPS = [
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
+if config('DEV_APPS', default=DEBUG, cast=bool):
+    INSTALLED_APPS += DEV_APPS
 
 MIDDLEWARE = [
+    'clinical_platform.middleware.MetricsMiddleware',
+    'clinical_platform.middleware.QueryInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -52,6 +63,17 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Serving mode: 'wsgi' (gunicorn sync/threaded workers) or 'asgi' (uvicorn workers).
+# Under ASGI every middleware must be async-capable or each request is pushed
+# through a thread; WhiteNoise is sync-only, so static files are expected to
+# be served by the proxy/CDN from STATIC_ROOT instead.
+SERVER_MODE = config('SERVER_MODE', default='wsgi')
+if SERVER_MODE == 'asgi':
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
+# Route the Stripe/WhatsApp-bound endpoints to their async views
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=SERVER_MODE == 'asgi', cast=bool)
+
 ROOT_URLCONF = 'clinical_platform.urls'
 
 TEMPLATES = [
@@ -81,6 +103,14 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Keep connections open across requests/tasks and verify them before reuse
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        # Required when connecting through PgBouncer in transaction pooling mode
+        'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
+        'OPTIONS': {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+        },
     }
 }
 
@@ -100,6 +130,32 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# PASSWORD_HASHER picks the preferred algorithm (argon2, scrypt or pbkdf2);
+# the others stay enabled so existing hashes verify and get upgraded on login.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2')
+_PASSWORD_HASHER_CLASSES = {
+    'argon2': 'apps.accounts.hashers.ConfigurableArgon2PasswordHasher',
+    'scrypt': 'apps.accounts.hashers.ConfigurableScryptPasswordHasher',
+    'pbkdf2': 'apps.accounts.hashers.ConfigurablePBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+PBKDF2_ITERATIONS = config('PBKDF2_ITERATIONS', default=600000, cast=int)
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=102400, cast=int)
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=8, cast=int)
+SCRYPT_WORK_FACTOR = config('SCRYPT_WORK_FACTOR', default=2 ** 14, cast=int)
+
+# At most this many password hashes run at once per process
+PASSWORD_HASH_CONCURRENCY = config('PASSWORD_HASH_CONCURRENCY', default=os.cpu_count() or 1, cast=int)
+
+AUTHENTICATION_BACKENDS = [
+    'apps.accounts.backends.BoundedHashBackend',
+]
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -120,11 +176,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
+# API session mode. When disabled the API is JWT-only: login does not create
+# a Django session and SessionAuthentication (with its CSRF checks) is off.
+API_SESSION_AUTH = config('API_SESSION_AUTH', default=True, cast=bool)
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
+    ) + (
+        ('rest_framework.authentication.SessionAuthentication',) if API_SESSION_AUTH else ()
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -142,6 +203,9 @@ SIMPLE_JWT = {
     'UPDATE_LAST_LOGIN': True,
 }
 
+# Blacklisted JTIs are mirrored in a per-process bloom filter of this capacity
+JWT_BLACKLIST_BLOOM_CAPACITY = config('JWT_BLACKLIST_BLOOM_CAPACITY', default=100000, cast=int)
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -157,6 +221,77 @@ FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:3000')
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='')
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
+# Overridable so load tests can point both the sync and async clients at a stub
+STRIPE_API_BASE = config('STRIPE_API_BASE', default='https://api.stripe.com')
+STRIPE_TIMEOUT = config('STRIPE_TIMEOUT', default=30, cast=int)
+
+# WhatsApp Business Cloud API (demo mode when the token is empty)
+WHATSAPP_API_URL = config('WHATSAPP_API_URL', default='https://graph.facebook.com/v19.0')
+WHATSAPP_PHONE_NUMBER_ID = config('WHATSAPP_PHONE_NUMBER_ID', default='')
+WHATSAPP_API_TOKEN = config('WHATSAPP_API_TOKEN', default='')
+WHATSAPP_TIMEOUT = config('WHATSAPP_TIMEOUT', default=10, cast=int)
+
+# Cache Configuration
+# Shared tier for clinical_platform.cache; 'locmem' runs without Redis
+CACHE_BACKEND = config('CACHE_BACKEND', default='redis')
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'clinical-platform',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('CACHE_URL', default='redis://localhost:6379/1'),
+            'KEY_PREFIX': 'cnp',
+            'TIMEOUT': 300,
+        }
+    }
+
+# SQL instrumentation (clinical_platform.middleware)
+# Fraction of requests whose queries are counted and timed
+SQL_INSTRUMENTATION_SAMPLE_RATE = config('SQL_INSTRUMENTATION_SAMPLE_RATE', default=0.1, cast=float)
+# Sampled requests slower than this are logged at WARNING with their slowest statements
+SQL_SLOW_REQUEST_MS = config('SQL_SLOW_REQUEST_MS', default=500, cast=int)
+
+# Prometheus scrape endpoint (/metrics); scrapers must send
+# "Authorization: Bearer <token>", and while it is unset the endpoint
+# answers 403 unless DEBUG is on. Multi-process aggregation is enabled by
+# the PROMETHEUS_MULTIPROC_DIR environment variable (see clinical_platform.metrics).
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Affiliate health endpoint (/api/affiliates/health/): staff sessions, or
+# "Authorization: Bearer <token>" when HEALTH_CHECK_TOKEN is set. The report
+# is computed at most once per AFFILIATE_HEALTH_CACHE_SECONDS.
+HEALTH_CHECK_TOKEN = config('HEALTH_CHECK_TOKEN', default='')
+AFFILIATE_HEALTH_CACHE_SECONDS = config('AFFILIATE_HEALTH_CACHE_SECONDS', default=30, cast=int)
+
+# Uploads to POST /api/auth/import/ above this size are refused; bigger
+# rosters go through "manage.py import_users"
+BULK_IMPORT_MAX_UPLOAD_BYTES = config('BULK_IMPORT_MAX_UPLOAD_BYTES', default=1024 * 1024, cast=int)
+
+# Payout engine (apps.affiliates.payouts): rail that sends approved payout
+# requests ('fake' pays nothing for real), requests claimed per batch and
+# how many are sent to the rail at once. Only DEBUG falls back to 'fake';
+# otherwise the engine refuses to run until PAYOUT_RAIL is set.
+PAYOUT_RAIL = config('PAYOUT_RAIL', default='fake' if DEBUG else '')
+PAYOUT_BATCH_SIZE = config('PAYOUT_BATCH_SIZE', default=200, cast=int)
+PAYOUT_WORKERS = config('PAYOUT_WORKERS', default=8, cast=int)
+
+# Cold storage (clinical_platform.archive): age in days after which paid
+# commissions, processed webhook events and WhatsApp messages move to
+# their archive tables, and rows moved per transaction
+COMMISSION_ARCHIVE_DAYS = config('COMMISSION_ARCHIVE_DAYS', default=365, cast=int)
+WEBHOOK_EVENT_ARCHIVE_DAYS = config('WEBHOOK_EVENT_ARCHIVE_DAYS', default=90, cast=int)
+WHATSAPP_MESSAGE_ARCHIVE_DAYS = config('WHATSAPP_MESSAGE_ARCHIVE_DAYS', default=365, cast=int)
+ARCHIVE_CHUNK_SIZE = config('ARCHIVE_CHUNK_SIZE', default=5000, cast=int)
+
+# Monthly partitions (clinical_platform.partitioning) are created this many
+# months ahead of the current one
+PARTITION_MONTHS_AHEAD = config('PARTITION_MONTHS_AHEAD', default=3, cast=int)
 
 # Celery Configuration
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
@@ -166,25 +301,45 @@ CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 # Logging
+# JSON lines written by a background thread (clinical_platform.structured_logging).
+# LOG_FILE='' disables the rotating file, e.g. when containers collect stdout.
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_FILE = config('LOG_FILE', default=str(BASE_DIR / 'logs' / 'django.log'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
-    'handlers': {
-        'file': {
-            'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'django.log',
+    'formatters': {
+        'json': {
+            '()': 'clinical_platform.structured_logging.JsonFormatter',
         },
-        'console': {
-            'level': 'INFO',
-            'class': 'logging.StreamHandler',
+    },
+    'handlers': {
+        'background': {
+            '()': 'clinical_platform.structured_logging.BackgroundQueueHandler',
+            'level': LOG_LEVEL,
+            'formatter': 'json',
+            'filename': LOG_FILE,
+            'max_bytes': config('LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int),
+            'backup_count': config('LOG_BACKUP_COUNT', default=5, cast=int),
+            'console': config('LOG_CONSOLE', default=True, cast=bool),
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['file', 'console'],
+            'handlers': ['background'],
             'level': 'INFO',
-            'propagate': True,
+            'propagate': False,
+        },
+        'apps': {
+            'handlers': ['background'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'clinical_platform': {
+            'handlers': ['background'],
+            'level': LOG_LEVEL,
+            'propagate': False,
         },
     },
 }
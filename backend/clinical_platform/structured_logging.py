@@ -0,0 +1,128 @@
+"""
+JSON logging with a background writer thread.
+
+``BackgroundQueueHandler`` only puts records on an in-memory queue; a
+``QueueListener`` thread formats them as JSON and writes them to a
+rotating file and/or the console. Request threads never wait on disk or
+a slow stdout pipe. The queue is bounded: when the writer cannot keep up
+records are dropped (and counted) instead of growing memory or blocking.
+
+Pass structured fields with ``extra``; they become top-level JSON keys::
+
+    logger.info('subscription created', extra={'user_id': user.id, 'plan_id': plan.id})
+
+Never log request bodies, payment method ids or client secrets.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Attributes every LogRecord has; anything else on a record came from ``extra``
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """
+    QueueHandler that owns its QueueListener and target handlers.
+
+    Usable from dictConfig through the ``()`` factory key (Python 3.11
+    dictConfig cannot wire a queue to other configured handlers). The
+    configured formatter is applied by the writer thread, not the caller.
+    """
+
+    def __init__(self, filename=None, max_bytes=10 * 1024 * 1024, backup_count=5,
+                 console=True, queue_size=10000):
+        self.targets = []
+        if filename:
+            os.makedirs(os.path.dirname(str(filename)) or '.', exist_ok=True)
+            self.targets.append(RotatingFileHandler(
+                filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            ))
+        if console:
+            self.targets.append(logging.StreamHandler(sys.stdout))
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self._start_listener()
+        atexit.register(self.flush_and_stop)
+
+    def _start_listener(self):
+        self._listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+        self._listener.start()
+        self._pid = os.getpid()
+
+    def _ensure_listener(self):
+        # The writer thread does not survive fork (gunicorn --preload,
+        # Celery prefork); start a fresh queue and thread in the child
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self.queue = queue.Queue(maxsize=self.queue_size)
+                    self._start_listener()
+
+    def setFormatter(self, fmt):
+        for target in self.targets:
+            target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Merge args now (they may be mutated after we return) but keep the
+        # record's extra fields and a separate traceback for the formatter
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush_and_stop(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+        for target in self.targets:
+            target.flush()
+
+    def close(self):
+        self.flush_and_stop()
+        for target in self.targets:
+            target.close()
+        super().close()
@@ -0,0 +1,53 @@
+"""
+Celery tasks for platform-wide maintenance
+"""
+from celery import shared_task
+import logging
+
+# Configures the Celery app that .delay() sends through
+import clinical_platform.celery  # noqa: F401
+
+from .archive import ARCHIVES, archive
+from .partitioning import maintain_partitions as maintain_partitions_now
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def archive_old_rows(names=None, sleep_seconds=0.1):
+    """
+    Move old rows to their archive tables (see clinical_platform.archive)
+    Runs nightly for the tables that have no task of their own
+    """
+    results = []
+    for name in names or list(ARCHIVES):
+        try:
+            result = archive(name, sleep_seconds=sleep_seconds)
+            logger.info(f"📦 Archived {result['archived']} {name} rows in {result['chunks']} chunks")
+            results.append({**result, 'status': 'success'})
+        except Exception as e:
+            logger.error(f"❌ Error archiving {name}: {str(e)}")
+            results.append({'name': name, 'status': 'error', 'error': str(e)})
+    return {
+        'results': results,
+        'status': 'success' if all(result['status'] == 'success' for result in results) else 'error',
+    }
+
+
+@shared_task
+def maintain_partitions():
+    """
+    Create the coming months' partitions and archive expired ones
+    Runs daily after archive_old_rows, well before a month starts
+    """
+    try:
+        results = maintain_partitions_now()
+        for name, result in results.items():
+            logger.info(
+                f"🗂️ {name}: created {len(result['created'])}, dropped {len(result['dropped'])} partitions "
+                f"({result['archived']} rows archived)"
+            )
+        return {'results': results, 'status': 'success'}
+    except Exception as e:
+        logger.error(f"❌ Error maintaining partitions: {str(e)}")
+        return {'status': 'error', 'error': str(e)}
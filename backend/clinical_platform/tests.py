@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.subscriptions.models import ArchivedWebhookEvent, WebhookEvent
+from .archive import archive
+from .partitioning import PARTITIONED, convert_to_partitioned, is_partitioned, partitions
+from .views import prometheus_metrics
+
+
+class PrometheusMetricsTests(SimpleTestCase):
+    def scrape(self, **headers):
+        return prometheus_metrics(RequestFactory().get('/metrics', **headers))
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_closed_without_a_token(self):
+        self.assertEqual(self.scrape().status_code, 403)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=True)
+    def test_open_without_a_token_under_debug(self):
+        self.assertEqual(self.scrape().status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secret', DEBUG=False)
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+
+@override_settings(WEBHOOK_EVENT_ARCHIVE_DAYS=90, PARTITION_MONTHS_AHEAD=1)
+class PartitionArchiveTests(TestCase):
+    def event(self, name, days_old):
+        event = WebhookEvent.objects.create(stripe_event_id=name, event_type='test', data={}, processed=True)
+        WebhookEvent.objects.filter(id=event.id).update(created_at=timezone.now() - timedelta(days=days_old))
+
+    def test_migrations_leave_tables_unpartitioned(self):
+        self.assertFalse(is_partitioned('subscriptions_webhook_event'))
+        self.assertFalse(is_partitioned('nutrition_whatsapp_message'))
+
+    def test_expired_months_are_moved_and_dropped(self):
+        for name, days_old in (('old', 200), ('older', 400), ('recent', 1)):
+            self.event(name, days_old)
+        convert_to_partitioned(WebhookEvent, PARTITIONED['webhook_events'].indexes)
+        before = len(partitions('subscriptions_webhook_event'))
+
+        result = archive('webhook_events')
+
+        self.assertEqual(result['archived'], 2)
+        self.assertEqual(len(partitions('subscriptions_webhook_event')), before - len(result['partitions']))
+        self.assertEqual(list(WebhookEvent.objects.values_list('stripe_event_id', flat=True)), ['recent'])
+        self.assertEqual(
+            sorted(ArchivedWebhookEvent.objects.values_list('stripe_event_id', flat=True)), ['old', 'older'],
+        )
@@ -3,12 +3,16 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .views import prometheus_metrics, sql_metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('apps.accounts.urls')),
     path('api/subscriptions/', include('apps.subscriptions.urls')),
     path('api/affiliates/', include('apps.affiliates.urls')),
     path('api/nutrition/', include('apps.nutrition.urls')),
+    path('internal/metrics/sql/', sql_metrics, name='sql_metrics'),
+    path('metrics', prometheus_metrics, name='prometheus_metrics'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from .cache import cache_stats
+from .db import connection_stats
+from .metrics import render_metrics
+from .middleware import sql_stats
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def sql_metrics(request):
+    """Per-view SQL histograms of sampled requests in this worker process"""
+    return Response({
+        'views': sql_stats.snapshot(),
+        'connections': connection_stats(),
+        'caches': cache_stats(),
+    }, status=status.HTTP_200_OK)
+
+
+def prometheus_metrics(request):
+    """
+    Prometheus scrape endpoint (aggregated across workers in multiprocess mode)
+    Requires METRICS_TOKEN as a bearer token; without one it is only open under DEBUG
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not constant_time_compare(supplied, token):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
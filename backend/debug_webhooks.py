@@ -90,7 +90,7 @@ def simulate_webhook_processing():
     
     if payments_without_commissions.count() > 0:
         print("\n💡 To process these payments, run:")
-        print("   python fix_commission_processing.py")
+        print("   python manage.py affiliates reconcile --phase commissions")
 
 def main():
     """Main function"""
@@ -103,7 +103,7 @@ def main():
     
     print("\n📋 Recommendations:")
     print("1. Ensure Webhooks are configured in Stripe Dashboard")
-    print("2. Run fix_commission_processing.py to process missing commissions")
+    print("2. Run python manage.py affiliates reconcile to process missing commissions")
     print("3. Check Django logs to ensure webhooks are being processed")
 
 if __name__ == '__main__':